@@ -1,15 +1,26 @@
-import React, { useState, useEffect } from 'react';
-import axios from 'axios';
+import React, { useState, useEffect, useMemo } from 'react';
+import { fetchAllPages } from '../utils/pagination';
 
 const CategoryTree = ({ onSelect }) => {
   const [categories, setCategories] = useState([]);
 
   useEffect(() => {
-    axios.get('/api/categories/')
-      .then(response => setCategories(response.data))
+    fetchAllPages('/api/categories/?page_size=1000')
+      .then(setCategories)
       .catch(error => console.error('Error fetching categories:', error));
   }, []);
 
+  // ✅ Group children by parent once (O(n)) instead of searching the list per child
+  const childrenByParent = useMemo(() => {
+    const groups = new Map();
+    categories.forEach(category => {
+      const parentId = category.parent ? category.parent.id : null;
+      if (!groups.has(parentId)) groups.set(parentId, []);
+      groups.get(parentId).push(category);
+    });
+    return groups;
+  }, [categories]);
+
   const renderCategory = (category, level = 0) => {
     return (
       <div key={category.id} style={{ marginLeft: level * 20 }}>
@@ -19,19 +30,16 @@ const CategoryTree = ({ onSelect }) => {
         >
           {category.name}
         </div>
-        {category.subcategories.map(subId => {
-          const subCategory = categories.find(cat => cat.id === subId);
-          return subCategory ? renderCategory(subCategory, level + 1) : null;
-        })}
+        {(childrenByParent.get(category.id) || []).map(subCategory =>
+          renderCategory(subCategory, level + 1)
+        )}
       </div>
     );
   };
 
   return (
     <div>
-      {categories
-        .filter(category => !category.parent)
-        .map(category => renderCategory(category))}
+      {(childrenByParent.get(null) || []).map(category => renderCategory(category))}
     </div>
   );
 };
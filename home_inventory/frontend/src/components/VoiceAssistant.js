@@ -3,6 +3,8 @@ import axios from "axios";
 import { IconButton, CircularProgress, Snackbar, Alert } from "@mui/material";
 import MicIcon from "@mui/icons-material/Mic";
 
+const POLL_INTERVAL_MS = 1000;
+
 function VoiceAssistant({ onNewItemsAdded }) {
   const [isRecording, setIsRecording] = useState(false);
   const [audioBlob, setAudioBlob] = useState(null);
@@ -57,10 +59,20 @@ function VoiceAssistant({ onNewItemsAdded }) {
         headers: { "Content-Type": "multipart/form-data" },
       });
 
+      // ✅ Processing runs as a background job: poll until it is done
+      let job = response.data;
+      while (job.status === "queued" || job.status === "running") {
+        await new Promise((resolve) => setTimeout(resolve, POLL_INTERVAL_MS));
+        job = (await axios.get(`http://localhost:8000/api/jobs/${job.id}/`)).data;
+      }
+      if (job.status !== "succeeded") {
+        throw new Error(job.error);
+      }
+
       setSnackbarMessage("Items added successfully!");
       setSnackbarSeverity("success");
       setSnackbarOpen(true);
-      onNewItemsAdded(response.data);
+      if (onNewItemsAdded) onNewItemsAdded(job.items);
     } catch (error) {
       console.error("Error adding items:", error);
       setSnackbarMessage("Failed to process voice input.");
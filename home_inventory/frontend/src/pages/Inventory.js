@@ -1,18 +1,21 @@
-import React, { useEffect, useState } from "react";
+import React, { useEffect, useRef, useState } from "react";
 import axios from "axios";
-import { Container, Typography } from "@mui/material";
+import { Button, Container, Typography } from "@mui/material";
 import InventoryGrid from "../components/InventoryGrid";
+import { applyChange, subscribeToChanges } from "../utils/changeFeed";
 
 function Inventory() {
   const [items, setItems] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
+  const [nextPage, setNextPage] = useState(null);
 
-  // ✅ Fetch all items from the backend
-  useEffect(() => {
+  // ✅ Fetch the first page of items from the backend (cursor paginated)
+  const loadFirstPage = () => {
     axios.get("http://localhost:8000/api/items/")
       .then(response => {
-        setItems(response.data);  // ✅ API already provides `location_name` and `room_name`
+        setItems(response.data.results);  // ✅ API already provides `location_name` and `room_name`
+        setNextPage(response.data.next);
         setLoading(false);
       })
       .catch(error => {
@@ -20,19 +23,41 @@ function Inventory() {
         setError("Failed to fetch items.");
         setLoading(false);
       });
-  }, []);
+  };
+
+  useEffect(loadFirstPage, []);
+
+  // ✅ Patch the list with edits made here or on other devices; reload only if events were missed
+  const nextPageRef = useRef(null);
+  nextPageRef.current = nextPage;
+  useEffect(() => subscribeToChanges(["item"], (change) => {
+    // New items sort last: only add them once the last page is loaded
+    if (change.action === "created" && nextPageRef.current) return;
+    setItems((prevItems) => applyChange(prevItems, change));
+  }, loadFirstPage), []);
+
+  // ✅ Append the next page when the user asks for more
+  const handleLoadMore = () => {
+    axios.get(nextPage)
+      .then(response => {
+        setItems((prevItems) => [...prevItems, ...response.data.results]);
+        setNextPage(response.data.next);
+      })
+      .catch(() => alert("Failed to load more items."));
+  };
 
-  // ✅ Handle deleting an item
+  // ✅ Handle deleting an item (the change feed also removes it)
   const handleDeleteItem = (itemId) => {
     axios.delete(`http://localhost:8000/api/items/${itemId}/`)
-      .then(() => setItems(items.filter((item) => item.id !== itemId)))
+      .then(() => setItems((prevItems) => prevItems.filter((item) => item.id !== itemId)))
       .catch(() => alert("Failed to delete item."));
   };
 
-  // ✅ Handle updating an item
+  // ✅ Handle updating an item; keep the server's version of it
   const handleUpdateItem = (updatedItem) => {
     axios.put(`http://localhost:8000/api/items/${updatedItem.id}/`, updatedItem)
-      .then(() => setItems(items.map((item) => (item.id === updatedItem.id ? updatedItem : item))))
+      .then((response) => setItems((prevItems) => applyChange(prevItems, {
+        action: "updated", pk: updatedItem.id, data: response.data })))
       .catch(() => alert("Failed to update item."));
   };
 
@@ -45,6 +70,11 @@ function Inventory() {
         Full Inventory Overview
       </Typography>
       <InventoryGrid items={items} onDelete={handleDeleteItem} onUpdate={handleUpdateItem} />
+      {nextPage && (
+        <Button variant="outlined" sx={{ mt: 2 }} onClick={handleLoadMore}>
+          Load more
+        </Button>
+      )}
     </Container>
   );
 }
@@ -1,6 +1,7 @@
 import React, { useEffect, useState } from "react";
 import axios from "axios";
 import { useParams, useNavigate } from "react-router-dom";
+import { fetchAllPages } from "../utils/pagination";
 import {
   Container,
   Typography,
@@ -76,7 +77,7 @@ function ItemDetail() {
 
     // ✅ Fetch Rooms & Locations
     axios.get("http://localhost:8000/api/rooms/").then(response => setRooms(response.data));
-    axios.get("http://localhost:8000/api/locations/").then(response => setLocations(response.data));
+    fetchAllPages("http://localhost:8000/api/locations/?page_size=1000").then(setLocations);
   }, [id]);
 
   // ✅ Update location dropdown when room selection changes
@@ -0,0 +1,18 @@
+// ✅ Subscribe to the backend's change feed (Server-Sent Events, /api/events/).
+// `onChange` gets {action, model, pk, data} for every create/update/delete;
+// `onReset` is called when events were missed and the state should be reloaded.
+// EventSource reconnects by itself and resumes after the last event it saw.
+export function subscribeToChanges(models, onChange, onReset) {
+  if (typeof EventSource === "undefined") return () => {};  // e.g. jsdom in tests
+  const source = new EventSource(`http://localhost:8000/api/events/?models=${models.join(",")}`);
+  source.addEventListener("change", (message) => onChange(JSON.parse(message.data)));
+  source.addEventListener("reset", () => onReset && onReset());
+  return () => source.close();
+}
+
+// ✅ Apply one item change to a list that is ordered by id
+export function applyChange(list, { action, pk, data }) {
+  if (action === "deleted") return list.filter((row) => row.id !== pk);
+  if (list.some((row) => row.id === pk)) return list.map((row) => (row.id === pk ? data : row));
+  return action === "created" ? [...list, data] : list;
+}
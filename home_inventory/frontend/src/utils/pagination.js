@@ -0,0 +1,13 @@
+import axios from "axios";
+
+// ✅ Follow the API's `next` cursor links and collect every page's results
+export async function fetchAllPages(url) {
+  const results = [];
+  let next = url;
+  while (next) {
+    const response = await axios.get(next);
+    results.push(...response.data.results);
+    next = response.data.next;
+  }
+  return results;
+}
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -44,6 +45,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'inventory_app.middleware.RequestMetricsMiddleware',  # Server-Timing + per-request logs
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -52,8 +54,28 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
+    'inventory_app.middleware.ReplicaReadMiddleware',
 ]
 
+# One JSON line per request with its SQL count and timings
+# (inventory_app.middleware.RequestMetricsMiddleware); off unless the level is
+# lowered, e.g. INVENTORY_REQUEST_LOG_LEVEL=INFO.
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'inventory_app.requests': {
+            'handlers': ['console'],
+            'level': os.environ.get('INVENTORY_REQUEST_LOG_LEVEL', 'WARNING'),
+            'propagate': False,
+        },
+    },
+}
+
 ROOT_URLCONF = 'home_inventory.urls'
 
 TEMPLATES = [
@@ -78,13 +100,81 @@ WSGI_APPLICATION = 'home_inventory.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+# INVENTORY_DB_PROFILE=production applies the SQLite pragmas below on every new
+# connection and keeps connections open between requests. INVENTORY_DB_REPLICA
+# (a path) adds a read-only 'replica' database, e.g. a litestream or
+# `sqlite3 .backup` copy of the primary file; GET requests to the API read
+# from it (inventory_app.routers.ReplicaRouter) and may see its lag, except
+# for INVENTORY_REPLICA_PIN_SECONDS (default 15) after the client's own write.
+
+DB_PROFILE = os.environ.get('INVENTORY_DB_PROFILE', 'development')
+
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',  # readers no longer block the writer
+    'synchronous': 'NORMAL',  # safe with WAL, fsync only at checkpoints
+    'mmap_size': 268435456,  # 256 MiB
+    'cache_size': -65536,  # negative: in KiB, i.e. 64 MiB per connection
+    'busy_timeout': 5000,  # ms to wait for a lock instead of "database is locked"
+}
+
+
+def sqlite_database(name, profile=DB_PROFILE, read_only=False):
+    database = {'ENGINE': 'django.db.backends.sqlite3', 'NAME': name}
+    if profile == 'production':
+        pragmas = dict(SQLITE_PRAGMAS, **({'query_only': 'ON'} if read_only else {}))
+        database['OPTIONS'] = {
+            'init_command': ';'.join(f'PRAGMA {key}={value}' for key, value in pragmas.items()),
+        }
+        if not read_only:
+            # Take the write lock at BEGIN, so busy_timeout applies instead of
+            # failing when a read transaction later tries to write
+            database['OPTIONS']['transaction_mode'] = 'IMMEDIATE'
+        database['CONN_MAX_AGE'] = int(os.environ.get('INVENTORY_DB_CONN_MAX_AGE', 600))
+        database['CONN_HEALTH_CHECKS'] = True
+    return database
+
+
 DATABASES = {
+    'default': sqlite_database(os.environ.get('INVENTORY_DB_PATH', BASE_DIR / 'db.sqlite3')),
+}
+
+DATABASE_ROUTERS = []
+
+if os.environ.get('INVENTORY_DB_REPLICA'):
+    DATABASES['replica'] = dict(
+        sqlite_database(os.environ['INVENTORY_DB_REPLICA'], read_only=True),
+        TEST={'MIRROR': 'default'})
+    DATABASE_ROUTERS = ['inventory_app.routers.ReplicaRouter']
+
+
+# Caches
+# The 'responses' cache holds serialized room, location and category responses
+# (inventory_app/response_cache.py). Any Django cache backend works, e.g.
+# FileBasedCache, or RedisCache against a local Redis-compatible server.
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'responses': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'inventory-responses',
+        'TIMEOUT': 3600,
+    },
 }
 
+INVENTORY_RESPONSE_CACHE = 'responses'
+
+# Item, location and room lists are built from values() rows instead of the
+# serializers (inventory_app/fastpath.py) and rendered with orjson.
+INVENTORY_FAST_LIST = True
+
+# Change events for /api/events/ (inventory_app/events.py). The in-process
+# broker serves the subscribers of one ASGI process and replays the last
+# INVENTORY_EVENT_BUFFER events to reconnecting clients.
+INVENTORY_EVENT_BROKER = 'inventory_app.events.InProcessBroker'
+INVENTORY_EVENT_BUFFER = 1000
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
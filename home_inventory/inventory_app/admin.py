@@ -19,10 +19,12 @@ class LocationAdmin(admin.ModelAdmin):
     # Autocomplete for room and parent_location
     autocomplete_fields = ['room', 'parent_location']
     ordering = ('name',)  # Sort by name for clarity
+    # Room name comes from the denormalized effective_room in the same join
+    list_select_related = ('effective_room', 'parent_location')
 
     def get_room_display(self, obj):
         """Display the inherited room in the admin list view."""
-        room = obj.get_room()
+        room = obj.effective_room
         return room.name if room else 'None'
     get_room_display.short_description = 'Room'
 
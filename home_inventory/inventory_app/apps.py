@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class InventoryAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'inventory_app'
+
+    def ready(self):
+        from . import receivers  # noqa: F401  (connects the signal receivers)
@@ -0,0 +1,198 @@
+"""
+Endpoint benchmarks over seeded data (seed.py).
+
+``run()`` seeds each scale into the current database, then requests every
+route of inventory_app/urls.py in-process: ``repeat`` timed runs, whose
+median and minimum are reported, plus one run under tracemalloc for the peak
+Python memory. Query counts come from the request metrics (metrics.py).
+``compare()`` checks a run against a saved baseline; see the
+``benchmark_inventory`` command.
+"""
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+
+import django
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from rest_framework.test import APIClient
+
+from . import metrics, response_cache, voice_cache
+from .models import Category, Item, Location, LocationClosure, Room, VoiceJob
+from .seed import SCALES, clear_inventory, seed_inventory
+
+# (route name, method, path); paths are formatted with sample_ids()
+ROUTES = [
+    ('api-root', 'get', '/'),
+    ('room-list', 'get', '/api/rooms/'),
+    ('room-detail', 'get', '/api/rooms/{room}/'),
+    ('location-list', 'get', '/api/locations/'),
+    ('location-detail', 'get', '/api/locations/{location}/'),
+    ('location-tree', 'get', '/api/locations/tree/'),
+    ('location-items', 'get', '/api/locations/{location}/items/?recursive=1'),
+    ('location-ancestors', 'get', '/api/locations/{sublocation}/ancestors/'),
+    ('location-move', 'post', '/api/locations/{subtree}/move/'),
+    ('item-list', 'get', '/api/items/'),
+    ('item-detail', 'get', '/api/items/{item}/'),
+    ('item-bulk', 'post', '/api/items/bulk/'),
+    ('item-search', 'get', '/api/items/search/?q=drill'),
+    ('category-list', 'get', '/api/categories/'),
+    ('category-detail', 'get', '/api/categories/{category}/'),
+    ('stats-list', 'get', '/api/stats/'),
+    ('stats-rooms', 'get', '/api/stats/rooms/'),
+    ('stats-locations', 'get', '/api/stats/locations/'),
+    ('stats-categories', 'get', '/api/stats/categories/'),
+    ('voicejob-detail', 'get', '/api/jobs/{job}/'),
+    ('voicejob-cache', 'get', '/api/jobs/cache/'),
+    ('voice_add_item', 'post', '/api/voice-add-item/'),
+    ('export_inventory', 'get', '/api/export/?format=jsonl'),
+    ('import_inventory', 'post', '/api/import/'),
+    ('cache_stats', 'get', '/api/cache/stats/'),
+    ('sync_changes', 'get', '/api/sync/'),
+    ('rooms_overview', 'get', '/rooms/'),
+    ('room_detail', 'get', '/rooms/{room}/'),
+]
+# Routes left out: the change event stream never ends
+OPEN_ENDED = ('change_events',)
+DEFAULT_SCALES = ('tiny', 'small')
+
+
+def sample_ids():
+    """
+    Ids for the detail routes: a typical room, location, item and category, the
+    deepest sublocation, and a second-level location whose subtree is moved
+    between the first and last top-level locations.
+    """
+    top_level = Location.objects.filter(parent_location=None).order_by('id').values_list('id', flat=True)
+    job = VoiceJob.objects.create(status=VoiceJob.STATUS_SUCCEEDED,
+                                  item_ids=list(Item.objects.order_by('id').values_list('id', flat=True)[:5]))
+    return {
+        'room': Room.objects.order_by('id').values_list('id', flat=True)[Room.objects.count() // 2],
+        'location': top_level[0],
+        'last_location': top_level.reverse()[0],
+        'sublocation': LocationClosure.objects.order_by('-depth', 'descendant_id').values_list(
+            'descendant_id', flat=True)[0],
+        'subtree': Location.objects.filter(parent_location__parent_location=None).exclude(
+            parent_location=None).order_by('id').values_list('id', flat=True)[0],
+        'item': Item.objects.order_by('id').values_list('id', flat=True)[Item.objects.count() // 2],
+        'category': Category.objects.order_by('id').values_list('id', flat=True)[0],
+        'job': job.pk,
+    }
+
+
+class RouteRunner:
+    """Issues the requests of ROUTES; write routes get a fresh body on every call."""
+
+    def __init__(self, ids):
+        self.client = APIClient()
+        self.ids = ids
+        self.calls = 0
+        self.moved = False
+
+    def body(self, name):
+        self.calls += 1
+        if name == 'item-bulk':
+            return {'data': [{"name": f"Benchmark {self.calls}.{i}", "location": self.ids['location']}
+                             for i in range(10)], 'format': 'json'}
+        if name == 'location-move':
+            # Back and forth, so every call is a real move
+            self.moved = not self.moved
+            target = self.ids['last_location'] if self.moved else self.ids['location']
+            return {'data': {'parent_location': target}, 'format': 'json'}
+        if name == 'voice_add_item':
+            audio = json.dumps({"items": [{"name": f"Dictated {self.calls}", "quantity": 1}]})
+            return {'data': {'audio': SimpleUploadedFile('note.wav', audio.encode())}, 'format': 'multipart'}
+        if name == 'import_inventory':
+            rows = ''.join(f"Imported {self.calls}.{i}\n" for i in range(10))
+            return {'data': {'file': SimpleUploadedFile('items.csv', f"name\n{rows}".encode())},
+                    'format': 'multipart'}
+        return {}
+
+    def request(self, name, method, path):
+        """One request with the response cache cleared; returns (RequestMetrics, status)."""
+        response_cache.get_cache().clear()
+        with metrics.collect() as recorded:
+            response = getattr(self.client, method)(path.format(**self.ids), **self.body(name))
+            if response.streaming:
+                b''.join(response.streaming_content)
+        return recorded, response.status_code
+
+
+def measure(runner, name, method, path, repeat):
+    times, status = [], None
+    for _ in range(repeat):
+        recorded, status = runner.request(name, method, path)
+        times.append(recorded.total_time * 1000)
+    tracemalloc.start()
+    try:
+        runner.request(name, method, path)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        'median_ms': round(statistics.median(times), 2),
+        'min_ms': round(min(times), 2),
+        'queries': recorded.sql_count,
+        'peak_kib': round(peak / 1024, 1),
+        'status': status,
+    }
+
+
+def run(scales=DEFAULT_SCALES, repeat=5, seed=0, routes=None, log=None):
+    """Seed and benchmark each scale in turn; returns the report as a JSON-ready dict."""
+    report = {
+        'meta': {'python': platform.python_version(), 'django': django.get_version(),
+                 'repeat': repeat, 'seed': seed},
+        'scales': {},
+    }
+    with override_settings(INVENTORY_JOBS_EAGER=True,
+                           INVENTORY_VOICE_PROVIDER='inventory_app.providers.StubProvider'):
+        for scale in scales:
+            clear_inventory()
+            voice_cache.clear()
+            start = time.perf_counter()
+            rows = seed_inventory(SCALES[scale], seed=seed).as_dict()
+            if log:
+                log(f"{scale}: seeded {rows} in {time.perf_counter() - start:.1f}s")
+            runner = RouteRunner(sample_ids())
+            results = {}
+            for name, method, path in ROUTES:
+                if routes and name not in routes:
+                    continue
+                results[name] = measure(runner, name, method, path, repeat)
+                if log:
+                    log(f"{scale:>8} {name:<20} {results[name]['median_ms']:>9.2f} ms "
+                        f"{results[name]['queries']:>3} queries {results[name]['peak_kib']:>10.1f} KiB")
+            report['scales'][scale] = {'rows': rows, 'routes': results}
+    return report
+
+
+def compare(report, baseline, tolerance=0.25, min_ms=2.0, min_kib=256.0):
+    """
+    Regressions of ``report`` against ``baseline``, as messages: any extra
+    query, and time or peak memory above the baseline by more than
+    ``tolerance`` (a fraction) and the absolute floor ``min_ms``/``min_kib``.
+    Routes or scales missing from either side are skipped.
+    """
+    regressions = []
+    for scale, current in report['scales'].items():
+        base_routes = baseline.get('scales', {}).get(scale, {}).get('routes', {})
+        for name, result in current['routes'].items():
+            base = base_routes.get(name)
+            if base is None:
+                continue
+            if result['queries'] > base['queries']:
+                regressions.append(f"{scale} {name}: {result['queries']} queries, baseline {base['queries']}")
+            if (result['median_ms'] > base['median_ms'] * (1 + tolerance)
+                    and result['median_ms'] - base['median_ms'] > min_ms):
+                regressions.append(
+                    f"{scale} {name}: {result['median_ms']} ms, baseline {base['median_ms']} ms")
+            if (result['peak_kib'] > base['peak_kib'] * (1 + tolerance)
+                    and result['peak_kib'] - base['peak_kib'] > min_kib):
+                regressions.append(
+                    f"{scale} {name}: peak {result['peak_kib']} KiB, baseline {base['peak_kib']} KiB")
+            if result['status'] >= 400:
+                regressions.append(f"{scale} {name}: status {result['status']}")
+    return regressions
@@ -0,0 +1,155 @@
+"""
+Bulk item writes for ``/api/items/bulk/``.
+
+Each operation validates every row in one pass, reports errors per row (a
+list aligned with the input, ``{}`` for valid rows) and writes nothing unless
+all rows are valid. Writes go through ``bulk_create``/``bulk_update`` or
+grouped ``UPDATE``s inside one transaction, and ``items_bulk_changed`` is sent
+once so the rollups (and any other listeners) catch up.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Model
+
+from . import rollups
+from .models import Category, Item, Location
+from .serializers import ItemSerializer
+from .signals import bulk_write, items_bulk_changed
+
+MAX_ROWS = 1000
+
+
+class BulkError(Exception):
+    def __init__(self, errors):
+        super().__init__(errors)
+        self.errors = errors
+
+
+def _related_objects(rows):
+    """Preload every location and category the rows refer to, one query per model."""
+    ids = {Location: set(), Category: set()}
+    for row in rows:
+        if not isinstance(row, dict):
+            continue
+        for field, model in (('location', Location), ('category', Category)):
+            value = row.get(field)
+            if isinstance(value, int) and not isinstance(value, bool):
+                ids[model].add(value)
+            elif isinstance(value, str) and value.isdigit():
+                ids[model].add(int(value))
+    return {model: model.objects.in_bulk(pks) for model, pks in ids.items()}
+
+
+def _item_id(value):
+    """``value`` if it is an item id (an int, not a bool), else None."""
+    return value if type(value) is int else None
+
+
+def _id_error(pk, known):
+    if pk is None:
+        return {"id": ["A valid integer is required."]}
+    return {} if pk in known else {"id": ["Unknown item id."]}
+
+
+def _check_rows(rows):
+    if not isinstance(rows, list) or not rows:
+        raise BulkError({"non_field_errors": ["Expected a non-empty list."]})
+    if len(rows) > MAX_ROWS:
+        raise BulkError({"non_field_errors": [f"At most {MAX_ROWS} rows per request."]})
+
+
+def _notify(created=(), updated=(), deleted=(), before=()):
+    items_bulk_changed.send(
+        sender=Item, created=list(created), updated=list(updated),
+        deleted=list(deleted), before=list(before))
+
+
+def create_items(rows, context):
+    """Validate and insert ``rows``; returns the created items."""
+    _check_rows(rows)
+    context = {**context, 'related_objects': _related_objects(rows)}
+    serializer = ItemSerializer(data=rows, many=True, context=context)
+    if not serializer.is_valid():
+        raise BulkError(serializer.errors)
+    with transaction.atomic(), bulk_write():
+        items = Item.objects.bulk_create(
+            [Item(**attrs) for attrs in serializer.validated_data], batch_size=500)
+        _notify(created=[item.pk for item in items])
+    return items
+
+
+def update_items(rows, context):
+    """
+    Apply partial updates (each row carries its ``id``); returns the updated ids.
+
+    Rows that make the same change (say, moving 300 items to one location)
+    become a single ``UPDATE ... WHERE id IN (...)``; the remaining one-off
+    changes are written with one ``bulk_update``.
+    """
+    _check_rows(rows)
+    ids = [_item_id(row.get('id')) if isinstance(row, dict) else None for row in rows]
+    instances = Item.objects.in_bulk([pk for pk in ids if pk is not None])
+    context = {**context, 'related_objects': _related_objects(rows)}
+
+    errors, changes = [], {}
+    for row, pk in zip(rows, ids):
+        error = _id_error(pk, instances)
+        if error:
+            errors.append(error)
+            continue
+        if pk in changes:
+            errors.append({"id": ["Duplicate item id."]})
+            continue
+        data = {key: value for key, value in row.items() if key != 'id'}
+        serializer = ItemSerializer(instances[pk], data=data, partial=True, context=context)
+        if serializer.is_valid():
+            errors.append({})
+            changes[pk] = serializer.validated_data
+        else:
+            errors.append(serializer.errors)
+    if any(errors):
+        raise BulkError(errors)
+
+    groups = defaultdict(list)
+    for pk, attrs in changes.items():
+        key = frozenset((field, value.pk if isinstance(value, Model) else value)
+                        for field, value in attrs.items())
+        groups[key].append(pk)
+
+    with transaction.atomic(), bulk_write():
+        before = rollups.item_states(list(instances))
+        one_off, one_off_fields = [], set()
+        for key, pks in groups.items():
+            if not key:
+                continue
+            if len(pks) > 1:
+                Item.objects.filter(id__in=pks).update(
+                    **{f'{field}_id' if field in ('location', 'category') else field: value
+                       for field, value in key})
+            else:
+                instance = instances[pks[0]]
+                for field, value in changes[pks[0]].items():
+                    setattr(instance, field, value)
+                    one_off_fields.add(field)
+                one_off.append(instance)
+        if one_off:
+            Item.objects.bulk_update(one_off, sorted(one_off_fields), batch_size=500)
+        _notify(updated=list(instances), before=before)
+    return list(instances)
+
+
+def delete_items(ids):
+    """Delete the given item ids; returns them."""
+    _check_rows(ids)
+    ids = [_item_id(pk) for pk in ids]
+    existing = set(Item.objects.filter(id__in=[pk for pk in ids if pk is not None])
+                   .values_list('id', flat=True))
+    errors = [_id_error(pk, existing) for pk in ids]
+    if any(errors):
+        raise BulkError(errors)
+    with transaction.atomic(), bulk_write():
+        before = rollups.item_states(existing)
+        Item.objects.filter(id__in=existing).delete()
+        _notify(deleted=existing, before=before)
+    return sorted(existing)
@@ -0,0 +1,69 @@
+import hashlib
+import time
+
+from django.utils.http import http_date, parse_etags, parse_http_date_safe, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+from . import versions
+
+
+class NotModified(Exception):
+    pass
+
+
+class ConditionalGetMixin:
+    """
+    ``ETag``/``Last-Modified`` validators for a viewset's GET requests, built
+    from the version stamps of ``version_models`` (every model the responses
+    are read from) and the request URL. A matching ``If-None-Match`` or
+    ``If-Modified-Since`` is answered with 304 before the queryset is touched
+    or anything is serialized.
+
+    ``Last-Modified`` has one-second resolution, so it is only sent (and
+    ``If-Modified-Since`` only honoured) once the second of the last change
+    is over; until then a second write in the same second would leave it
+    unchanged. The ETag covers that second.
+    """
+    version_models = ()
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.validators = None
+        if request.method not in ('GET', 'HEAD') or not self.version_models:
+            return
+        vector, last_modified = versions.current(self.version_models)
+        key = f"{request.get_full_path()}|{request.accepted_renderer.format}|{vector}"
+        etag = quote_etag(hashlib.sha1(key.encode()).hexdigest())
+        last_modified = int(last_modified.timestamp()) if last_modified else None
+        if last_modified is not None and time.time() < last_modified + 1:
+            last_modified = None
+        self.validators = (etag, last_modified)
+        if _not_modified(request, etag, last_modified):
+            raise NotModified()
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            return Response(status=status.HTTP_304_NOT_MODIFIED)
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        validators = getattr(self, 'validators', None)
+        if validators and response.status_code in (200, 304):
+            etag, last_modified = validators
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+            # Let browsers keep the body but revalidate on every use
+            response['Cache-Control'] = 'private, no-cache'
+        return response
+
+
+def _not_modified(request, etag, last_modified):
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match:
+        tags = parse_etags(if_none_match)
+        return '*' in tags or etag in tags or etag in [tag.removeprefix('W/') for tag in tags]
+    since = parse_http_date_safe(request.headers.get('If-Modified-Since') or '')
+    return since is not None and last_modified is not None and last_modified <= since
@@ -0,0 +1,224 @@
+"""
+Change events for Item, Location, Room and Category.
+
+Model signals (see receivers.py) turn every committed create, update or
+delete into an event ``{"id", "action", "model", "pk", "data"}``, where
+``data`` is the object as the API serializes it (None for deletes). Events go
+to the broker selected with ``INVENTORY_EVENT_BROKER``; the default
+InProcessBroker fans them out to the subscribers of this process and keeps
+the last ``INVENTORY_EVENT_BUFFER`` events, so a reconnecting client can
+resume from its ``Last-Event-ID``. Another broker (say, one backed by a
+local Redis-compatible server, for several worker processes) only has to
+implement ``EventBroker``.
+
+Nothing is serialized or published while the broker reports no
+subscribers. A subtree move (Location.move_to, a re-parented category)
+publishes an update of the moved object only; clients holding its
+descendants should refetch them. ``/api/events/`` streams the events as Server-Sent Events;
+it needs the ASGI application (asgi.py).
+"""
+import asyncio
+import json
+import threading
+from collections import deque
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+from rest_framework.utils.encoders import JSONEncoder
+
+MODELS = ('item', 'location', 'room', 'category')
+CREATED, UPDATED, DELETED = 'created', 'updated', 'deleted'
+
+
+class EventBroker:
+    """Interface for publishing change events and subscribing to them."""
+
+    def active(self):
+        """Whether anyone may be listening; when False, events are not even built."""
+        return True
+
+    def publish(self, event):
+        """Deliver ``event`` (a dict without ``id``); may be called from any thread."""
+        raise NotImplementedError
+
+    def subscribe(self, last_event_id=None):
+        """
+        A Subscription to the events after ``last_event_id`` (all new ones if
+        None). Must be called from the event loop that will read it.
+        """
+        raise NotImplementedError
+
+
+class Subscription:
+    """
+    Async iterator over the events of one subscriber. It yields ``None`` in
+    place of events that were lost (buffer overrun or a slow reader); the
+    client should then reload its state.
+    """
+
+    def __init__(self, broker, maxsize):
+        self.broker = broker
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize)
+        self.lost = False
+
+    def put(self, event):
+        # Runs on the subscriber's loop
+        if self.lost:
+            return
+        if self.queue.full():
+            # Too slow: drop what is queued and tell the reader to reload
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.lost = True
+            event = None
+        self.queue.put_nowait(event)
+
+    async def get(self):
+        event = await self.queue.get()
+        if event is None:
+            self.lost = False
+        return event
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self.get()
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class InProcessBroker(EventBroker):
+    """Fans events out to the subscribers in this process; keeps a replay buffer."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.last_id = 0
+        self.buffer = deque(maxlen=getattr(settings, 'INVENTORY_EVENT_BUFFER', 1000))
+        self.subscribers = set()
+        self.queue_size = getattr(settings, 'INVENTORY_EVENT_QUEUE_SIZE', 1000)
+
+    def active(self):
+        return bool(self.subscribers)
+
+    def publish(self, event):
+        with self.lock:
+            self.last_id += 1
+            event = {'id': self.last_id, **event}
+            self.buffer.append(event)
+            subscribers = list(self.subscribers)
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.put, event)
+            except RuntimeError:  # its loop is closed
+                self.unsubscribe(subscription)
+        return event
+
+    def subscribe(self, last_event_id=None):
+        subscription = Subscription(self, self.queue_size)
+        with self.lock:
+            if last_event_id is not None:
+                oldest = self.buffer[0]['id'] if self.buffer else self.last_id + 1
+                if not oldest - 1 <= last_event_id <= self.last_id:
+                    subscription.put(None)  # dropped from the buffer, or ids from before a restart
+                else:
+                    for event in self.buffer:
+                        if event['id'] > last_event_id:
+                            subscription.put(event)
+            self.subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            self.subscribers.discard(subscription)
+
+
+@lru_cache(maxsize=None)
+def _load_broker(path):
+    return import_string(path)()
+
+
+def get_broker():
+    return _load_broker(getattr(settings, 'INVENTORY_EVENT_BROKER', 'inventory_app.events.InProcessBroker'))
+
+
+# Publication (wired to the model signals in receivers.py)
+
+def _serializer_class(model_name):
+    from . import serializers
+    return {
+        'item': serializers.ItemSerializer,
+        'location': serializers.LocationSerializer,
+        'room': serializers.RoomSerializer,
+        'category': serializers.CategorySerializer,
+    }[model_name]
+
+
+def _publish_on_commit(broker, events):
+    transaction.on_commit(lambda: [broker.publish(event) for event in events])
+
+
+def object_changed(instance, action):
+    """Publish the create, update or delete of one instance once the transaction commits."""
+    broker = get_broker()
+    if not broker.active():
+        return
+    model_name = instance._meta.model_name
+    data = None if action == DELETED else dict(_serializer_class(model_name)(instance).data)
+    _publish_on_commit(broker, [{'action': action, 'model': model_name, 'pk': instance.pk, 'data': data}])
+
+
+def objects_changed(model, created=(), updated=(), deleted=()):
+    """Publish bulk writes, serializing the written rows with one queryset per model."""
+    broker = get_broker()
+    if not broker.active():
+        return
+    model_name = model._meta.model_name
+    rows = {}
+    if created or updated:
+        serializer_class = _serializer_class(model_name)
+        queryset = model.objects.filter(pk__in=[*created, *updated])
+        if hasattr(serializer_class, 'query_plan'):
+            select, prefetch = serializer_class.query_plan(None, ())
+            queryset = queryset.select_related(*select).prefetch_related(*prefetch)
+        rows = {row['id']: dict(row) for row in serializer_class(queryset, many=True).data}
+    events = [{'action': action, 'model': model_name, 'pk': pk, 'data': rows.get(pk)}
+              for action, pks in ((CREATED, created), (UPDATED, updated)) for pk in pks]
+    events += [{'action': DELETED, 'model': model_name, 'pk': pk, 'data': None} for pk in deleted]
+    _publish_on_commit(broker, events)
+
+
+# Server-Sent Events
+
+def format_event(event):
+    """One SSE message; ``None`` (lost events) becomes a ``reset`` event."""
+    if event is None:
+        return b'event: reset\ndata: {}\n\n'
+    return f"id: {event['id']}\nevent: change\ndata: {json.dumps(event, cls=JSONEncoder)}\n\n".encode()
+
+
+async def event_stream(broker, last_event_id=None, models=None, keepalive=15.0):
+    """
+    SSE bytes: matching events, resets and a comment every ``keepalive``
+    seconds. Subscribes on first iteration, so the subscription belongs to
+    the loop that serves the response (views behind sync middleware run on
+    a loop of their own).
+    """
+    subscription = broker.subscribe(last_event_id)
+    try:
+        yield b'retry: 3000\n\n'
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.get(), keepalive)
+            except asyncio.TimeoutError:
+                yield b': keepalive\n\n'
+                continue
+            if event is not None and models and event['model'] not in models:
+                continue
+            yield format_event(event)
+    finally:
+        subscription.close()
@@ -0,0 +1,96 @@
+"""
+Streaming export of the whole inventory as CSV or JSON lines.
+
+Items are read with ``QuerySet.iterator()`` as plain value rows. Location and
+category paths come from lookup tables built once per export (one query each),
+so there are no per-row queries and memory does not grow with the item count.
+"""
+import csv
+import json
+from decimal import Decimal
+from itertools import islice
+
+from rest_framework.utils.encoders import JSONEncoder
+
+from .models import Category, Item, Location
+
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson',
+}
+# Separator between the names in a location or category path
+PATH_SEPARATOR = ' > '
+ITEM_COLUMNS = ('id', 'name', 'description', 'serial_number', 'purchase_date',
+                'purchase_price', 'current_value', 'quantity', 'notes')
+COLUMNS = ITEM_COLUMNS + ('room', 'location_path', 'category_path')
+CHUNK_SIZE = 1000
+
+
+def location_paths():
+    """{location id: (room name, "Shelf > Box")} for every location, from one query."""
+    rows = {pk: (name, parent_id, room) for pk, name, parent_id, room in
+            Location.objects.values_list('id', 'name', 'parent_location_id', 'effective_room__name')}
+    names = {}
+
+    def path(pk):
+        if pk not in names:
+            name, parent_id, _ = rows[pk]
+            names[pk] = f"{path(parent_id)}{PATH_SEPARATOR}{name}" if parent_id in rows else name
+        return names[pk]
+
+    return {pk: (room, path(pk)) for pk, (_, _, room) in rows.items()}
+
+
+def category_paths():
+    """{category id: "Tools > Drills"} for every category, from one query."""
+    rows = list(Category.objects.order_by().values_list('id', 'name', 'path'))
+    names = {pk: name for pk, name, _ in rows}
+    return {
+        pk: PATH_SEPARATOR.join(names[int(part)] for part in path.split('/') if part)
+        for pk, _, path in rows
+    }
+
+
+def export_rows(queryset=None, chunk_size=CHUNK_SIZE):
+    """Yield one dict per item, with COLUMNS as keys, in id order."""
+    queryset = Item.objects.all() if queryset is None else queryset
+    locations = location_paths()
+    categories = category_paths()
+    values = queryset.order_by('id').values_list(*ITEM_COLUMNS, 'location_id', 'category_id')
+    for row in values.iterator(chunk_size=chunk_size):
+        room, location_path = locations.get(row[-2], (None, None))
+        yield dict(zip(COLUMNS, row[:-2] + (room, location_path, categories.get(row[-1]))))
+
+
+class _ExportEncoder(JSONEncoder):
+    """Decimals as strings, as the API renders them, so prices keep their exact value."""
+
+    def default(self, obj):
+        if isinstance(obj, Decimal):
+            return str(obj)
+        return super().default(obj)
+
+
+class _Echo:
+    """File-like object whose write() hands the line back to the csv writer."""
+
+    def write(self, value):
+        return value
+
+
+def iter_export(fmt, queryset=None, chunk_size=CHUNK_SIZE):
+    """Yield the encoded export in chunks of ``chunk_size`` rows."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format '{fmt}'.")
+    rows = export_rows(queryset, chunk_size)
+    if fmt == 'csv':
+        writer = csv.writer(_Echo())
+        yield writer.writerow(COLUMNS)
+        encode = lambda row: writer.writerow(['' if v is None else v for v in row.values()])  # noqa: E731
+    else:
+        encode = lambda row: json.dumps(row, cls=_ExportEncoder, ensure_ascii=False) + '\n'  # noqa: E731
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        yield ''.join(encode(row) for row in chunk)
@@ -0,0 +1,265 @@
+"""
+Read-only fast path for list actions: rows are read with ``values()`` and
+turned into the serializer's output by encoders compiled once per serializer
+and field selection, instead of per-object ``to_representation`` calls.
+
+The encoders reproduce DRF's output exactly, including fields that DRF skips
+when an intermediate relation on their source is NULL (``location_name`` of
+an item without a location). Serializers or fields the compiler does not
+understand make it return ``None`` and the view falls back to the serializer.
+
+FastJSONRenderer renders these plain rows with orjson, which produces the
+same bytes as DRF's JSONRenderer for str/int/bool/None data.
+"""
+import datetime
+import decimal
+from functools import lru_cache
+
+import orjson
+from django.conf import settings
+from rest_framework import fields as drf_fields, relations, serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.settings import ISO_8601, api_settings
+
+from . import metrics
+
+
+class Unsupported(Exception):
+    pass
+
+
+def _identity(value):
+    return value
+
+
+def _decimal_encoder(field):
+    if not getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING) or field.localize or field.normalize_output or field.decimal_places is None:
+        return field.to_representation
+    exponent = -field.decimal_places
+
+    def encode(value):
+        # Values read from a DecimalField column are already quantized
+        if isinstance(value, decimal.Decimal) and value.as_tuple().exponent == exponent:
+            return '{:f}'.format(value)
+        return field.to_representation(value)
+    return encode
+
+
+def _date_encoder(field):
+    if getattr(field, 'format', api_settings.DATE_FORMAT) != ISO_8601:
+        return field.to_representation
+
+    def encode(value):
+        if type(value) is datetime.date:
+            return value.isoformat()
+        return field.to_representation(value)
+    return encode
+
+
+def compile_encoder(field):
+    """A function turning a non-NULL column value into ``field``'s representation."""
+    if isinstance(field, relations.PrimaryKeyRelatedField):
+        if field.pk_field is not None:
+            raise Unsupported(field)
+        return _identity  # the column holds the pk
+    if isinstance(field, relations.RelatedField):
+        raise Unsupported(field)
+    if isinstance(field, (drf_fields.CharField, drf_fields.IntegerField)) and not isinstance(
+            field, drf_fields.ChoiceField):
+        return _identity
+    if isinstance(field, drf_fields.DecimalField):
+        return _decimal_encoder(field)
+    if isinstance(field, drf_fields.DateField):
+        return _date_encoder(field)
+    if isinstance(field, (drf_fields.SerializerMethodField, serializers.BaseSerializer, relations.ManyRelatedField)):
+        raise Unsupported(field)
+    return field.to_representation
+
+
+def _forward_path(model, attrs):
+    """Check that ``attrs`` follows forward relations only, so ``values()`` gives one row per object."""
+    for attr in attrs:
+        if model is None:
+            raise Unsupported(attrs)
+        try:
+            field = model._meta.get_field(attr)
+        except Exception:
+            raise Unsupported(attrs)
+        if field.is_relation and not (field.many_to_one or field.one_to_one) or not field.concrete:
+            raise Unsupported(attrs)
+        model = field.related_model
+
+
+class RowEncoder:
+    """
+    Compiled plan for one serializer: the ``values()`` columns it needs and,
+    per output field, the column, encoder and the columns whose NULL makes
+    DRF skip the field. Reverse relations listed as primary keys and the
+    ``nested`` lists (``{field name: RowEncoder}``) are loaded with one extra
+    query each.
+    """
+
+    def __init__(self, serializer, nested=None):
+        if type(serializer).to_representation is not serializers.Serializer.to_representation:
+            raise Unsupported(serializer)
+        nested = nested or {}
+        self.model = serializer.Meta.model
+        self.pk = self.model._meta.pk.attname
+        self.plan = []
+        self.related = {}
+        columns = [self.pk]
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            if name in nested:
+                self.related[name] = self._relation(name, nested[name])
+                self.plan.append((name, None, None, ()))
+                continue
+            if isinstance(field, relations.ManyRelatedField):
+                child = field.child_relation
+                if not isinstance(child, relations.PrimaryKeyRelatedField) or child.pk_field is not None:
+                    raise Unsupported(field)
+                self.related[name] = self._relation(field.source, None)
+                self.plan.append((name, None, None, ()))
+                continue
+            if field.source == '*':
+                raise Unsupported(field)
+            attrs = field.source_attrs
+            if len(attrs) > 1 and not (field.read_only and field.default is drf_fields.empty
+                                       and not field.allow_null):
+                raise Unsupported(field)  # DRF would fall back to a default or None here
+            _forward_path(self.model, attrs)
+            lookup = '__'.join(attrs)
+            guards = tuple('__'.join(attrs[:i]) for i in range(1, len(attrs)))
+            self.plan.append((name, lookup, compile_encoder(field), guards))
+            columns += [lookup, *guards]
+        self.columns = list(dict.fromkeys(columns))
+
+    def _relation(self, name, encoder):
+        """``(model, foreign key, encoder or None)`` of the reverse relation ``name``."""
+        try:
+            rel = self.model._meta.get_field(name)
+        except Exception:
+            raise Unsupported(name)
+        if not rel.one_to_many or rel.concrete:
+            raise Unsupported(name)
+        return rel.related_model, rel.field, encoder
+
+    def _load_related(self, pks):
+        loaded = {}
+        for name, (model, fk, encoder) in self.related.items():
+            groups = {pk: [] for pk in pks}
+            queryset = model._default_manager.filter(**{f'{fk.name}__in': pks})
+            if encoder is None:
+                for owner, pk in queryset.values_list(fk.attname, model._meta.pk.attname):
+                    groups[owner].append(pk)
+            else:
+                rows = list(queryset.values(*dict.fromkeys([*encoder.columns, fk.attname])))
+                for row, data in zip(rows, encoder.encode(rows)):
+                    groups[row[fk.attname]].append(data)
+            loaded[name] = groups
+        return loaded
+
+    def encode(self, rows):
+        """The serializer's representation of ``rows`` (dicts from ``values(*columns)``)."""
+        related = self._load_related([row[self.pk] for row in rows]) if self.related and rows else {}
+        result = []
+        for row in rows:
+            data = {}
+            for name, lookup, encode, guards in self.plan:
+                if lookup is None:
+                    data[name] = related[name][row[self.pk]]
+                    continue
+                if guards and any(row[guard] is None for guard in guards):
+                    continue  # DRF skips a read-only field whose source hits a NULL relation
+                value = row[lookup]
+                data[name] = None if value is None else encode(value)
+            result.append(data)
+        return result
+
+
+@lru_cache(maxsize=128)
+def row_encoder(serializer_class, fields=None, nested=()):
+    """
+    The RowEncoder for ``serializer_class`` with ``fields`` selected, or None
+    if unsupported. Pass ``fields`` in declaration order (``selected_fields``)
+    so each selection is compiled once, however the client spelled it.
+    """
+    try:
+        return RowEncoder(
+            serializer_class(fields=fields) if fields is not None else serializer_class(),
+            {name: RowEncoder(nested_class()) for name, nested_class in nested})
+    except Unsupported:
+        return None
+
+
+def selected_fields(serializer_class, fields):
+    """The readable fields of ``serializer_class`` named in ``fields``, in declaration order."""
+    if fields is None:
+        return None
+    fields = set(fields)
+    return tuple(name for name in serializer_class.readable_field_names() if name in fields)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer that hands responses marked ``plain_data`` (only str, int,
+    bool, None, lists and dicts) to orjson, which encodes them to the same
+    bytes. Everything else goes through DRF's encoder.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        renderer_context = renderer_context or {}
+        if (data is None or self.ensure_ascii or not self.compact
+                or not getattr(renderer_context.get('response'), 'plain_data', False)
+                or self.get_indent(accepted_media_type, renderer_context) is not None):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data)
+        except orjson.JSONEncodeError:  # e.g. integers beyond 64 bits
+            return super().render(data, accepted_media_type, renderer_context)
+        # Same \u2028/\u2029 escaping as JSONRenderer
+        return ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
+
+
+class FastListMixin:
+    """
+    Serve the list action from ``values()`` rows through a compiled RowEncoder
+    (see above); ``fast_nested`` maps SerializerMethodFields that list a
+    reverse relation to the serializer of its rows. Applies to GET without
+    ``?expand=`` and can be switched off with ``INVENTORY_FAST_LIST = False``.
+    """
+    fast_nested = {}
+
+    def get_renderers(self):
+        return [FastJSONRenderer() if type(renderer) is JSONRenderer else renderer
+                for renderer in super().get_renderers()]
+
+    def get_row_encoder(self):
+        if not getattr(settings, 'INVENTORY_FAST_LIST', True) or self.request.method != 'GET':
+            return None
+        fields, expand = self.get_field_selection() if hasattr(self, 'get_field_selection') else (None, ())
+        if expand:
+            return None
+        serializer_class = self.get_serializer_class()
+        return row_encoder(serializer_class, selected_fields(serializer_class, fields),
+                           tuple(self.fast_nested.items()))
+
+    def list(self, request, *args, **kwargs):
+        encoder = self.get_row_encoder()
+        if encoder is None:
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset()).select_related(None).prefetch_related(None)
+        columns = list(encoder.columns)
+        if self.paginator is not None and hasattr(self.paginator, 'get_ordering'):
+            # Keyset pagination reads the ordering key off the last row
+            columns += [key.lstrip('-') for key in self.paginator.get_ordering(request, queryset, self)]
+        rows = queryset.values(*dict.fromkeys(columns))
+        page = self.paginate_queryset(rows)
+        rows = page if page is not None else list(rows)
+        with metrics.serializer_timing():
+            data = encoder.encode(rows)
+        response = self.get_paginated_response(data) if page is not None else Response(data)
+        response.plain_data = True
+        return response
@@ -0,0 +1,51 @@
+from rest_framework.exceptions import ValidationError
+
+
+class FieldSelectionMixin:
+    """
+    ``?fields=a,b`` and ``?expand=rel`` for a viewset whose serializer uses
+    DynamicFieldsMixin. The queryset's select_related/prefetch_related are
+    taken from the serializer's query plan for the requested output, so
+    joins and nested lookups for fields that were left out are never run.
+    Without the parameters the full representation is returned as before.
+    """
+    fields_query_param = 'fields'
+    expand_query_param = 'expand'
+
+    def get_field_selection(self):
+        """``(fields or None, expand)`` requested by the current request; 400 on unknown names."""
+        if getattr(self, '_field_selection', None) is not None:
+            return self._field_selection
+        serializer_class = self.get_serializer_class()
+        params = self.request.query_params if self.request is not None else {}
+        fields = _names(params.get(self.fields_query_param))
+        expand = _names(params.get(self.expand_query_param))
+        known = {*serializer_class.readable_field_names(), *serializer_class.expandable_fields}
+        unknown = [name for name in fields if name not in known]
+        if unknown:
+            raise ValidationError({self.fields_query_param: [f"Unknown field '{name}'." for name in unknown]})
+        unknown = [name for name in expand if name not in serializer_class.expandable_fields]
+        if unknown:
+            raise ValidationError({self.expand_query_param: [f"Cannot expand '{name}'." for name in unknown]})
+        self._field_selection = (fields or None, tuple(expand))
+        return self._field_selection
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        fields, expand = self.get_field_selection()
+        select, prefetch = self.get_serializer_class().query_plan(fields, expand)
+        if select:
+            queryset = queryset.select_related(*select)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        return queryset
+
+    def get_serializer(self, *args, **kwargs):
+        fields, expand = self.get_field_selection()
+        kwargs.setdefault('fields', fields)
+        kwargs.setdefault('expand', expand)
+        return super().get_serializer(*args, **kwargs)
+
+
+def _names(value):
+    return list(dict.fromkeys(name.strip() for name in (value or '').split(',') if name.strip()))
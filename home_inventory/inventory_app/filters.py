@@ -0,0 +1,91 @@
+import datetime
+import decimal
+
+from django.shortcuts import get_object_or_404
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+from .models import Category, subtree_filter
+
+
+class ItemFilterBackend(BaseFilterBackend):
+    """
+    Query-parameter filters for the item list, each backed by an index:
+
+    ``location``, ``room`` (the location's effective room), ``category``
+    (plus ``include_descendants=1`` for the whole subtree), ``serial_number``,
+    ``purchase_date_after``/``purchase_date_before``, ``price_min``/``price_max``
+    and ``value_min``/``value_max`` (inclusive bounds).
+    """
+    id_filters = {
+        'location': 'location_id',
+        'room': 'location__effective_room_id',
+    }
+    range_filters = {
+        'purchase_date_after': ('purchase_date__gte', datetime.date.fromisoformat),
+        'purchase_date_before': ('purchase_date__lte', datetime.date.fromisoformat),
+        'price_min': ('purchase_price__gte', decimal.Decimal),
+        'price_max': ('purchase_price__lte', decimal.Decimal),
+        'value_min': ('current_value__gte', decimal.Decimal),
+        'value_max': ('current_value__lte', decimal.Decimal),
+    }
+
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+        lookups = {}
+        for param, lookup in self.id_filters.items():
+            if params.get(param):
+                lookups[lookup] = _parse(param, params[param], int)
+        for param, (lookup, parse) in self.range_filters.items():
+            if params.get(param):
+                lookups[lookup] = _parse(param, params[param], parse)
+        if params.get('serial_number'):
+            lookups['serial_number'] = params['serial_number']
+
+        if params.get('category'):
+            category_id = _parse('category', params['category'], int)
+            if params.get('include_descendants', '').lower() in ('1', 'true', 'yes'):
+                # Whole category subtree as one indexed range on the path
+                category = get_object_or_404(Category.objects.only('path'), pk=category_id)
+                lookups.update(subtree_filter(category.path, 'category__path'))
+            else:
+                lookups['category_id'] = category_id
+        return queryset.filter(**lookups)
+
+
+class KeysetOrderingFilter(BaseFilterBackend):
+    """
+    ``?ordering=field,-other`` for keyset-paginated views.
+
+    The view lists the public names it accepts in ``ordering_fields``, mapped
+    to model lookups. ``id`` is always appended as the final tiebreaker, and
+    KeysetPagination seeks on the resulting key.
+    """
+    ordering_param = 'ordering'
+
+    def get_keyset_ordering(self, request, view):
+        value = request.query_params.get(self.ordering_param)
+        if not value:
+            return None
+        fields = getattr(view, 'ordering_fields', {})
+        ordering = []
+        for term in value.split(','):
+            term = term.strip()
+            name = term.lstrip('-')
+            if name not in fields:
+                raise ValidationError({self.ordering_param: f"Cannot order by '{name}'."})
+            ordering.append(('-' if term.startswith('-') else '') + fields[name])
+        if ordering[-1].lstrip('-') != 'id':
+            ordering.append('-id' if ordering[-1].startswith('-') else 'id')
+        return ordering
+
+    def filter_queryset(self, request, queryset, view):
+        ordering = self.get_keyset_ordering(request, view)
+        return queryset.order_by(*ordering) if ordering else queryset
+
+
+def _parse(param, value, parse):
+    try:
+        return parse(value)
+    except (ValueError, ArithmeticError):
+        raise ValidationError({param: f"Invalid value '{value}'."})
@@ -0,0 +1,231 @@
+"""
+Chunked bulk import of items from CSV or JSON lines, in the export format.
+
+Input is read one row at a time and written in ``bulk_create``/``bulk_update``
+batches. Room, location path and category path names are resolved through
+in-memory lookup tables loaded once per run. Missing rooms, locations and
+categories are created on first use through ``save()``, so the closure table
+and category paths stay correct; category names are unique, so a category
+path must agree with the existing tree. The ``id`` column is ignored.
+
+Items whose ``serial_number`` is already in the database are conflicts,
+unless ``upsert`` is set, in which case the existing item is updated in place.
+"""
+import csv
+import json
+from dataclasses import dataclass, field
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+
+from . import rollups
+from .export import PATH_SEPARATOR
+from .models import Category, Item, Location, Room
+from .signals import bulk_write, items_bulk_changed
+
+FORMATS = ('csv', 'jsonl')
+ITEM_FIELDS = ('name', 'description', 'serial_number', 'purchase_date',
+               'purchase_price', 'current_value', 'quantity', 'notes')
+BATCH_SIZE = 500
+
+
+@dataclass
+class ImportReport:
+    dry_run: bool = False
+    created: int = 0
+    updated: int = 0
+    conflicts: list = field(default_factory=list)
+    errors: list = field(default_factory=list)
+
+    def as_dict(self):
+        return {
+            'dry_run': self.dry_run,
+            'created': self.created,
+            'updated': self.updated,
+            'conflicts': self.conflicts,
+            'errors': self.errors,
+        }
+
+
+def read_rows(stream, fmt):
+    """Yield ``(line number, row dict)`` from a text stream, lazily."""
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+    elif fmt == 'jsonl':
+        for line_num, line in enumerate(stream, 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            yield line_num, row if isinstance(row, dict) else {'__invalid__': True}
+    else:
+        raise ValueError(f"Unknown import format '{fmt}'.")
+
+
+class NameCache:
+    """
+    Name → id lookups for rooms, locations (by room, parent and name) and
+    categories (by their unique name), each loaded with one query.
+    """
+
+    def __init__(self):
+        self.rooms = {}
+        for pk, name in Room.objects.order_by('id').values_list('id', 'name'):
+            self.rooms.setdefault(name, pk)
+        self.locations = {}
+        for pk, name, room_id, parent_id in Location.objects.order_by('id').values_list(
+                'id', 'name', 'room_id', 'parent_location_id'):
+            self.locations.setdefault((room_id, parent_id, name), pk)
+        self.categories = {
+            name: (pk, parent_id)
+            for pk, name, parent_id in Category.objects.values_list('id', 'name', 'parent_id')
+        }
+
+    def room(self, name):
+        if name not in self.rooms:
+            self.rooms[name] = Room.objects.create(name=name).pk
+        return self.rooms[name]
+
+    def location(self, room_name, path):
+        names = _split_path(path)
+        if not names:
+            return None
+        if not room_name:
+            raise ValidationError({'room': ["A location path needs a room."]})
+        room_id, parent_id = self.room(room_name), None
+        for name in names:
+            key = (room_id if parent_id is None else None, parent_id, name)
+            if key not in self.locations:
+                self.locations[key] = Location.objects.create(
+                    name=name, room_id=key[0], parent_location_id=parent_id).pk
+            parent_id = self.locations[key]
+        return parent_id
+
+    def category(self, path):
+        parent_id = None
+        for name in _split_path(path):
+            if name not in self.categories:
+                self.categories[name] = (Category.objects.create(name=name, parent_id=parent_id).pk,
+                                         parent_id)
+            pk, actual_parent_id = self.categories[name]
+            if actual_parent_id != parent_id:
+                raise ValidationError(
+                    {'category_path': [f"Category '{name}' already exists under another parent."]})
+            parent_id = pk
+        return parent_id
+
+
+def _split_path(path):
+    return [name.strip() for name in (path or '').split(PATH_SEPARATOR) if name.strip()]
+
+
+def _clean(row):
+    """Convert a raw row into Item field values; raises ValidationError."""
+    values, errors = {}, {}
+    for name in ITEM_FIELDS:
+        model_field = Item._meta.get_field(name)
+        raw = row.get(name)
+        if raw in (None, ''):
+            if model_field.has_default():
+                values[name] = model_field.get_default()
+            elif not model_field.blank:
+                errors[name] = ["This field is required."]
+            else:
+                values[name] = '' if model_field.empty_strings_allowed and not model_field.null else None
+            continue
+        if isinstance(raw, float) and isinstance(model_field, models.DecimalField):
+            raw = str(raw)  # JSON numbers: 9.99, not the binary 9.9900000000000002131...
+        try:
+            values[name] = model_field.clean(model_field.to_python(raw), None)
+        except ValidationError as exc:
+            errors[name] = exc.messages
+    if errors:
+        raise ValidationError(errors)
+    return values
+
+
+def import_items(stream, fmt, upsert=False, dry_run=False, batch_size=BATCH_SIZE):
+    """
+    Import items from ``stream``; returns an ImportReport. The import runs in
+    one transaction; with ``dry_run`` it is rolled back at the end, so the
+    report shows exactly what the import would do.
+    """
+    report = ImportReport(dry_run=dry_run)
+    with transaction.atomic():
+        cache = NameCache()
+        seen_serials = set()
+        rows = read_rows(stream, fmt)
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                break
+            _import_batch(batch, cache, seen_serials, upsert, report)
+        if dry_run:
+            transaction.set_rollback(True)
+    return report
+
+
+def _import_batch(batch, cache, seen_serials, upsert, report):
+    cleaned = []
+    for line_num, row in batch:
+        if row.get('__invalid__'):
+            report.errors.append({'line': line_num, 'errors': {'row': ["Not a JSON object."]}})
+            continue
+        try:
+            values = _clean(row)
+            values['location_id'] = cache.location(row.get('room'), row.get('location_path'))
+            values['category_id'] = cache.category(row.get('category_path'))
+        except ValidationError as exc:
+            errors = exc.message_dict if hasattr(exc, 'error_dict') else {'row': exc.messages}
+            report.errors.append({'line': line_num, 'errors': errors})
+            continue
+        cleaned.append((line_num, values))
+
+    serials = {values['serial_number'] for _, values in cleaned if values['serial_number']}
+    existing = {}
+    for pk, serial in Item.objects.filter(serial_number__in=serials).values_list('id', 'serial_number'):
+        existing.setdefault(serial, []).append(pk)
+
+    creates, updates = [], {}
+    for line_num, values in cleaned:
+        serial = values['serial_number']
+        if serial:
+            if serial in seen_serials:
+                report.conflicts.append({'line': line_num, 'serial_number': serial,
+                                         'reason': "Duplicate serial number in the input."})
+                continue
+            seen_serials.add(serial)
+            matches = existing.get(serial, [])
+            if len(matches) > 1:
+                report.conflicts.append({'line': line_num, 'serial_number': serial,
+                                         'reason': "Several existing items have this serial number."})
+                continue
+            if matches:
+                if not upsert:
+                    report.conflicts.append({'line': line_num, 'serial_number': serial,
+                                             'reason': f"Item {matches[0]} already has this serial number."})
+                    continue
+                updates[matches[0]] = values
+                continue
+        creates.append(Item(**values))
+
+    with transaction.atomic(), bulk_write():
+        before = rollups.item_states(updates) if updates else []
+        created = Item.objects.bulk_create(creates)
+        if updates:
+            items = Item.objects.in_bulk(updates)
+            for pk, values in updates.items():
+                for name, value in values.items():
+                    setattr(items[pk], name, value)
+            Item.objects.bulk_update(items.values(), list(ITEM_FIELDS) + ['location_id', 'category_id'])
+        if created or updates:
+            items_bulk_changed.send(
+                sender=Item, created=[item.pk for item in created], updated=list(updates),
+                deleted=[], before=before)
+    report.created += len(created)
+    report.updated += len(updates)
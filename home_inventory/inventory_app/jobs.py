@@ -0,0 +1,61 @@
+"""
+In-process background worker pool for slow jobs such as voice uploads.
+
+``INVENTORY_JOB_WORKERS`` threads run jobs (bounded concurrency) and at most
+``INVENTORY_JOB_QUEUE_LIMIT`` jobs may be queued or running at once; beyond
+that ``submit`` raises ``JobQueueFull`` so the API can shed load instead of
+piling up work. With ``INVENTORY_JOBS_EAGER`` jobs run inline (tests).
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_executor = None
+_slots = None
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+def _pool():
+    global _executor, _slots
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'INVENTORY_JOB_WORKERS', 2),
+                thread_name_prefix='inventory-job')
+            _slots = threading.BoundedSemaphore(getattr(settings, 'INVENTORY_JOB_QUEUE_LIMIT', 20))
+        return _executor, _slots
+
+
+def submit(func, *args):
+    """Run ``func(*args)`` in the pool; raises JobQueueFull when the queue is full."""
+    if getattr(settings, 'INVENTORY_JOBS_EAGER', False):
+        func(*args)
+        return
+    executor, slots = _pool()
+    if not slots.acquire(blocking=False):
+        raise JobQueueFull()
+    try:
+        executor.submit(_run, func, args, slots)
+    except RuntimeError:
+        slots.release()
+        raise
+
+
+def _run(func, args, slots):
+    try:
+        func(*args)
+    except Exception:
+        logger.exception("Background job %s%r failed", func.__name__, args)
+    finally:
+        slots.release()
+        # Worker threads hold their own connections; don't leave them open
+        connections.close_all()
@@ -0,0 +1,231 @@
+"""
+Concurrent load generator (asyncio + httpx).
+
+``run()`` starts ``clients`` simulated devices that each send requests back
+to back, picking operations from a weighted mix, until ``duration`` seconds
+have passed or ``requests`` requests have been sent. The target is either a
+base URL (a running server) or an ASGI application, which is driven in-process
+through httpx.ASGITransport. The report gives throughput and latency
+percentiles per operation, and counts errors by kind: SQLite lock errors,
+timeouts, other server errors, client errors and connection failures. Lock
+errors are recognized by the header RequestMetricsMiddleware sets on them
+(or, from other servers, the DEBUG error page). See the ``loadtest_inventory``
+command.
+"""
+import asyncio
+import json
+import math
+import platform
+import random
+import time
+
+import django
+import httpx
+
+from .middleware import DATABASE_LOCKED, ERROR_HEADER
+
+# name: (method, path); paths are formatted with ids of existing rows
+OPERATIONS = {
+    'room-list': ('get', '/api/rooms/'),
+    'location-list': ('get', '/api/locations/'),
+    'location-detail': ('get', '/api/locations/{location}/'),
+    'location-tree': ('get', '/api/locations/tree/'),
+    'item-list': ('get', '/api/items/'),
+    'item-detail': ('get', '/api/items/{item}/'),
+    'item-create': ('post', '/api/items/'),
+    'item-update': ('patch', '/api/items/{item}/'),
+}
+DEFAULT_MIX = {
+    'room-list': 5,
+    'location-list': 10,
+    'location-detail': 10,
+    'location-tree': 10,
+    'item-list': 20,
+    'item-detail': 25,
+    'item-create': 10,
+    'item-update': 10,
+}
+LOCK_MESSAGES = (b'database is locked', b'database table is locked')
+
+
+def parse_mix(text):
+    """``"item-list=5,item-create=1"`` -> ``{'item-list': 5, 'item-create': 1}``."""
+    mix = {}
+    for part in text.split(','):
+        if not part.strip():
+            continue
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise ValueError(f"Unknown operation {name!r}; choose from {', '.join(OPERATIONS)}.")
+        try:
+            mix[name] = int(weight) if weight.strip() else 1
+        except ValueError:
+            raise ValueError(f"Invalid weight for {name!r}: {weight!r}.")
+        if mix[name] < 0:
+            raise ValueError(f"Invalid weight for {name!r}: {weight!r}.")
+    if not any(mix.values()):
+        raise ValueError("The mix needs at least one operation with a positive weight.")
+    return mix
+
+
+def percentile(values, p):
+    """Nearest-rank percentile of sorted ``values``."""
+    if not values:
+        return None
+    return values[max(0, math.ceil(p / 100 * len(values)) - 1)]
+
+
+def classify(response):
+    """Error kind of a response, or None for success."""
+    if response.status_code < 400:
+        return None
+    if response.status_code >= 500:
+        if response.headers.get(ERROR_HEADER) == DATABASE_LOCKED:
+            return 'locked'
+        return 'locked' if any(message in response.content for message in LOCK_MESSAGES) else 'server_error'
+    return 'client_error'
+
+
+class LoadClient:
+    """One simulated device: its own random stream, sharing the known ids with the others."""
+
+    def __init__(self, client, mix, ids, rng, timeout):
+        self.client = client
+        self.names = list(mix)
+        self.weights = list(mix.values())
+        self.ids = ids
+        self.rng = rng
+        self.timeout = timeout
+
+    def request_args(self, name):
+        method, path = OPERATIONS[name]
+        path = path.format(item=self.rng.choice(self.ids['item']), location=self.rng.choice(self.ids['location']))
+        if name == 'item-create':
+            return method, path, {'json': {'name': f"Load test {self.rng.randrange(10 ** 9)}",
+                                           'quantity': self.rng.randint(1, 5),
+                                           'location': self.rng.choice(self.ids['location'])}}
+        if name == 'item-update':
+            return method, path, {'json': {'quantity': self.rng.randint(1, 10)}}
+        return method, path, {}
+
+    async def send(self, name):
+        """Send one ``name`` request; returns (latency in seconds, error kind or None)."""
+        method, path, kwargs = self.request_args(name)
+        start = time.perf_counter()
+        try:
+            # wait_for also bounds in-process requests, which ignore httpx's timeouts
+            response = await asyncio.wait_for(self.client.request(method, path, **kwargs), self.timeout)
+        except (asyncio.TimeoutError, httpx.TimeoutException):
+            return time.perf_counter() - start, 'timeout'
+        except httpx.TransportError:
+            return time.perf_counter() - start, 'connection'
+        latency = time.perf_counter() - start
+        error = classify(response)
+        if name == 'item-create' and error is None:
+            self.ids['item'].append(response.json()['id'])
+        return latency, error
+
+    async def loop(self, samples, deadline, budget):
+        while time.perf_counter() < deadline and budget.take():
+            name = self.rng.choices(self.names, self.weights)[0]
+            latency, error = await self.send(name)
+            samples.append((name, latency, error))
+
+
+class Budget:
+    """Shared request counter; unlimited when ``total`` is None."""
+
+    def __init__(self, total):
+        self.left = total
+
+    def take(self):
+        if self.left is None:
+            return True
+        if self.left <= 0:
+            return False
+        self.left -= 1
+        return True
+
+
+def make_client(target, timeout, base_url='http://testserver'):
+    if isinstance(target, str):
+        return httpx.AsyncClient(base_url=target, timeout=timeout,
+                                 limits=httpx.Limits(max_connections=None, max_keepalive_connections=None))
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=target), base_url=base_url, timeout=timeout)
+
+
+async def discover_ids(client):
+    """Ids of existing items and locations (up to one page of each) to build detail and update paths."""
+    ids = {}
+    for key, path in (('item', '/api/items/'), ('location', '/api/locations/')):
+        response = await client.get(path, params={'fields': 'id', 'page_size': 1000})
+        response.raise_for_status()
+        data = response.json()
+        ids[key] = [row['id'] for row in (data['results'] if isinstance(data, dict) else data)]
+    if not ids['item'] or not ids['location']:
+        raise ValueError("The target has no items or locations; seed it first (seed_inventory).")
+    return ids
+
+
+async def run_async(target, mix=None, clients=50, duration=10.0, requests=None, timeout=10.0, seed=0):
+    mix = {name: weight for name, weight in (mix or DEFAULT_MIX).items() if weight > 0}
+    async with make_client(target, timeout) as client:
+        ids = await discover_ids(client)
+        samples = []
+        start = time.perf_counter()
+        deadline = start + duration if duration else math.inf
+        budget = Budget(requests)
+        await asyncio.gather(*[
+            LoadClient(client, mix, ids, random.Random(f"{seed}:{n}"), timeout).loop(samples, deadline, budget)
+            for n in range(clients)])
+        elapsed = time.perf_counter() - start
+    report = summarize(samples, elapsed)
+    report['meta'] = {
+        'target': target if isinstance(target, str) else 'asgi',
+        'clients': clients, 'duration_s': duration, 'requests': requests, 'timeout_s': timeout,
+        'mix': mix, 'seed': seed, 'python': platform.python_version(), 'django': django.get_version(),
+    }
+    return report
+
+
+def run(target, **kwargs):
+    """Run the load test to completion; returns the report as a JSON-ready dict."""
+    return asyncio.run(run_async(target, **kwargs))
+
+
+def summarize(samples, elapsed):
+    """Totals and per-operation throughput, latency percentiles (all responses) and error counts."""
+    def stats(rows):
+        latencies = sorted(latency * 1000 for _, latency, _ in rows)
+        errors = {}
+        for _, _, error in rows:
+            if error:
+                errors[error] = errors.get(error, 0) + 1
+        return {
+            'requests': len(rows),
+            'errors': errors,
+            'throughput_rps': round(len(rows) / elapsed, 2) if elapsed else 0.0,
+            'p50_ms': _round(percentile(latencies, 50)),
+            'p95_ms': _round(percentile(latencies, 95)),
+            'p99_ms': _round(percentile(latencies, 99)),
+            'max_ms': _round(latencies[-1] if latencies else None),
+        }
+
+    by_name = {}
+    for sample in samples:
+        by_name.setdefault(sample[0], []).append(sample)
+    return {
+        'elapsed_s': round(elapsed, 2),
+        'total': stats(samples),
+        'routes': {name: stats(rows) for name, rows in sorted(by_name.items())},
+    }
+
+
+def _round(value):
+    return None if value is None else round(value, 2)
+
+
+def dumps(report):
+    """The report as stable, diffable JSON."""
+    return json.dumps(report, indent=2, sort_keys=True) + '\n'
@@ -0,0 +1,64 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from inventory_app import benchmark
+from inventory_app.seed import SCALES
+
+
+class Command(BaseCommand):
+    help = ("Time every route over seeded data at several scales, in a throwaway test database, "
+            "and compare the results with a baseline JSON.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scales', default=','.join(benchmark.DEFAULT_SCALES),
+                            help=f"Comma-separated, from: {', '.join(SCALES)}.")
+        parser.add_argument('--repeat', type=int, default=5, help="Timed runs per route.")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--routes', help="Comma-separated route names; default all.")
+        parser.add_argument('--output', help="Write the results to this JSON file.")
+        parser.add_argument('--baseline', help="Compare with this results JSON; fail on regressions.")
+        parser.add_argument('--save-baseline', action='store_true',
+                            help="Write the results to the --baseline file instead of comparing.")
+        parser.add_argument('--tolerance', type=float, default=0.25,
+                            help="Allowed relative slowdown or memory growth (0.25 = 25%%).")
+
+    def handle(self, *args, **options):
+        scales = [scale.strip() for scale in options['scales'].split(',') if scale.strip()]
+        unknown = [scale for scale in scales if scale not in SCALES]
+        if unknown:
+            raise CommandError(f"Unknown scales: {', '.join(unknown)}.")
+        if options['repeat'] < 1:
+            raise CommandError("--repeat must be at least 1.")
+        if options['save_baseline'] and not options['baseline']:
+            raise CommandError("--save-baseline needs --baseline.")
+        routes = {name.strip() for name in options['routes'].split(',')} if options['routes'] else None
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            report = benchmark.run(scales, repeat=options['repeat'], seed=options['seed'],
+                                   routes=routes, log=self.stdout.write)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        if options['output']:
+            _write(options['output'], report)
+        if options['save_baseline']:
+            _write(options['baseline'], report)
+            self.stdout.write(self.style.SUCCESS(f"Saved baseline to {options['baseline']}."))
+        elif options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as baseline:
+                regressions = benchmark.compare(report, json.load(baseline), tolerance=options['tolerance'])
+            if regressions:
+                raise CommandError("Regressions against the baseline:\n" + '\n'.join(regressions))
+            self.stdout.write(self.style.SUCCESS("No regressions against the baseline."))
+
+
+def _write(path, report):
+    with open(path, 'w', encoding='utf-8') as output:
+        json.dump(report, output, indent=2, sort_keys=True)
+        output.write('\n')
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from inventory_app.export import FORMATS, iter_export
+
+
+class Command(BaseCommand):
+    help = "Write the whole inventory, with location and category paths, as CSV or JSON lines."
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help="File to write; '-' for stdout.")
+        parser.add_argument('--format', choices=sorted(FORMATS), default='csv')
+
+    def handle(self, *args, **options):
+        if options['output'] == '-':
+            for chunk in iter_export(options['format']):
+                self.stdout.write(chunk, ending='')
+            return
+        with open(options['output'], 'w', encoding='utf-8', newline='') as output:
+            for chunk in iter_export(options['format']):
+                output.write(chunk)
+        self.stdout.write(self.style.SUCCESS(f"Exported inventory to {options['output']}."))
@@ -0,0 +1,44 @@
+import os
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory_app.importer import BATCH_SIZE, FORMATS, import_items
+
+
+class Command(BaseCommand):
+    help = "Import items from CSV or JSON lines (the export format), upserting on serial number."
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', help="File to read; '-' for stdin.")
+        parser.add_argument('--format', choices=FORMATS,
+                            help="Input format; taken from the file extension by default.")
+        parser.add_argument('--upsert', action='store_true',
+                            help="Update items whose serial number already exists instead of reporting a conflict.")
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Report what would be imported and roll everything back.")
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        fmt = options['format'] or os.path.splitext(options['input'])[1].lstrip('.').lower()
+        if fmt not in FORMATS:
+            raise CommandError("Cannot tell the input format; pass --format csv or --format jsonl.")
+        kwargs = dict(upsert=options['upsert'], dry_run=options['dry_run'],
+                      batch_size=options['batch_size'])
+        if options['input'] == '-':
+            report = import_items(sys.stdin, fmt, **kwargs)
+        else:
+            with open(options['input'], encoding='utf-8', newline='') as stream:
+                report = import_items(stream, fmt, **kwargs)
+
+        for conflict in report.conflicts:
+            self.stdout.write(f"line {conflict['line']}: conflict on serial number "
+                              f"{conflict['serial_number']}: {conflict['reason']}")
+        for error in report.errors:
+            self.stdout.write(f"line {error['line']}: {error['errors']}")
+        summary = (f"{report.created} created, {report.updated} updated, "
+                   f"{len(report.conflicts)} conflicts, {len(report.errors)} errors")
+        if report.dry_run:
+            self.stdout.write(self.style.WARNING(f"Dry run, nothing was written: {summary}."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Imported: {summary}."))
@@ -0,0 +1,76 @@
+import os
+import tempfile
+
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from inventory_app import loadtest
+from inventory_app.seed import SCALES, seed_inventory
+
+
+class Command(BaseCommand):
+    help = ("Drive the API with concurrent clients and report throughput, latency percentiles "
+            "and lock/timeout errors per operation. Without --url the ASGI app is driven in-process "
+            "over a throwaway SQLite file seeded with --scale.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', help="Base URL of a running server, e.g. http://127.0.0.1:8000.")
+        parser.add_argument('--clients', type=int, default=50, help="Concurrent simulated devices.")
+        parser.add_argument('--duration', type=float, default=10.0, help="Seconds to run.")
+        parser.add_argument('--requests', type=int, help="Stop after this many requests instead.")
+        parser.add_argument('--mix', help=("Weighted operations, e.g. item-list=5,item-create=1; from: "
+                                           f"{', '.join(loadtest.OPERATIONS)}."))
+        parser.add_argument('--timeout', type=float, default=10.0, help="Per-request timeout in seconds.")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--scale', choices=list(SCALES), default='small',
+                            help="Data seeded for in-process runs.")
+        parser.add_argument('--output', help="Write the JSON report to this file instead of stdout.")
+
+    def handle(self, *args, **options):
+        try:
+            mix = loadtest.parse_mix(options['mix']) if options['mix'] else None
+        except ValueError as e:
+            raise CommandError(str(e))
+        if options['clients'] < 1:
+            raise CommandError("--clients must be at least 1.")
+        kwargs = dict(mix=mix, clients=options['clients'], timeout=options['timeout'], seed=options['seed'],
+                      duration=None if options['requests'] else options['duration'],
+                      requests=options['requests'])
+        try:
+            if options['url']:
+                report = loadtest.run(options['url'], **kwargs)
+            else:
+                report = self.run_in_process(options['scale'], options['seed'], kwargs)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        output = loadtest.dumps(report)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(output)
+        else:
+            self.stdout.write(output, ending='')
+        total = report['total']
+        self.stderr.write(f"{total['requests']} requests in {report['elapsed_s']}s, "
+                          f"{total['throughput_rps']} req/s, p95 {total['p95_ms']} ms, errors {total['errors']}")
+
+    def run_in_process(self, scale, seed, kwargs):
+        # A file rather than the in-memory test database, so SQLite locks the way it does in production
+        directory = tempfile.mkdtemp()
+        test_settings = connection.settings_dict['TEST']
+        old_test_name = test_settings.get('NAME')
+        test_settings['NAME'] = os.path.join(directory, 'loadtest.sqlite3')
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            rows = seed_inventory(scale, seed=seed).as_dict()
+            self.stderr.write(f"Seeded {rows}.")
+            connection.close()  # requests run on other threads, with their own connections
+            return loadtest.run(get_asgi_application(), **kwargs)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+            test_settings['NAME'] = old_test_name
+            os.rmdir(directory)
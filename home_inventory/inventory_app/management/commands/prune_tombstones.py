@@ -0,0 +1,20 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory_app.sync import DEFAULT_TOMBSTONE_AGE, prune_tombstones
+
+
+class Command(BaseCommand):
+    help = ("Delete the delete markers kept for /api/sync/. Devices that last synced before "
+            "the newest pruned one get a full resync.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=DEFAULT_TOMBSTONE_AGE.days,
+                            help="Keep tombstones younger than this many days (0 prunes all).")
+
+    def handle(self, *args, **options):
+        if options['days'] < 0:
+            raise CommandError("--days must not be negative.")
+        deleted = prune_tombstones(datetime.timedelta(days=options['days']) if options['days'] else None)
+        self.stdout.write(self.style.SUCCESS(f"Pruned {deleted} tombstones."))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from inventory_app.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = "Rebuild the item full-text search index from the item table."
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        if backend.rebuild():
+            self.stdout.write(self.style.SUCCESS(
+                f"Rebuilt search index ({type(backend).__name__})."))
+        else:
+            self.stdout.write(f"{type(backend).__name__} keeps no index; nothing to rebuild.")
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from inventory_app.rollups import reconcile
+
+
+class Command(BaseCommand):
+    help = "Recompute the valuation rollups from the item table and report drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help="Only report drift; leave the stored rollups unchanged.")
+
+    def handle(self, *args, **options):
+        drift = reconcile(fix=not options['dry_run'])
+        for (scope, object_id), stored, expected in drift:
+            self.stdout.write(
+                f"{scope} {object_id}: stored {_format(stored)}, expected {_format(expected)}")
+        if not drift:
+            self.stdout.write(self.style.SUCCESS("Rollups are consistent."))
+        elif options['dry_run']:
+            self.stdout.write(self.style.WARNING(f"{len(drift)} rollup rows drifted."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Fixed {len(drift)} drifted rollup rows."))
+
+
+def _format(vector):
+    count, quantity, price, value = vector
+    return f"items={count} quantity={quantity} purchase_price={price} current_value={value}"
@@ -0,0 +1,28 @@
+import time
+from dataclasses import replace
+
+from django.core.management.base import BaseCommand
+
+from inventory_app.seed import BATCH_SIZE, SCALES, clear_inventory, seed_inventory
+
+
+class Command(BaseCommand):
+    help = "Generate a synthetic inventory: rooms, location and category trees and items."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', choices=list(SCALES), default='small')
+        parser.add_argument('--seed', type=int, default=0, help="Random seed; the same seed gives the same data.")
+        parser.add_argument('--items', type=int, help="Override the item count of the scale.")
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--clear', action='store_true', help="Delete the existing inventory first.")
+
+    def handle(self, *args, **options):
+        scale = SCALES[options['scale']]
+        if options['items'] is not None:
+            scale = replace(scale, items=options['items'])
+        if options['clear']:
+            clear_inventory()
+        start = time.perf_counter()
+        report = seed_inventory(scale, seed=options['seed'], batch_size=options['batch_size'])
+        counts = ', '.join(f"{count} {name}" for name, count in report.as_dict().items())
+        self.stdout.write(self.style.SUCCESS(f"Seeded {counts} in {time.perf_counter() - start:.1f}s."))
@@ -0,0 +1,77 @@
+"""
+Per-request instrumentation: SQL statement count and time (through a
+``connection.execute_wrapper`` on every database alias), time spent turning
+objects into response data, and total view time. RequestMetricsMiddleware
+collects them for each request; see middleware.py.
+"""
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from django.db import connections
+
+_current = ContextVar('inventory_request_metrics', default=None)
+
+
+@dataclass
+class RequestMetrics:
+    sql_count: int = 0
+    sql_time: float = 0.0  # seconds
+    serializer_time: float = 0.0
+    total_time: float = 0.0
+    _serializer_depth: int = 0
+
+    def record_query(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_time += time.perf_counter() - start
+            self.sql_count += 1
+
+    def as_dict(self):
+        return {
+            'sql_count': self.sql_count,
+            'sql_ms': round(self.sql_time * 1000, 2),
+            'serializer_ms': round(self.serializer_time * 1000, 2),
+            'total_ms': round(self.total_time * 1000, 2),
+        }
+
+
+def current():
+    """The metrics of the request being handled, or None outside of one."""
+    return _current.get()
+
+
+@contextmanager
+def collect():
+    """Record the queries and timings of this block into a new RequestMetrics."""
+    metrics = RequestMetrics()
+    token = _current.set(metrics)
+    start = time.perf_counter()
+    try:
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(metrics.record_query))
+            yield metrics
+    finally:
+        metrics.total_time = time.perf_counter() - start
+        _current.reset(token)
+
+
+@contextmanager
+def serializer_timing():
+    """Count this block as serializer time; nested blocks are counted once."""
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    metrics._serializer_depth += 1
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics._serializer_depth -= 1
+        if not metrics._serializer_depth:
+            metrics.serializer_time += time.perf_counter() - start
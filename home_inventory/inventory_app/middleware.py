@@ -0,0 +1,92 @@
+import json
+import logging
+
+from django.conf import settings
+from django.db import OperationalError
+
+from . import metrics
+from .routers import replica_configured, replica_reads
+
+logger = logging.getLogger('inventory_app.requests')
+
+# Set on 500 responses caused by a SQLite lock, so load tests can tell them
+# apart without the DEBUG error page
+ERROR_HEADER = 'X-Inventory-Error'
+DATABASE_LOCKED = 'database-locked'
+LOCK_MESSAGES = ('database is locked', 'database table is locked')
+
+
+class RequestMetricsMiddleware:
+    """
+    Record SQL count and time, serializer time and total time of every
+    request (metrics.py). They are sent back as a ``Server-Timing`` header
+    (unless ``INVENTORY_SERVER_TIMING = False``) and logged as one JSON
+    object per request on the ``inventory_app.requests`` logger, at INFO.
+    For streamed responses only the work before the first byte is counted.
+    A request that failed on a database lock gets an ``error`` field in the
+    log and an ``ERROR_HEADER`` on its 500 response.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.inventory_error = None
+        with metrics.collect() as recorded:
+            response = self.get_response(request)
+        if request.inventory_error:
+            response[ERROR_HEADER] = request.inventory_error
+        if getattr(settings, 'INVENTORY_SERVER_TIMING', True):
+            response['Server-Timing'] = server_timing(recorded)
+        match = request.resolver_match
+        entry = {
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            **recorded.as_dict(),
+        }
+        if request.inventory_error:
+            entry['error'] = request.inventory_error
+        logger.info(json.dumps(entry), extra={'metrics': entry})
+        return response
+
+    def process_exception(self, request, exception):
+        if isinstance(exception, OperationalError) and str(exception).startswith(LOCK_MESSAGES):
+            request.inventory_error = DATABASE_LOCKED
+
+
+def server_timing(recorded):
+    """``Server-Timing`` header value for a RequestMetrics; durations in milliseconds."""
+    values = recorded.as_dict()
+    return (f'sql;dur={values["sql_ms"]};desc="{values["sql_count"]} queries", '
+            f'serializer;dur={values["serializer_ms"]}, total;dur={values["total_ms"]}')
+
+
+class ReplicaReadMiddleware:
+    """
+    Serve safe API requests (GET, HEAD) from the read replica; see routers.py.
+    Other requests, pages outside ``prefixes`` such as the admin, which
+    redirects to a list right after a save, and ``primary_prefixes`` (voice
+    jobs, polled right after the upload created them) keep reading the
+    primary. So does a client for ``INVENTORY_REPLICA_PIN_SECONDS`` after a
+    write: the response sets a ``pin_cookie`` so it reads its own writes.
+    """
+    prefixes = ('/api/',)
+    primary_prefixes = ('/api/jobs/',)
+    pin_cookie = 'inventory_primary'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if (request.method in ('GET', 'HEAD') and request.path.startswith(self.prefixes)
+                and not request.path.startswith(self.primary_prefixes)
+                and self.pin_cookie not in request.COOKIES):
+            with replica_reads():
+                return self.get_response(request)
+        response = self.get_response(request)
+        if request.method not in ('GET', 'HEAD', 'OPTIONS') and replica_configured():
+            response.set_cookie(self.pin_cookie, '1', httponly=True, samesite='Lax',
+                                max_age=getattr(settings, 'INVENTORY_REPLICA_PIN_SECONDS', 15))
+        return response
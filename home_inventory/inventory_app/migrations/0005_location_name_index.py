@@ -0,0 +1,17 @@
+# Generated by Django 5.1.3 on 2026-10-18 09:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory_app', '0004_alter_category_options_location_parent_location_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='location',
+            index=models.Index(fields=['name'], name='inventory_a_name_ad33ff_idx'),
+        ),
+    ]
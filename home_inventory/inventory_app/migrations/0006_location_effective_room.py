@@ -0,0 +1,46 @@
+# Generated by Django 5.1.3 on 2026-10-18 09:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_effective_room(apps, schema_editor):
+    Location = apps.get_model('inventory_app', 'Location')
+    rows = {pk: (parent_id, room_id) for pk, parent_id, room_id in
+            Location.objects.values_list('id', 'parent_location_id', 'room_id')}
+    resolved = {}
+
+    def resolve(pk):
+        chain = []
+        while pk not in resolved:
+            parent_id, room_id = rows[pk]
+            chain.append(pk)
+            if parent_id is None:
+                resolved[pk] = room_id
+            elif parent_id in chain:  # corrupt cycle: leave it unresolved
+                resolved[pk] = None
+            else:
+                pk = parent_id
+        room_id = resolved[pk]
+        for node in chain:
+            resolved[node] = room_id
+        return room_id
+
+    locations = [Location(pk=pk, effective_room_id=resolve(pk)) for pk in rows]
+    Location.objects.bulk_update(locations, ['effective_room'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory_app', '0005_location_name_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='location',
+            name='effective_room',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='contained_locations', to='inventory_app.room'),
+        ),
+        migrations.RunPython(backfill_effective_room, migrations.RunPython.noop),
+    ]
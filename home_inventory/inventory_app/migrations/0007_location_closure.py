@@ -0,0 +1,42 @@
+# Generated by Django 5.1.3 on 2026-10-18 09:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_closure(apps, schema_editor):
+    Location = apps.get_model('inventory_app', 'Location')
+    LocationClosure = apps.get_model('inventory_app', 'LocationClosure')
+    parents = dict(Location.objects.values_list('id', 'parent_location_id'))
+    links = []
+    for pk in parents:
+        ancestor_id, depth, seen = pk, 0, set()
+        while ancestor_id is not None and ancestor_id not in seen:
+            seen.add(ancestor_id)
+            links.append(LocationClosure(ancestor_id=ancestor_id, descendant_id=pk, depth=depth))
+            ancestor_id, depth = parents.get(ancestor_id), depth + 1
+    LocationClosure.objects.bulk_create(links, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory_app', '0006_location_effective_room'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LocationClosure',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('depth', models.PositiveIntegerField()),
+                ('ancestor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='descendant_links', to='inventory_app.location')),
+                ('descendant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ancestor_links', to='inventory_app.location')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['ancestor', 'depth'], name='inventory_a_ancesto_2595eb_idx'), models.Index(fields=['descendant', 'depth'], name='inventory_a_descend_3693f4_idx')],
+                'unique_together': {('ancestor', 'descendant')},
+            },
+        ),
+        migrations.RunPython(build_closure, migrations.RunPython.noop),
+    ]
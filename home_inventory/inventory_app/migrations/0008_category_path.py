@@ -0,0 +1,38 @@
+# Generated by Django 5.1.3 on 2026-10-18 09:46
+
+from django.db import migrations, models
+
+
+def backfill_paths(apps, schema_editor):
+    Category = apps.get_model('inventory_app', 'Category')
+    parents = dict(Category.objects.values_list('id', 'parent_id'))
+    categories = []
+    for pk in parents:
+        chain, current = [], pk
+        while current is not None and current not in chain:
+            chain.append(current)
+            current = parents.get(current)
+        path = ''.join(f"{ancestor}/" for ancestor in reversed(chain))
+        categories.append(Category(pk=pk, path=path, depth=len(chain) - 1))
+    Category.objects.bulk_update(categories, ['path', 'depth'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory_app', '0007_location_closure'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='depth',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='path',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=255),
+        ),
+        migrations.RunPython(backfill_paths, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,63 @@
+from django.db import migrations
+
+FTS_TABLE = 'inventory_app_item_fts'
+COLUMNS = 'name, description, notes, serial_number'
+
+CREATE_SQL = [
+    f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5({COLUMNS}, "
+    f"content='inventory_app_item', content_rowid='id', "
+    f"tokenize='unicode61 remove_diacritics 2')",
+    f"CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON inventory_app_item BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, {COLUMNS}) "
+    f"VALUES (new.id, new.name, new.description, new.notes, new.serial_number); END",
+    f"CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON inventory_app_item BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {COLUMNS}) "
+    f"VALUES ('delete', old.id, old.name, old.description, old.notes, old.serial_number); END",
+    f"CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE OF {COLUMNS} ON inventory_app_item BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {COLUMNS}) "
+    f"VALUES ('delete', old.id, old.name, old.description, old.notes, old.serial_number); "
+    f"INSERT INTO {FTS_TABLE}(rowid, {COLUMNS}) "
+    f"VALUES (new.id, new.name, new.description, new.notes, new.serial_number); END",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+DROP_SQL = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ai",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_au",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+
+def _supports_fts5(connection):
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA compile_options")
+        return any(row[0] == 'ENABLE_FTS5' for row in cursor.fetchall())
+
+
+def create_fts_index(apps, schema_editor):
+    # Other backends fall back to search.BasicSearchBackend (or a configured one)
+    if not _supports_fts5(schema_editor.connection):
+        return
+    for statement in CREATE_SQL:
+        schema_editor.execute(statement)
+
+
+def drop_fts_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in DROP_SQL:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory_app', '0008_category_path'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts_index, drop_fts_index),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.1.3 on 2026-10-18 09:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory_app', '0009_item_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['name', 'id'], name='inventory_a_name_c9602e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['purchase_date', 'id'], name='inventory_a_purchas_1bfec6_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['purchase_price', 'id'], name='inventory_a_purchas_ba0596_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['current_value', 'id'], name='inventory_a_current_b86ce6_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['quantity', 'id'], name='inventory_a_quantit_106ef6_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['serial_number', 'id'], name='inventory_a_serial__787476_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['location', 'name', 'id'], name='inventory_a_locatio_9dda54_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['category', 'name', 'id'], name='inventory_a_categor_62309b_idx'),
+        ),
+    ]
@@ -0,0 +1,74 @@
+# Generated by Django 5.1.3 on 2026-10-18 09:50
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def build_rollups(apps, schema_editor):
+    # Frozen copy of the full recomputation in rollups.py, on the historical models
+    Item = apps.get_model('inventory_app', 'Item')
+    Category = apps.get_model('inventory_app', 'Category')
+    InventoryRollup = apps.get_model('inventory_app', 'InventoryRollup')
+    aggregates = dict(item_count=Count('id'), quantity=Sum('quantity'),
+                      purchase_price=Sum('purchase_price'), current_value=Sum('current_value'))
+
+    def decimal(value):
+        return Decimal(str(value)).quantize(Decimal('0.01')) if value is not None else Decimal('0.00')
+
+    totals = defaultdict(lambda: [0, 0, Decimal('0.00'), Decimal('0.00')])
+
+    def add(key, row):
+        total = totals[key]
+        total[0] += row['item_count']
+        total[1] += row['quantity'] or 0
+        total[2] += decimal(row['purchase_price'])
+        total[3] += decimal(row['current_value'])
+
+    row = Item.objects.aggregate(**aggregates)
+    if row['item_count']:
+        add(('total', 0), row)
+    for row in Item.objects.filter(location__effective_room__isnull=False).values(
+            'location__effective_room_id').annotate(**aggregates).order_by():
+        add(('room', row['location__effective_room_id']), row)
+    for row in Item.objects.filter(location__isnull=False).values(
+            'location__ancestor_links__ancestor_id').annotate(**aggregates).order_by():
+        add(('location', row['location__ancestor_links__ancestor_id']), row)
+    paths = dict(Category.objects.values_list('id', 'path'))
+    for row in Item.objects.filter(category__isnull=False).values('category_id').annotate(**aggregates).order_by():
+        for pk in paths[row['category_id']].split('/'):
+            if pk:
+                add(('category', int(pk)), row)
+    InventoryRollup.objects.bulk_create([
+        InventoryRollup(scope=scope, object_id=object_id, item_count=count,
+                        quantity=quantity, purchase_price=price, current_value=value)
+        for (scope, object_id), (count, quantity, price, value) in totals.items()
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory_app', '0010_item_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InventoryRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(choices=[('total', 'Total'), ('room', 'Room'), ('location', 'Location subtree'), ('category', 'Category subtree')], max_length=10)),
+                ('object_id', models.BigIntegerField(default=0)),
+                ('item_count', models.IntegerField(default=0)),
+                ('quantity', models.BigIntegerField(default=0)),
+                ('purchase_price', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('current_value', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+            ],
+            options={
+                'unique_together': {('scope', 'object_id')},
+            },
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.3 on 2026-10-18 09:57
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory_app', '0011_inventory_rollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VoiceJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('succeeded', 'Succeeded'), ('failed', 'Failed')], default='queued', max_length=10)),
+                ('audio', models.BinaryField(blank=True, null=True)),
+                ('audio_name', models.CharField(blank=True, max_length=255)),
+                ('transcript', models.TextField(blank=True)),
+                ('extracted', models.JSONField(blank=True, null=True)),
+                ('item_ids', models.JSONField(blank=True, default=list)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
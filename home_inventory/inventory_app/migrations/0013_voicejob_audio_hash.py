@@ -0,0 +1,18 @@
+# Generated by Django 5.1.3 on 2026-10-18 09:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory_app', '0012_voice_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='voicejob',
+            name='audio_hash',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.1.3 on 2026-10-18 10:00
+
+from django.db import migrations, models
+
+
+def backfill_normalized_names(apps, schema_editor):
+    for model_name in ('Room', 'Location'):
+        model = apps.get_model('inventory_app', model_name)
+        rows = [model(pk=pk, normalized_name=' '.join((name or '').split()).casefold())
+                for pk, name in model.objects.values_list('id', 'name')]
+        model.objects.bulk_update(rows, ['normalized_name'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory_app', '0013_voicejob_audio_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='location',
+            name='normalized_name',
+            field=models.CharField(default='', editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='room',
+            name='normalized_name',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=100),
+        ),
+        migrations.AddIndex(
+            model_name='location',
+            index=models.Index(fields=['normalized_name', 'effective_room'], name='inventory_a_normali_cdb65a_idx'),
+        ),
+        migrations.RunPython(backfill_normalized_names, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.3 on 2026-10-18 10:01
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def seed_versions(apps, schema_editor):
+    # Start with a row per versioned model so a bump is always a single UPDATE
+    ModelVersion = apps.get_model('inventory_app', 'ModelVersion')
+    ModelVersion.objects.bulk_create([
+        ModelVersion(label=f'inventory_app.{name}', version=1, changed_at=timezone.now())
+        for name in ('room', 'location', 'item', 'category')
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory_app', '0014_normalized_names'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ModelVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('label', models.CharField(max_length=100, unique=True)),
+                ('version', models.BigIntegerField(default=0)),
+                ('changed_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.RunPython(seed_versions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,125 @@
+from django.db import migrations, models
+
+COUNTER = 'inventory_app_synccounter'
+TOMBSTONES = 'inventory_app_tombstone'
+TABLES = {
+    'room': 'inventory_app_room',
+    'location': 'inventory_app_location',
+    'category': 'inventory_app_category',
+    'item': 'inventory_app_item',
+}
+# The counter row comes back if a flush removed it
+NEXT_SEQ = (f"INSERT OR IGNORE INTO {COUNTER} (id, value, pruned_through) VALUES (1, 0, 0); "
+            f"UPDATE {COUNTER} SET value = value + 1 WHERE id = 1; ")
+CURRENT_SEQ = f"(SELECT value FROM {COUNTER} WHERE id = 1)"
+
+
+def trigger_sql(model, table):
+    # The triggers' own UPDATE does not fire them again: recursive_triggers is off
+    stamp = f"UPDATE {table} SET sync_seq = {CURRENT_SEQ} WHERE id = new.id; "
+    return [
+        f"CREATE TRIGGER {table}_sync_ai AFTER INSERT ON {table} BEGIN {NEXT_SEQ}{stamp}END",
+        f"CREATE TRIGGER {table}_sync_au AFTER UPDATE ON {table} BEGIN {NEXT_SEQ}{stamp}END",
+        f"CREATE TRIGGER {table}_sync_ad AFTER DELETE ON {table} BEGIN {NEXT_SEQ}"
+        f"INSERT INTO {TOMBSTONES} (model, object_id, sync_seq, deleted_at) "
+        f"VALUES ('{model}', old.id, {CURRENT_SEQ}, strftime('%Y-%m-%d %H:%M:%f', 'now')); END",
+    ]
+
+
+def add_sync_columns(apps, schema_editor):
+    # ALTER TABLE rather than AddField's table rebuild on SQLite, which would
+    # copy every row and drop the item search triggers (0009)
+    for table in TABLES.values():
+        schema_editor.execute(f"ALTER TABLE {table} ADD COLUMN sync_seq bigint NOT NULL DEFAULT 0")
+        schema_editor.execute(f"CREATE INDEX {table}_sync_seq ON {table} (sync_seq)")
+
+
+def drop_sync_columns(apps, schema_editor):
+    for table in TABLES.values():
+        schema_editor.execute(f"DROP INDEX {table}_sync_seq")
+        schema_editor.execute(f"ALTER TABLE {table} DROP COLUMN sync_seq")
+
+
+def create_sync_triggers(apps, schema_editor):
+    # Number the existing rows once, then let triggers stamp every write
+    # (including bulk and queryset updates, which send no signals). Other
+    # backends get no triggers, and sync.changes_since() refuses to run there.
+    offset = 0
+    with schema_editor.connection.cursor() as cursor:
+        for table in TABLES.values():
+            cursor.execute(f"UPDATE {table} SET sync_seq = id + %s", [offset])
+            cursor.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}")
+            offset += cursor.fetchone()[0]
+    apps.get_model('inventory_app', 'SyncCounter').objects.create(id=1, value=offset)
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for model, table in TABLES.items():
+        for statement in trigger_sql(model, table):
+            schema_editor.execute(statement)
+
+
+def drop_sync_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for table in TABLES.values():
+        for suffix in ('ai', 'au', 'ad'):
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS {table}_sync_{suffix}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory_app', '0015_model_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.BigIntegerField(default=0)),
+                ('pruned_through', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddField(
+                    model_name='category',
+                    name='sync_seq',
+                    field=models.BigIntegerField(db_index=True, default=0, editable=False),
+                ),
+                migrations.AddField(
+                    model_name='item',
+                    name='sync_seq',
+                    field=models.BigIntegerField(db_index=True, default=0, editable=False),
+                ),
+                migrations.AddField(
+                    model_name='location',
+                    name='sync_seq',
+                    field=models.BigIntegerField(db_index=True, default=0, editable=False),
+                ),
+                migrations.AddField(
+                    model_name='room',
+                    name='sync_seq',
+                    field=models.BigIntegerField(db_index=True, default=0, editable=False),
+                ),
+            ],
+            database_operations=[
+                migrations.RunPython(add_sync_columns, drop_sync_columns),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=20)),
+                ('object_id', models.BigIntegerField()),
+                ('sync_seq', models.BigIntegerField(unique=True)),
+                ('deleted_at', models.DateTimeField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['deleted_at'], name='inventory_a_deleted_ec8ba1_idx')],
+            },
+        ),
+        migrations.RunPython(create_sync_triggers, drop_sync_triggers),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.1.3 on 2026-10-18 10:46
+
+from django.db import migrations, models
+
+
+def release_duplicate_hashes(apps, schema_editor):
+    # Keep the hash on the newest live job per audio; older ones stop answering retries
+    VoiceJob = apps.get_model('inventory_app', 'VoiceJob')
+    seen, older = set(), []
+    for pk, audio_hash in (VoiceJob.objects.exclude(audio_hash='').exclude(status='failed')
+                           .order_by('-created_at').values_list('pk', 'audio_hash')):
+        if audio_hash in seen:
+            older.append(pk)
+        seen.add(audio_hash)
+    VoiceJob.objects.filter(pk__in=older).update(audio_hash='')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory_app', '0016_sync_sequence'),
+    ]
+
+    operations = [
+        migrations.RunPython(release_duplicate_hashes, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='voicejob',
+            constraint=models.UniqueConstraint(condition=models.Q(models.Q(('audio_hash', ''), _negated=True), models.Q(('status', 'failed'), _negated=True)), fields=('audio_hash',), name='voicejob_unique_live_audio'),
+        ),
+    ]
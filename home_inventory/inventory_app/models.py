@@ -1,7 +1,29 @@
-from django.db import models
+import uuid
+
+from django.db import connection, models, transaction
+from django.db.models import F, Q, Value
+from django.db.models.functions import Concat, Substr
+
+from .signals import category_moved, location_moved
 from django.core.exceptions import ValidationError
 
 
+def subtree_filter(path, field='path'):
+    """
+    Filter kwargs selecting a materialized path and everything below it.
+
+    Expressed as a range rather than LIKE so that it is an index range scan on
+    every backend: '/' sorts directly before '0', so all descendants of
+    "3/17/" fall in ["3/17/", "3/170").
+    """
+    return {f'{field}__gte': path, f'{field}__lt': path[:-1] + '0'}
+
+
+def normalize_name(name):
+    """Case- and whitespace-insensitive form of a name, for matching dictated names."""
+    return ' '.join((name or '').split()).casefold()
+
+
 class Category(models.Model):
     name = models.CharField(max_length=100, unique=True)
     description = models.TextField(blank=True)
@@ -14,6 +36,12 @@ class Category(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Materialized path of ancestor ids ("3/17/42/") and nesting depth,
+    # maintained in save() and on delete (see signals.py)
+    path = models.CharField(max_length=255, blank=True, editable=False, db_index=True)
+    depth = models.PositiveIntegerField(default=0, editable=False)
+    # Change sequence of the last write, set by database triggers (see sync.py)
+    sync_seq = models.BigIntegerField(default=0, db_index=True, editable=False)
 
     def __str__(self):
         if self.parent:
@@ -26,19 +54,38 @@ class Category(models.Model):
             raise ValidationError(
                 "Eine Kategorie kann nicht ihre eigene Parent-Kategorie sein.")
 
-        # Prüfe auf Zyklen
-        if self.parent:
-            seen = {self.pk} if self.pk else set()
-            current = self.parent
-            while current:
-                if current.pk and current.pk in seen:
-                    raise ValidationError(
-                        "Diese Zuweisung würde einen Zyklus in der Kategorienhierarchie verursachen.")
-                if current == self:  # Direktvergleich für ungespeicherte Objekte
-                    raise ValidationError(
-                        "Diese Zuweisung würde einen Zyklus verursachen (direkte Selbstreferenz).")
-                seen.add(current.pk)
-                current = current.parent
+        # Prüfe auf Zyklen: der neue Parent darf nicht im eigenen Teilbaum liegen
+        if self.parent and self.pk and self.path and self.parent.path.startswith(self.path):
+            raise ValidationError(
+                "Diese Zuweisung würde einen Zyklus in der Kategorienhierarchie verursachen.")
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            self._update_path()
+
+    def _update_path(self):
+        parent_path = self.parent.path if self.parent_id else ''
+        path = f"{parent_path}{self.pk}/"
+        if path == self.path:
+            return
+        old_path, old_depth = self.path, self.depth
+        self.path, self.depth = path, path.count('/') - 1
+        Category.objects.filter(pk=self.pk).update(path=self.path, depth=self.depth)
+        if old_path:
+            # Re-root the whole subtree in one statement
+            Category.objects.filter(**subtree_filter(old_path)).exclude(pk=self.pk).update(
+                path=Concat(Value(path), Substr('path', len(old_path) + 1)),
+                depth=F('depth') + (self.depth - old_depth))
+            category_moved.send(sender=Category, instance=self, old_path=old_path)
+
+    def get_descendants(self, include_self=False):
+        """All categories below this one, as a single indexed range scan on path."""
+        descendants = Category.objects.filter(**subtree_filter(self.path))
+        return descendants if include_self else descendants.exclude(pk=self.pk)
+
+    def get_ancestor_ids(self):
+        return [int(pk) for pk in self.path.split('/')[:-2]]
 
     class Meta:
         verbose_name = "Category"
@@ -55,6 +102,16 @@ class Room(models.Model):
     name = models.CharField(max_length=100)
     floor_level = models.CharField(max_length=50, blank=True, null=True)
     description = models.TextField(blank=True, null=True)
+    # normalize_name(name), kept up to date in save(), for fuzzy name lookups
+    normalized_name = models.CharField(max_length=100, db_index=True, editable=False, default='')
+    # Change sequence of the last write, set by database triggers (see sync.py)
+    sync_seq = models.BigIntegerField(default=0, db_index=True, editable=False)
+
+    def save(self, *args, **kwargs):
+        self.normalized_name = normalize_name(self.name)
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'normalized_name'}
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.name
@@ -71,39 +128,228 @@ class Location(models.Model):
         related_name='sublocations'
     )
     description = models.TextField(blank=True)
+    # Resolved room (own room, or the top-level ancestor's); kept up to date in
+    # save() so list views can join it instead of walking parent_location.
+    effective_room = models.ForeignKey(
+        Room,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name='contained_locations'
+    )
+    # normalize_name(name), kept up to date in save(), for fuzzy name lookups
+    normalized_name = models.CharField(max_length=100, editable=False, default='')
+    # Change sequence of the last write, set by database triggers (see sync.py)
+    sync_seq = models.BigIntegerField(default=0, db_index=True, editable=False)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_effective_room_id = instance.__dict__.get('effective_room_id')
+        instance._loaded_parent_location_id = instance.__dict__.get('parent_location_id')
+        return instance
 
     def get_room(self):
         """Return the room for this location, inheriting from parent if a sublocation."""
+        if self.effective_room_id is not None:
+            return self.effective_room
         if self.parent_location:
             return self.parent_location.get_room()
         return self.room
 
+    def resolve_effective_room_id(self):
+        if self.parent_location_id is not None:
+            return self.parent_location.effective_room_id
+        return self.room_id
+
     def validate_hierarchy(self):
+        """
+        Room consistency from the foreign key columns alone, and cycles with at
+        most one closure-table lookup: the new parent must not lie in this
+        location's own subtree. Unchanged parents of saved locations need none.
+        """
         # Ensure top-level locations have a room
-        if self.parent_location is None and self.room is None:
+        if self.parent_location_id is None and self.room_id is None:
             raise ValidationError("Top-level locations must have a room.")
         # Ensure sublocations don't have a room
-        if self.parent_location is not None and self.room is not None:
+        if self.parent_location_id is not None and self.room_id is not None:
             raise ValidationError("Sublocations cannot have a room directly.")
         # Prevent cycles in location hierarchy
-        if self.parent_location:
-            seen = {self.id}
-            current = self.parent_location
-            while current:
-                if current.id in seen:
-                    raise ValidationError(f"Cycle detected in location hierarchy: {self.name}.")
-                seen.add(current.id)
-                current = current.parent_location
+        if self.parent_location_id is None or self.pk is None:
+            return
+        if self.parent_location_id == self.pk or (
+                getattr(self, '_loaded_parent_location_id', None) != self.parent_location_id
+                and LocationClosure.objects.filter(
+                    ancestor_id=self.pk, descendant_id=self.parent_location_id).exists()):
+            raise ValidationError(f"Cycle detected in location hierarchy: {self.name}.")
+
+    def move_to(self, parent_location=None, room=None):
+        """
+        Re-hang this location and its whole subtree below ``parent_location``,
+        or make it a top-level location in ``room``. The statements issued do
+        not depend on the subtree's size or depth: the closure rows, the
+        sublocations' effective room and the rollups (which carry the items'
+        rooms) are each rewritten set-wise.
+        """
+        self.parent_location = parent_location
+        self.room = room
+        self.save(update_fields=['parent_location', 'room'])
 
     def save(self, *args, **kwargs):
         self.validate_hierarchy()
-        super().save(*args, **kwargs)
+        self.effective_room_id = self.resolve_effective_room_id()
+        self.normalized_name = normalize_name(self.name)
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'effective_room', 'normalized_name'}
+        adding = self._state.adding
+        moved = not adding and getattr(self, '_loaded_parent_location_id', None) != self.parent_location_id
+        old_room_id = getattr(self, '_loaded_effective_room_id', None)
+        room_changed = not adding and old_room_id != self.effective_room_id
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if adding:
+                self._insert_closure()
+            elif moved:
+                old_ancestor_ids = list(self.get_ancestors().values_list('id', flat=True))
+                self._move_closure()
+            if room_changed:
+                self.propagate_effective_room()
+            if moved or room_changed:
+                location_moved.send(
+                    sender=Location, instance=self, old_room_id=old_room_id,
+                    old_ancestor_ids=old_ancestor_ids if moved else
+                    list(self.get_ancestors().values_list('id', flat=True)))
+        self._loaded_effective_room_id = self.effective_room_id
+        self._loaded_parent_location_id = self.parent_location_id
+
+    @classmethod
+    def bulk_create_top_level(cls, locations):
+        """
+        Insert new top-level locations with one INSERT (plus one for their
+        closure rows) instead of a save() per location.
+        """
+        for location in locations:
+            if location.room_id is None or location.parent_location_id is not None:
+                raise ValidationError("Top-level locations must have a room.")
+            location.effective_room_id = location.room_id
+            location.normalized_name = normalize_name(location.name)
+        locations = cls.objects.bulk_create(locations)
+        LocationClosure.objects.bulk_create([
+            LocationClosure(ancestor_id=location.pk, descendant_id=location.pk, depth=0)
+            for location in locations])
+        for location in locations:
+            location._loaded_effective_room_id = location.effective_room_id
+            location._loaded_parent_location_id = None
+        return locations
+
+    def _insert_closure(self):
+        links = [LocationClosure(ancestor_id=self.pk, descendant_id=self.pk, depth=0)]
+        if self.parent_location_id is not None:
+            links += [
+                LocationClosure(ancestor_id=ancestor_id, descendant_id=self.pk, depth=depth + 1)
+                for ancestor_id, depth in LocationClosure.objects.filter(
+                    descendant_id=self.parent_location_id).values_list('ancestor_id', 'depth')
+            ]
+        LocationClosure.objects.bulk_create(links)
+
+    def _move_closure(self):
+        """Re-hang this location's subtree below its new parent in the closure table."""
+        subtree = LocationClosure.objects.filter(ancestor_id=self.pk).values('descendant_id')
+        LocationClosure.objects.filter(descendant_id__in=subtree).exclude(
+            ancestor_id__in=subtree).delete()
+        if self.parent_location_id is None:
+            return
+        table = connection.ops.quote_name(LocationClosure._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {table} (ancestor_id, descendant_id, depth) "
+                f"SELECT a.ancestor_id, d.descendant_id, a.depth + d.depth + 1 "
+                f"FROM {table} a, {table} d "
+                f"WHERE a.descendant_id = %s AND d.ancestor_id = %s",
+                [self.parent_location_id, self.pk])
+
+    def propagate_effective_room(self):
+        """Push this location's effective room down to all of its sublocations."""
+        self.get_descendants().update(effective_room_id=self.effective_room_id)
+
+    def get_descendants(self, include_self=False):
+        """All locations nested anywhere below this one, in one indexed query."""
+        return Location.objects.filter(
+            ancestor_links__ancestor_id=self.pk,
+            ancestor_links__depth__gte=0 if include_self else 1)
+
+    def get_ancestors(self):
+        """Ancestors ordered from the top-level location down to the direct parent."""
+        return Location.objects.filter(
+            descendant_links__descendant_id=self.pk,
+            descendant_links__depth__gte=1).order_by('-descendant_links__depth')
 
     def __str__(self):
         if self.parent_location:
             return f"{self.name} (in {self.parent_location.name})"
         return self.name
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['name']),  # (name, id) keyset pagination
+            models.Index(fields=['normalized_name', 'effective_room']),
+        ]
+
+
+class InventoryRollup(models.Model):
+    """
+    Pre-aggregated item totals for the whole inventory, each room, each
+    location subtree and each category subtree. Maintained incrementally by
+    rollups.py; ``manage.py reconcile_rollups`` recomputes them from scratch.
+    """
+    SCOPE_TOTAL = 'total'
+    SCOPE_ROOM = 'room'
+    SCOPE_LOCATION = 'location'
+    SCOPE_CATEGORY = 'category'
+    SCOPE_CHOICES = [
+        (SCOPE_TOTAL, 'Total'),
+        (SCOPE_ROOM, 'Room'),
+        (SCOPE_LOCATION, 'Location subtree'),
+        (SCOPE_CATEGORY, 'Category subtree'),
+    ]
+
+    scope = models.CharField(max_length=10, choices=SCOPE_CHOICES)
+    object_id = models.BigIntegerField(default=0)  # 0 for the total row
+    item_count = models.IntegerField(default=0)
+    quantity = models.BigIntegerField(default=0)
+    purchase_price = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    current_value = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ['scope', 'object_id']
+
+    def __str__(self):
+        return f"{self.scope} {self.object_id}: {self.item_count} items"
+
+
+class LocationClosure(models.Model):
+    """
+    Closure table of the location hierarchy: one row per (ancestor, descendant)
+    pair, including a depth-0 row for every location itself. Maintained by
+    Location.save(); rows are removed with their locations via CASCADE.
+    """
+    ancestor = models.ForeignKey(
+        Location, on_delete=models.CASCADE, related_name='descendant_links')
+    descendant = models.ForeignKey(
+        Location, on_delete=models.CASCADE, related_name='ancestor_links')
+    depth = models.PositiveIntegerField()
+
+    class Meta:
+        unique_together = ['ancestor', 'descendant']
+        indexes = [
+            models.Index(fields=['ancestor', 'depth']),
+            models.Index(fields=['descendant', 'depth']),
+        ]
+
+    def __str__(self):
+        return f"{self.ancestor_id} > {self.descendant_id} ({self.depth})"
+
 
 class Item(models.Model):
     name = models.CharField(max_length=255)
@@ -120,6 +366,104 @@ class Item(models.Model):
     location = models.ForeignKey(
         Location, related_name='items', on_delete=models.SET_NULL, null=True, blank=True)
     notes = models.TextField(blank=True, null=True)
+    # Change sequence of the last write, set by database triggers (see sync.py)
+    sync_seq = models.BigIntegerField(default=0, db_index=True, editable=False)
 
     def __str__(self):
         return self.name
+
+    class Meta:
+        # Back the ItemViewSet filters and (field, id) keyset orderings
+        indexes = [
+            models.Index(fields=['name', 'id']),
+            models.Index(fields=['purchase_date', 'id']),
+            models.Index(fields=['purchase_price', 'id']),
+            models.Index(fields=['current_value', 'id']),
+            models.Index(fields=['quantity', 'id']),
+            models.Index(fields=['serial_number', 'id']),
+            models.Index(fields=['location', 'name', 'id']),
+            models.Index(fields=['category', 'name', 'id']),
+        ]
+
+
+class VoiceJob(models.Model):
+    """
+    One voice upload on its way through transcription, extraction and item
+    creation in the background worker pool (see jobs.py). The audio is kept
+    only until the job has run.
+    """
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_SUCCEEDED = 'succeeded'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_SUCCEEDED, 'Succeeded'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    audio = models.BinaryField(blank=True, null=True)
+    audio_name = models.CharField(max_length=255, blank=True)
+    # sha256 of the audio; repeated uploads are answered with the earlier job.
+    # Cleared once the job is past the dedupe window (voice.create_job)
+    audio_hash = models.CharField(max_length=64, blank=True, db_index=True)
+    transcript = models.TextField(blank=True)
+    extracted = models.JSONField(blank=True, null=True)
+    item_ids = models.JSONField(default=list, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            # One live job per audio, so concurrent retries of an upload cannot both create one
+            models.UniqueConstraint(fields=['audio_hash'], name='voicejob_unique_live_audio',
+                                    condition=~Q(audio_hash='') & ~Q(status='failed')),
+        ]
+
+    def __str__(self):
+        return f"{self.id} ({self.status})"
+
+
+class ModelVersion(models.Model):
+    """
+    Change counter per model (``app_label.model_name``), bumped on every write
+    by the receivers in receivers.py. Drives the ETag and Last-Modified
+    headers of the API (see conditional.py).
+    """
+    label = models.CharField(max_length=100, unique=True)
+    version = models.BigIntegerField(default=0)
+    changed_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.label} v{self.version}"
+
+
+class SyncCounter(models.Model):
+    """
+    The single row (id 1) holding the last change sequence handed out by the
+    sync triggers, and the sequence up to which tombstones were pruned;
+    tokens older than that can no longer be answered incrementally.
+    """
+    value = models.BigIntegerField(default=0)
+    pruned_through = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"seq {self.value} (pruned through {self.pruned_through})"
+
+
+class Tombstone(models.Model):
+    """A deleted room, location, category or item, written by the sync triggers (see sync.py)."""
+    model = models.CharField(max_length=20)
+    object_id = models.BigIntegerField()
+    sync_seq = models.BigIntegerField(unique=True)
+    deleted_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [models.Index(fields=['deleted_at'])]
+
+    def __str__(self):
+        return f"{self.model} {self.object_id} deleted at seq {self.sync_seq}"
@@ -0,0 +1,177 @@
+import base64
+import binascii
+import datetime
+import decimal
+import json
+
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination that seeks on the complete ordering key.
+
+    Every page is fetched with ``WHERE (key) > (last key) ORDER BY key LIMIT n``,
+    so page 1000 costs the same as page 1. The ordering must end in a unique
+    column (``id``); nullable columns sort NULLs first when ascending and last
+    when descending, and the seek condition accounts for them.
+    """
+    ordering = ('id',)
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        position, reverse = self.decode_cursor(request)
+        keys = [_invert(key) for key in self.ordering] if reverse else list(self.ordering)
+
+        queryset = queryset.order_by(*[_order_by(key) for key in keys])
+        if position is not None:
+            queryset = queryset.filter(_seek(keys, position))
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+
+        if reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+        self.page = rows
+        return rows
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def get_ordering(self, request, queryset, view):
+        ordering = None
+        for backend in getattr(view, 'filter_backends', ()):
+            if hasattr(backend, 'get_keyset_ordering'):
+                ordering = backend().get_keyset_ordering(request, view)
+                break
+        ordering = tuple(ordering or self.ordering)
+        assert ordering[-1].lstrip('-') in ('id', 'pk'), (
+            'Keyset ordering must end with a unique field, got %r' % (ordering,))
+        return ordering
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.get_position(self.page[-1]), reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.get_position(self.page[0]), reverse=True)
+
+    def get_position(self, row):
+        return [_encode_value(_lookup(row, key.lstrip('-'))) for key in self.ordering]
+
+    def encode_cursor(self, position, reverse):
+        payload = {'p': position}
+        if reverse:
+            payload['r'] = 1
+        token = base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(token.encode()).decode())
+            position = payload['p']
+            reverse = bool(payload.get('r'))
+        except (binascii.Error, ValueError, KeyError, TypeError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+
+class NameKeysetPagination(KeysetPagination):
+    """Keyset pagination over the ``(name, id)`` ordering."""
+    ordering = ('name', 'id')
+
+
+class SearchPagination(PageNumberPagination):
+    """Page-number pagination for ranked search results, which have no stable key."""
+    page_size = 25
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+def _invert(key):
+    return key[1:] if key.startswith('-') else '-' + key
+
+
+def _order_by(key):
+    if key.startswith('-'):
+        return F(key[1:]).desc(nulls_last=True)
+    return F(key).asc(nulls_first=True)
+
+
+def _seek(keys, position):
+    """Build a Q that matches rows strictly after ``position`` in ``keys`` order."""
+    condition = None
+    for key, value in reversed(list(zip(keys, position))):
+        field = key.lstrip('-')
+        descending = key.startswith('-')
+        if value is None:
+            after = None if descending else Q(**{field + '__isnull': False})
+            equal = Q(**{field + '__isnull': True})
+        else:
+            lookup = '__lt' if descending else '__gt'
+            after = Q(**{field + lookup: value})
+            if descending:
+                after |= Q(**{field + '__isnull': True})
+            equal = Q(**{field: value})
+        if condition is not None:
+            tie = equal & condition
+            after = tie if after is None else after | tie
+        condition = after
+    return condition if condition is not None else Q(pk__in=[])
+
+
+def _lookup(row, path):
+    if isinstance(row, dict):
+        return row[path]
+    value = row
+    for attr in path.split('__'):
+        value = getattr(value, attr, None)
+        if value is None:
+            return None
+    return value
+
+
+def _encode_value(value):
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    return value
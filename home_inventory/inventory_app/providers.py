@@ -0,0 +1,81 @@
+import json
+import os
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+EXTRACTION_PROMPT = """
+Extract structured information from the following text:
+- Identify item names and quantities.
+- Identify room and location (if mentioned).
+- Output in JSON format: {{
+  "items": [
+    {{"name": "Item1", "quantity": 1, "room": "Room1", "location": "Location1"}},
+    {{"name": "Item2", "quantity": 2, "room": null, "location": null}}
+  ]
+}}
+Text: {text}
+"""
+
+
+class VoiceProvider:
+    """Interface for speech-to-text and item extraction; select one with INVENTORY_VOICE_PROVIDER."""
+
+    def transcribe(self, audio, filename):
+        """Return the transcript of the ``audio`` bytes."""
+        raise NotImplementedError
+
+    def extract(self, transcript):
+        """Return ``{"items": [{"name", "quantity", "room", "location"}, ...]}``."""
+        raise NotImplementedError
+
+
+class OpenAIProvider(VoiceProvider):
+    """Whisper transcription and chat-completion extraction through the OpenAI API."""
+    transcription_model = 'whisper-1'
+    extraction_model = 'gpt-4-turbo'
+
+    def __init__(self):
+        import openai
+        api_key = getattr(settings, 'OPENAI_API_KEY', None) or os.environ.get('OPENAI_API_KEY')
+        self.client = openai.OpenAI(api_key=api_key)
+
+    def transcribe(self, audio, filename):
+        transcription = self.client.audio.transcriptions.create(
+            model=self.transcription_model, file=(filename or 'audio.wav', audio))
+        return transcription.text
+
+    def extract(self, transcript):
+        response = self.client.chat.completions.create(
+            model=self.extraction_model,
+            response_format={"type": "json_object"},
+            messages=[
+                {"role": "system", "content": "You are an assistant that extracts structured data from text."},
+                {"role": "user", "content": EXTRACTION_PROMPT.format(text=transcript)},
+            ])
+        return json.loads(response.choices[0].message.content)
+
+
+class StubProvider(VoiceProvider):
+    """
+    Offline provider for tests and development: the "audio" is read as UTF-8
+    text, and a transcript that is a JSON object is taken as the extraction;
+    anything else becomes a single item named after the transcript.
+    """
+
+    def transcribe(self, audio, filename):
+        return audio.decode('utf-8', errors='replace').strip()
+
+    def extract(self, transcript):
+        try:
+            data = json.loads(transcript)
+        except ValueError:
+            data = None
+        if isinstance(data, dict):
+            return data
+        return {"items": [{"name": transcript, "quantity": 1, "room": None, "location": None}]}
+
+
+def get_voice_provider():
+    return import_string(getattr(
+        settings, 'INVENTORY_VOICE_PROVIDER', 'inventory_app.providers.OpenAIProvider'))()
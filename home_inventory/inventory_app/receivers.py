@@ -0,0 +1,154 @@
+from django.db.models import Q, Value
+from django.db.models.functions import Concat, Length, Replace, StrIndex, Substr
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import events, response_cache, rollups, versions
+from .models import Category, Item, Location, Room
+from .signals import category_moved, in_bulk_write, items_bulk_changed, location_moved, rows_bulk_created
+
+
+@receiver(post_delete, sender=Category)
+def reroot_subcategories(sender, instance, **kwargs):
+    """
+    Subcategories of a deleted category become top-level: cut their paths
+    after its id. Matched on the id, not on ``instance.path``, which is stale
+    when a queryset delete re-rooted this category below a deleted parent
+    first.
+    """
+    if not instance.path:
+        return
+    segment = f'/{instance.pk}/'
+    path = Substr('path', StrIndex(Concat(Value('/'), 'path'), Value(segment)) - 1 + len(segment))
+    Category.objects.filter(Q(path__startswith=segment[1:]) | Q(path__contains=segment)).update(
+        path=path, depth=Length(path) - Length(Replace(path, Value('/'), Value(''))) - 1)
+
+
+# Valuation rollups
+
+@receiver(pre_save, sender=Item)
+def remember_item_state(sender, instance, raw=False, **kwargs):
+    instance._rollup_before = rollups.item_states([instance.pk]) if instance.pk and not raw else []
+
+
+@receiver(post_save, sender=Item)
+def rollup_item_saved(sender, instance, raw=False, **kwargs):
+    if raw or in_bulk_write():
+        return
+    rollups.apply_item_changes(getattr(instance, '_rollup_before', []), [rollups.item_state(instance)])
+
+
+@receiver(post_delete, sender=Item)
+def rollup_item_deleted(sender, instance, **kwargs):
+    if in_bulk_write():
+        return
+    rollups.apply_item_changes([rollups.item_state(instance)], [])
+
+
+@receiver(items_bulk_changed, sender=Item)
+def rollup_items_bulk_changed(sender, created, updated, deleted, before, **kwargs):
+    rollups.apply_item_changes(before, rollups.item_states(created + updated))
+
+
+@receiver(location_moved, sender=Location)
+def rollup_location_moved(sender, instance, old_ancestor_ids, old_room_id, **kwargs):
+    rollups.location_moved(instance, old_ancestor_ids, old_room_id)
+
+
+@receiver(category_moved, sender=Category)
+def rollup_category_moved(sender, instance, old_path, **kwargs):
+    rollups.category_moved(instance, old_path)
+
+
+@receiver(pre_delete, sender=Location)
+def rollup_location_deleted(sender, instance, **kwargs):
+    rollups.location_deleted(instance)
+
+
+@receiver(pre_delete, sender=Category)
+def rollup_category_deleted(sender, instance, **kwargs):
+    rollups.category_deleted(instance)
+
+
+@receiver(post_delete, sender=Room)
+@receiver(post_delete, sender=Location)
+@receiver(post_delete, sender=Category)
+def discard_rollup(sender, instance, **kwargs):
+    rollups.discard(sender._meta.model_name, instance.pk)
+
+
+# Version stamps (ETag / Last-Modified)
+
+@receiver(post_save, sender=Room)
+@receiver(post_save, sender=Location)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Room)
+@receiver(post_delete, sender=Location)
+@receiver(post_delete, sender=Category)
+def bump_version(sender, **kwargs):
+    versions.bump(sender)
+
+
+@receiver(post_save, sender=Item)
+@receiver(post_delete, sender=Item)
+def bump_item_version(sender, **kwargs):
+    if not in_bulk_write():
+        versions.bump(Item)
+
+
+@receiver(items_bulk_changed, sender=Item)
+def bump_items_bulk_changed(sender, **kwargs):
+    versions.bump(Item)
+
+
+@receiver(rows_bulk_created, sender=Room)
+@receiver(rows_bulk_created, sender=Location)
+def bump_rows_bulk_created(sender, **kwargs):
+    versions.bump(sender)
+
+
+# Response cache
+
+@receiver(post_save, sender=Room)
+@receiver(post_save, sender=Location)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Room)
+@receiver(post_delete, sender=Location)
+@receiver(post_delete, sender=Category)
+@receiver(rows_bulk_created, sender=Room)
+@receiver(rows_bulk_created, sender=Location)
+def invalidate_responses(sender, **kwargs):
+    response_cache.invalidate_model(sender)
+
+
+# Change events (events.py)
+
+@receiver(post_save, sender=Room)
+@receiver(post_save, sender=Location)
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Item)
+def publish_saved(sender, instance, created=False, raw=False, **kwargs):
+    if raw or (sender is Item and in_bulk_write()):
+        return
+    events.object_changed(instance, events.CREATED if created else events.UPDATED)
+
+
+@receiver(post_delete, sender=Room)
+@receiver(post_delete, sender=Location)
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Item)
+def publish_deleted(sender, instance, **kwargs):
+    if sender is Item and in_bulk_write():
+        return
+    events.object_changed(instance, events.DELETED)
+
+
+@receiver(items_bulk_changed, sender=Item)
+def publish_items_bulk_changed(sender, created, updated, deleted, **kwargs):
+    events.objects_changed(Item, created=created, updated=updated, deleted=deleted)
+
+
+@receiver(rows_bulk_created, sender=Room)
+@receiver(rows_bulk_created, sender=Location)
+def publish_rows_bulk_created(sender, ids, **kwargs):
+    events.objects_changed(sender, created=ids)
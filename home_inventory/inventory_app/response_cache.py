@@ -0,0 +1,132 @@
+"""
+Server-side cache for the serialized list and tree responses of the room,
+location and category viewsets.
+
+Entries live in the Django cache named by ``INVENTORY_RESPONSE_CACHE``, so
+the backend is pluggable: local memory, files, or Redis. Each cache group
+has a generation counter in the same backend, and the entry keys include it.
+The receivers in receivers.py bump the counters of exactly the groups a
+model change affects, so stale entries are never served and simply expire.
+With the local-memory backend, invalidation reaches only the process that
+made the change, so use a shared backend when running several workers.
+Responses read from a lagging replica are served but not stored, or they
+would outlive the generation bump of the write they do not show yet.
+"""
+import hashlib
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework import status
+from rest_framework.response import Response
+
+from .routers import reading_from_replica
+
+# Which cache groups each model's rows appear in
+GROUPS_BY_MODEL = {
+    'room': ('rooms', 'locations'),  # locations show their room name
+    'location': ('rooms', 'locations'),  # rooms embed their locations
+    'category': ('categories',),
+}
+
+_lock = threading.Lock()
+_counters = defaultdict(lambda: {'hits': 0, 'misses': 0})
+
+
+def get_cache():
+    return caches[getattr(settings, 'INVENTORY_RESPONSE_CACHE', 'default')]
+
+
+def _generation_key(group):
+    return f'inventory:responses:{group}:generation'
+
+
+def _generation(cache, group):
+    return cache.get_or_set(_generation_key(group), 1, timeout=None)
+
+
+def invalidate(*groups):
+    """Drop every cached response of ``groups``, now and again when the transaction commits."""
+    def bump():
+        cache = get_cache()
+        for group in groups:
+            try:
+                cache.incr(_generation_key(group))
+            except ValueError:
+                cache.set(_generation_key(group), 2, timeout=None)
+
+    bump()
+    # A request between the write and the commit may have cached the old rows
+    transaction.on_commit(bump)
+
+
+def invalidate_model(model):
+    groups = GROUPS_BY_MODEL.get(model._meta.model_name)
+    if groups:
+        invalidate(*groups)
+
+
+def _count(group, outcome):
+    with _lock:
+        _counters[group][outcome] += 1
+
+
+def stats():
+    """Per-group hit/miss counters of this process."""
+    with _lock:
+        return {
+            group: {**counts, 'hit_ratio': round(counts['hits'] / (counts['hits'] + counts['misses']), 3)}
+            for group, counts in sorted(_counters.items())
+        }
+
+
+def reset_stats():
+    with _lock:
+        _counters.clear()
+
+
+class _CacheHit(Exception):
+    def __init__(self, data):
+        self.data = data
+
+
+class ResponseCacheMixin:
+    """
+    Serve ``cached_actions`` of a viewset from the response cache under
+    ``cache_group``. The key is the absolute request URL (pagination links
+    include the host) plus the renderer, so every query string variant is
+    cached separately. Only 200 responses with
+    data are stored; streamed responses pass through.
+    """
+    cache_group = None
+    cached_actions = ('list',)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.response_cache_key = None
+        if request.method != 'GET' or self.action not in self.cached_actions:
+            return
+        cache = get_cache()
+        digest = hashlib.sha1(
+            f"{request.build_absolute_uri()}|{request.accepted_renderer.format}".encode()).hexdigest()
+        key = f'inventory:responses:{self.cache_group}:{_generation(cache, self.cache_group)}:{digest}'
+        data = cache.get(key)
+        if data is not None:
+            _count(self.cache_group, 'hits')
+            raise _CacheHit(data)
+        _count(self.cache_group, 'misses')
+        self.response_cache_key = key
+
+    def handle_exception(self, exc):
+        if isinstance(exc, _CacheHit):
+            return Response(exc.data)
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        key = getattr(self, 'response_cache_key', None)
+        if (key and isinstance(response, Response) and response.status_code == status.HTTP_200_OK
+                and not reading_from_replica()):
+            get_cache().set(key, response.data)
+        return super().finalize_response(request, response, *args, **kwargs)
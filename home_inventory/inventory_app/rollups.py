@@ -0,0 +1,235 @@
+"""
+Incremental maintenance of InventoryRollup.
+
+Every change is expressed as a delta vector (item count, quantity, purchase
+price, current value) per affected rollup key, so an item save touches a
+handful of rows instead of re-aggregating the item table. Moves of whole
+location or category subtrees shift one subtree total between the old and
+new ancestors.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db.models import Count, F, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import Category, InventoryRollup, Item, Location, LocationClosure, subtree_filter
+
+TOTAL = ('total', 0)
+ITEM_FIELDS = ('location_id', 'category_id', 'quantity', 'purchase_price', 'current_value')
+ZERO = (0, 0, Decimal('0.00'), Decimal('0.00'))
+CENT = Decimal('0.01')
+
+
+def _decimal(value):
+    # SQLite sums decimals as floats; round the noise off large totals
+    return Decimal(str(value)).quantize(CENT) if value is not None else Decimal('0.00')
+
+
+def item_state(item):
+    """The rollup-relevant fields of an item instance, as a dict."""
+    return {field: getattr(item, field) for field in ITEM_FIELDS}
+
+
+def item_states(item_ids):
+    """Current rollup-relevant fields of the given items, read in one query."""
+    return list(Item.objects.filter(id__in=item_ids).values(*ITEM_FIELDS))
+
+
+def _vector(state, sign=1):
+    return (sign, sign * int(state['quantity'] or 0),
+            sign * _decimal(state['purchase_price']), sign * _decimal(state['current_value']))
+
+
+def _aggregate(queryset):
+    totals = queryset.aggregate(
+        item_count=Count('id'),
+        quantity=Coalesce(Sum('quantity'), Value(0)),
+        purchase_price=Sum('purchase_price'),
+        current_value=Sum('current_value'))
+    return (totals['item_count'], totals['quantity'],
+            _decimal(totals['purchase_price']), _decimal(totals['current_value']))
+
+
+def _add(deltas, key, vector, sign=1):
+    current = deltas[key]
+    deltas[key] = tuple(a + sign * b for a, b in zip(current, vector))
+
+
+def _path_ids(path):
+    return [int(pk) for pk in path.split('/') if pk]
+
+
+def apply_item_changes(before, after):
+    """
+    Update the rollups for items going from the ``before`` states to the
+    ``after`` states (dicts with ITEM_FIELDS; new items have no before state,
+    deleted ones no after state).
+    """
+    states = list(before) + list(after)
+    location_ids = {s['location_id'] for s in states if s['location_id'] is not None}
+    category_ids = {s['category_id'] for s in states if s['category_id'] is not None}
+
+    ancestors = defaultdict(list)
+    for descendant_id, ancestor_id in LocationClosure.objects.filter(
+            descendant_id__in=location_ids).values_list('descendant_id', 'ancestor_id'):
+        ancestors[descendant_id].append(ancestor_id)
+    rooms = dict(Location.objects.filter(id__in=location_ids).values_list('id', 'effective_room_id'))
+    category_paths = dict(Category.objects.filter(id__in=category_ids).values_list('id', 'path'))
+
+    deltas = defaultdict(lambda: ZERO)
+    for states, sign in ((before, -1), (after, 1)):
+        for state in states:
+            vector = _vector(state, sign)
+            keys = [TOTAL]
+            if state['location_id'] is not None:
+                keys += [('location', pk) for pk in ancestors[state['location_id']]]
+                if rooms.get(state['location_id']) is not None:
+                    keys.append(('room', rooms[state['location_id']]))
+            if state['category_id'] in category_paths:
+                keys += [('category', pk) for pk in _path_ids(category_paths[state['category_id']])]
+            for key in keys:
+                _add(deltas, key, vector)
+    apply_deltas(deltas)
+
+
+def apply_deltas(deltas):
+    """Add each delta vector to its rollup row, creating missing rows first."""
+    deltas = {key: vector for key, vector in deltas.items() if any(vector)}
+    if not deltas:
+        return
+    InventoryRollup.objects.bulk_create(
+        [InventoryRollup(scope=scope, object_id=object_id) for scope, object_id in deltas],
+        ignore_conflicts=True)
+    # One UPDATE per (scope, delta) group: a single item change moves the same
+    # amounts up its whole ancestor chain
+    groups = defaultdict(list)
+    for (scope, object_id), vector in deltas.items():
+        groups[(scope, vector)].append(object_id)
+    for (scope, (count, quantity, price, value)), object_ids in groups.items():
+        InventoryRollup.objects.filter(scope=scope, object_id__in=object_ids).update(
+            item_count=F('item_count') + count,
+            quantity=F('quantity') + quantity,
+            purchase_price=F('purchase_price') + price,
+            current_value=F('current_value') + value)
+
+
+def location_moved(location, old_ancestor_ids, old_room_id):
+    """Shift a moved location subtree's totals from its old ancestors/room to the new ones."""
+    totals = _aggregate(Item.objects.filter(location__ancestor_links__ancestor_id=location.pk))
+    if not totals[0]:
+        return
+    old = set(old_ancestor_ids)
+    new = set(location.get_ancestors().values_list('id', flat=True))
+    deltas = defaultdict(lambda: ZERO)
+    for pk in old - new:
+        _add(deltas, ('location', pk), totals, -1)
+    for pk in new - old:
+        _add(deltas, ('location', pk), totals)
+    if old_room_id != location.effective_room_id:
+        if old_room_id is not None:
+            _add(deltas, ('room', old_room_id), totals, -1)
+        if location.effective_room_id is not None:
+            _add(deltas, ('room', location.effective_room_id), totals)
+    apply_deltas(deltas)
+
+
+def category_moved(category, old_path):
+    """Shift a moved category subtree's totals from its old ancestors to the new ones."""
+    totals = _aggregate(Item.objects.filter(**subtree_filter(category.path, 'category__path')))
+    if not totals[0]:
+        return
+    old = set(_path_ids(old_path)[:-1])
+    new = set(_path_ids(category.path)[:-1])
+    deltas = defaultdict(lambda: ZERO)
+    for pk in old - new:
+        _add(deltas, ('category', pk), totals, -1)
+    for pk in new - old:
+        _add(deltas, ('category', pk), totals)
+    apply_deltas(deltas)
+
+
+def location_deleted(location):
+    """
+    Remove a location's own items from its ancestors and room. Called for every
+    location in a cascading delete, so each item is subtracted exactly once.
+    """
+    totals = _aggregate(Item.objects.filter(location_id=location.pk))
+    if totals[0]:
+        deltas = defaultdict(lambda: ZERO)
+        for pk in location.get_ancestors().values_list('id', flat=True):
+            _add(deltas, ('location', pk), totals, -1)
+        if location.effective_room_id is not None:
+            _add(deltas, ('room', location.effective_room_id), totals, -1)
+        apply_deltas(deltas)
+
+
+def category_deleted(category):
+    """Remove a category's whole subtree from its ancestors; the children become roots."""
+    totals = _aggregate(Item.objects.filter(**subtree_filter(category.path, 'category__path')))
+    if totals[0]:
+        deltas = defaultdict(lambda: ZERO)
+        for pk in _path_ids(category.path)[:-1]:
+            _add(deltas, ('category', pk), totals, -1)
+        apply_deltas(deltas)
+
+
+def discard(scope, object_id):
+    """Drop the rollup row of a deleted room, location or category."""
+    InventoryRollup.objects.filter(scope=scope, object_id=object_id).delete()
+
+
+def compute_rollups():
+    """Recompute every rollup from the item table; returns {(scope, object_id): vector}."""
+    aggregates = dict(
+        item_count=Count('id'),
+        quantity=Coalesce(Sum('quantity'), Value(0)),
+        purchase_price=Sum('purchase_price'),
+        current_value=Sum('current_value'))
+
+    def vector(row):
+        return (row['item_count'], row['quantity'],
+                _decimal(row['purchase_price']), _decimal(row['current_value']))
+
+    expected = defaultdict(lambda: ZERO)
+    total = Item.objects.aggregate(**aggregates)
+    if total['item_count']:
+        expected[TOTAL] = vector(total)
+    for row in Item.objects.filter(location__effective_room__isnull=False).values(
+            'location__effective_room_id').annotate(**aggregates).order_by():
+        expected[('room', row['location__effective_room_id'])] = vector(row)
+    for row in Item.objects.filter(location__isnull=False).values(
+            'location__ancestor_links__ancestor_id').annotate(**aggregates).order_by():
+        expected[('location', row['location__ancestor_links__ancestor_id'])] = vector(row)
+    paths = dict(Category.objects.values_list('id', 'path'))
+    for row in Item.objects.filter(category__isnull=False).values(
+            'category_id').annotate(**aggregates).order_by():
+        for pk in _path_ids(paths[row['category_id']]):
+            _add(expected, ('category', pk), vector(row))
+    return dict(expected)
+
+
+def reconcile(fix=True):
+    """
+    Compare the stored rollups with a full recomputation. Returns a list of
+    ``(key, stored, expected)`` drift entries and, with ``fix``, rewrites the
+    table to the expected values.
+    """
+    expected = compute_rollups()
+    stored = {
+        (row.scope, row.object_id): (row.item_count, row.quantity, row.purchase_price, row.current_value)
+        for row in InventoryRollup.objects.all()
+    }
+    drift = []
+    for key in sorted(set(expected) | set(stored)):
+        have, want = stored.get(key, ZERO), expected.get(key, ZERO)
+        if have != want:
+            drift.append((key, have, want))
+    if fix and drift:
+        InventoryRollup.objects.all().delete()
+        InventoryRollup.objects.bulk_create([
+            InventoryRollup(scope=scope, object_id=object_id, item_count=count,
+                            quantity=quantity, purchase_price=price, current_value=value)
+            for (scope, object_id), (count, quantity, price, value) in expected.items()
+        ], batch_size=500)
+    return drift
@@ -0,0 +1,52 @@
+"""
+Read-replica routing: inside ``replica_reads()`` (entered by
+ReplicaReadMiddleware for GET and HEAD requests to the API) queries go to the
+``replica`` database alias, everything else, and every write, to ``default``.
+The replica is a copy of the primary file kept up to date outside Django, so
+it is never migrated. Its lag is why the response cache does not store what
+was read from it, and why a client's reads go to the primary for a while
+after it wrote (see ReplicaReadMiddleware).
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA_DB_ALIAS = 'replica'
+
+_replica_reads = ContextVar('inventory_replica_reads', default=False)
+
+
+@contextmanager
+def replica_reads():
+    """Send the reads of this block to the replica, if one is configured."""
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def replica_configured():
+    return REPLICA_DB_ALIAS in connections
+
+
+def reading_from_replica():
+    """Whether the reads of the current context go to the replica."""
+    return _replica_reads.get() and replica_configured()
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if reading_from_replica():
+            return REPLICA_DB_ALIAS
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True  # both aliases hold the same data
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != REPLICA_DB_ALIAS
@@ -0,0 +1,160 @@
+import html
+import re
+from dataclasses import dataclass
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.utils.module_loading import import_string
+
+from .models import Item
+
+FTS_TABLE = 'inventory_app_item_fts'
+# Indexed Item columns, in FTS column order, with their bm25 weights
+SEARCH_FIELDS = (('name', 10.0), ('description', 2.0), ('notes', 1.0), ('serial_number', 5.0))
+# Match delimiters (private-use characters) swapped for <mark> after the text is escaped
+MARK_START, MARK_END = '\ue000', '\ue001'
+
+
+@dataclass
+class SearchHit:
+    """One result; ``snippet`` is HTML-escaped text with the matches wrapped in <mark>."""
+    item_id: int
+    score: float
+    snippet: str
+
+
+class SearchBackend:
+    """Interface for item full-text search; select one with INVENTORY_SEARCH_BACKEND."""
+
+    def count(self, query):
+        raise NotImplementedError
+
+    def search(self, query, offset, limit):
+        """Return the ``SearchHit`` list for one page of results, best match first."""
+        raise NotImplementedError
+
+    def rebuild(self):
+        """Rebuild the index from the item table; return False if there is none."""
+        return False
+
+
+class SQLiteFTS5Backend(SearchBackend):
+    """
+    SQLite FTS5 external-content index over the item table.
+
+    The virtual table and the triggers that keep it in sync are created by
+    migration 0009, so bulk writes and raw SQL stay indexed too.
+    """
+
+    def count(self, query):
+        match = to_fts_query(query)
+        if not match:
+            return 0
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT count(*) FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [match])
+            return cursor.fetchone()[0]
+
+    def search(self, query, offset, limit):
+        match = to_fts_query(query)
+        if not match:
+            return []
+        weights = ', '.join(str(weight) for _, weight in SEARCH_FIELDS)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid, bm25({FTS_TABLE}, {weights}) AS rank, "
+                f"snippet({FTS_TABLE}, -1, '{MARK_START}', '{MARK_END}', '…', 12) "
+                f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s "
+                f"ORDER BY rank, rowid LIMIT %s OFFSET %s",
+                [match, limit, offset])
+            return [SearchHit(item_id, -rank, mark_snippet(snippet)) for item_id, rank, snippet in cursor.fetchall()]
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+        return True
+
+
+class BasicSearchBackend(SearchBackend):
+    """Unindexed ``icontains`` fallback for databases without a full-text index."""
+
+    def _queryset(self, query):
+        terms = re.findall(r'\w+', query)
+        if not terms:
+            return Item.objects.none()
+        queryset = Item.objects.all()
+        for term in terms:
+            queryset = queryset.filter(reduce(or_, (
+                Q(**{f'{field}__icontains': term}) for field, _ in SEARCH_FIELDS)))
+        return queryset
+
+    def count(self, query):
+        return self._queryset(query).count()
+
+    def search(self, query, offset, limit):
+        terms = re.findall(r'\w+', query)
+        rows = self._queryset(query).order_by('name', 'id').values_list(
+            'id', *[field for field, _ in SEARCH_FIELDS])[offset:offset + limit]
+        return [SearchHit(row[0], 0.0, _basic_snippet(row[1:], terms)) for row in rows]
+
+
+def to_fts_query(query):
+    """Turn free text into a safe FTS5 query: every word must match, as a prefix."""
+    return ' '.join(f'"{term}"*' for term in re.findall(r'\w+', query))
+
+
+def mark_snippet(text):
+    """Escape ``text`` for HTML, then turn the match delimiters into <mark> tags."""
+    return html.escape(text or '').replace(MARK_START, '<mark>').replace(MARK_END, '</mark>')
+
+
+def _basic_snippet(values, terms):
+    for value in values:
+        if value and any(term.lower() in value.lower() for term in terms):
+            return mark_snippet(re.sub(
+                '(' + '|'.join(re.escape(term) for term in terms) + ')',
+                f'{MARK_START}\\1{MARK_END}', value, flags=re.IGNORECASE))
+    return ''
+
+
+def has_fts_index(conn=connection):
+    if conn.vendor != 'sqlite':
+        return False
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT count(*) FROM sqlite_master WHERE name = %s", [FTS_TABLE])
+        return cursor.fetchone()[0] > 0
+
+
+def get_search_backend():
+    backend = getattr(settings, 'INVENTORY_SEARCH_BACKEND', None)
+    if backend:
+        return import_string(backend)()
+    if has_fts_index():
+        return SQLiteFTS5Backend()
+    return BasicSearchBackend()
+
+
+class SearchResults:
+    """
+    Lazy, sliceable view over a search so DRF's page-number pagination can
+    drive it: ``count()`` asks the backend for the total and slicing fetches
+    just the hits for the requested page.
+    """
+
+    def __init__(self, backend, query):
+        self.backend = backend
+        self.query = query
+
+    def count(self):
+        return self.backend.count(self.query)
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start = index.start or 0
+        return self.backend.search(self.query, start, index.stop - start)
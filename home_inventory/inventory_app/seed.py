@@ -0,0 +1,207 @@
+"""
+Synthetic inventory data for benchmarks and load tests.
+
+``seed_inventory(scale, seed)`` generates rooms, location and category trees
+and items with ``bulk_create``, level by level, and writes the derived data
+that ``save()`` would: effective rooms, normalized names, closure rows and
+category paths. Rollups are recomputed once at the end. The same scale and
+seed on an empty inventory always produce the same rows.
+"""
+import datetime
+import random
+from dataclasses import asdict, dataclass
+from decimal import Decimal
+
+from django.db import connection, transaction
+
+from . import response_cache, rollups, sync, versions
+from .models import Category, InventoryRollup, Item, Location, LocationClosure, Room, VoiceJob, normalize_name
+from .signals import bulk_write
+
+
+@dataclass(frozen=True)
+class Scale:
+    rooms: int
+    locations_per_room: int  # top-level locations in each room
+    location_depth: int  # levels of sublocations below them
+    location_fanout: int  # sublocations per location and level
+    categories: int  # top-level categories
+    category_depth: int
+    category_fanout: int
+    items: int
+
+
+SCALES = {
+    'tiny': Scale(3, 2, 1, 2, 3, 1, 2, 50),
+    'small': Scale(8, 4, 2, 2, 6, 2, 3, 2_000),
+    'medium': Scale(20, 6, 3, 3, 10, 2, 4, 50_000),
+    'large': Scale(50, 8, 4, 3, 20, 3, 4, 500_000),
+    'huge': Scale(100, 10, 4, 4, 30, 3, 5, 2_000_000),
+}
+BATCH_SIZE = 5000
+
+ROOM_NAMES = ['Kitchen', 'Living Room', 'Bedroom', 'Bathroom', 'Garage', 'Cellar', 'Attic',
+              'Office', 'Hallway', 'Guest Room', 'Laundry', 'Workshop', 'Pantry', 'Shed']
+FLOORS = ['Basement', 'Ground floor', 'First floor', 'Second floor', 'Attic']
+LOCATION_NAMES = ['Cabinet', 'Shelf', 'Drawer', 'Box', 'Wardrobe', 'Rack', 'Chest', 'Crate',
+                  'Bin', 'Basket', 'Compartment', 'Tray', 'Case', 'Folder']
+CATEGORY_NAMES = ['Tools', 'Electronics', 'Kitchenware', 'Books', 'Clothing', 'Toys', 'Garden',
+                  'Sports', 'Documents', 'Decoration', 'Cleaning', 'Media', 'Camping', 'Crafts']
+ADJECTIVES = ['Old', 'New', 'Red', 'Blue', 'Large', 'Small', 'Cordless', 'Vintage', 'Spare',
+              'Wooden', 'Steel', 'Portable', 'Folding', 'Digital', 'Ceramic', 'Waterproof']
+NOUNS = ['Drill', 'Hammer', 'Lamp', 'Cable', 'Kettle', 'Blender', 'Blanket', 'Tent', 'Camera',
+         'Charger', 'Router', 'Vase', 'Jacket', 'Saw', 'Pan', 'Speaker', 'Ladder', 'Torch',
+         'Backpack', 'Monitor', 'Keyboard', 'Toaster', 'Screwdriver', 'Helmet', 'Sleeping bag']
+NOTES = ['', '', '', 'Needs new batteries', 'Warranty until next year', 'Borrowed to neighbour',
+         'Original packaging in the attic', 'Manual in the office folder']
+
+
+@dataclass
+class SeedReport:
+    rooms: int = 0
+    locations: int = 0
+    categories: int = 0
+    items: int = 0
+
+    def as_dict(self):
+        return asdict(self)
+
+
+def clear_inventory():
+    """
+    Delete every room, location, category, item, rollup and voice job with
+    one DELETE per table, skipping the per-object signals of QuerySet.delete().
+    The tombstones go too; sync clients get a full resync.
+    """
+    with transaction.atomic(), connection.cursor() as cursor:
+        for model in (Item, LocationClosure, InventoryRollup, VoiceJob, Location, Room, Category):
+            cursor.execute(f"DELETE FROM {connection.ops.quote_name(model._meta.db_table)}")
+        sync.prune_tombstones()
+    _changed()
+
+
+def _changed():
+    versions.bump(Room, Location, Item, Category)
+    response_cache.invalidate('rooms', 'locations', 'categories')
+
+
+def _unique_name(base, taken):
+    name, n = base, 1
+    while name in taken:
+        n += 1
+        name = f"{base} {n}"
+    taken.add(name)
+    return name
+
+
+def seed_inventory(scale, seed=0, batch_size=BATCH_SIZE):
+    """Add the rows of ``scale`` (a Scale or a SCALES name); returns a SeedReport."""
+    if isinstance(scale, str):
+        scale = SCALES[scale]
+    rng = random.Random(seed)
+    report = SeedReport()
+    with transaction.atomic(), bulk_write():
+        room_ids = _seed_rooms(scale, rng, report)
+        location_ids = _seed_locations(scale, rng, room_ids, batch_size, report)
+        category_ids = _seed_categories(scale, rng, batch_size, report)
+    _seed_items(scale, rng, location_ids, category_ids, batch_size, report)
+    rollups.reconcile(fix=True)
+    _changed()
+    return report
+
+
+def _seed_rooms(scale, rng, report):
+    taken = set(Room.objects.values_list('name', flat=True))
+    rooms = []
+    for i in range(scale.rooms):
+        name = _unique_name(ROOM_NAMES[i % len(ROOM_NAMES)], taken)
+        rooms.append(Room(name=name, normalized_name=normalize_name(name), floor_level=rng.choice(FLOORS),
+                          description=f"Synthetic room {i + 1}"))
+    rooms = Room.objects.bulk_create(rooms)
+    report.rooms += len(rooms)
+    return [room.pk for room in rooms]
+
+
+def _seed_locations(scale, rng, room_ids, batch_size, report):
+    """Create the location trees level by level; returns all location ids."""
+    def name(level):
+        return f"{rng.choice(LOCATION_NAMES)} {level + 1}.{rng.randint(1, 99)}"
+
+    level = []
+    for room_id in room_ids:
+        level += [Location(name=name(0), room_id=room_id, description="") for _ in range(scale.locations_per_room)]
+    created = []
+    for start in range(0, len(level), batch_size):
+        created += Location.bulk_create_top_level(level[start:start + batch_size])
+    # Ancestor chain (top-level first) of every location, to write closure rows
+    chains = {location.pk: (location.pk,) for location in created}
+    all_ids = list(chains)
+    parents = created
+    for depth in range(1, scale.location_depth + 1):
+        children = []
+        for parent in parents:
+            for _ in range(scale.location_fanout):
+                label = name(depth)
+                children.append(Location(
+                    name=label, normalized_name=normalize_name(label), description="",
+                    parent_location_id=parent.pk, effective_room_id=parent.effective_room_id))
+        children = Location.objects.bulk_create(children, batch_size=batch_size)
+        links = []
+        for child in children:
+            chain = chains[child.parent_location_id] + (child.pk,)
+            chains[child.pk] = chain
+            links += [LocationClosure(ancestor_id=ancestor_id, descendant_id=child.pk, depth=len(chain) - 1 - i)
+                      for i, ancestor_id in enumerate(chain)]
+        LocationClosure.objects.bulk_create(links, batch_size=batch_size)
+        all_ids += [child.pk for child in children]
+        parents = children
+    report.locations += len(all_ids)
+    return all_ids
+
+
+def _seed_categories(scale, rng, batch_size, report):
+    """Create the category trees level by level, with their paths; returns all category ids."""
+    taken = set(Category.objects.values_list('name', flat=True))
+    paths = {None: ''}
+    parents = [None]
+    all_ids = []
+    for depth in range(scale.category_depth + 1):
+        count = scale.categories if depth == 0 else scale.category_fanout
+        level = [Category(name=_unique_name(rng.choice(CATEGORY_NAMES), taken), parent_id=parent_id,
+                          description="", depth=depth)
+                 for parent_id in parents for _ in range(count)]
+        level = Category.objects.bulk_create(level, batch_size=batch_size)
+        for category in level:
+            category.path = paths[category.parent_id] + f"{category.pk}/"
+            paths[category.pk] = category.path
+        Category.objects.bulk_update(level, ['path'], batch_size=batch_size)
+        parents = [category.pk for category in level]
+        all_ids += parents
+    report.categories += len(all_ids)
+    return all_ids
+
+
+def _seed_items(scale, rng, location_ids, category_ids, batch_size, report):
+    """Insert the items in batches, one transaction each, so memory stays flat."""
+    today = datetime.date(2025, 1, 1)
+    for start in range(0, scale.items, batch_size):
+        items = []
+        for _ in range(min(batch_size, scale.items - start)):
+            price = Decimal(rng.randint(100, 250_000)) / 100 if rng.random() < 0.8 else None
+            items.append(Item(
+                name=f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)}",
+                description=rng.choice(['', 'Bought on sale', 'Gift', 'Second hand', 'Inherited']),
+                serial_number=f"SN-{rng.randrange(16 ** 8):08X}" if rng.random() < 0.4 else None,
+                purchase_date=today - datetime.timedelta(days=rng.randint(0, 15 * 365))
+                if rng.random() < 0.7 else None,
+                purchase_price=price,
+                current_value=(price * Decimal(rng.randint(10, 100)) / 100).quantize(Decimal('0.01'))
+                if price is not None else None,
+                quantity=rng.choice((1, 1, 1, 1, 2, 2, 3, 5, 10)),
+                category_id=rng.choice(category_ids) if category_ids and rng.random() < 0.9 else None,
+                location_id=rng.choice(location_ids) if location_ids and rng.random() < 0.97 else None,
+                notes=rng.choice(NOTES),
+            ))
+        with transaction.atomic(), bulk_write():
+            Item.objects.bulk_create(items)
+        report.items += len(items)
@@ -1,8 +1,98 @@
+from functools import lru_cache
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Prefetch
 from rest_framework import serializers
-from .models import Room, Location, Item, Category
+from . import metrics
+from .models import Room, Location, Item, Category, VoiceJob
+
+
+class DynamicFieldsMixin:
+    """
+    Sparse fieldsets and expansions for a ModelSerializer.
+
+    ``fields`` limits the output to the named fields and ``expand`` swaps the
+    named relations for nested objects (``expandable_fields`` maps each to a
+    serializer and its options). ``related_paths`` and ``prefetch_paths`` list
+    the relations each output field reads, so ``query_plan`` can pick the
+    joins and prefetches for just the requested fields.
+    """
+    related_paths = {}
+    prefetch_paths = {}
+    expandable_fields = {}
+
+    def __init__(self, *args, fields=None, expand=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        self._output_selection = None
+        if 'data' in kwargs and (fields is not None or expand):
+            # A write keeps every writable field; the selection only shapes the response
+            self._output_selection = (fields, expand)
+            return
+        for name in expand:
+            serializer_class, options = self.expandable_fields[name]
+            self.fields[name] = _serializer(serializer_class)(read_only=True, **options)
+        if fields is not None:
+            keep = {*fields, *expand}
+            for name in [name for name, field in self.fields.items()
+                         if not field.write_only and name not in keep]:
+                self.fields.pop(name)
+
+    @property
+    def data(self):
+        if self._output_selection is not None and self.instance is not None and not getattr(self, '_errors', None):
+            fields, expand = self._output_selection
+            return type(self)(self.instance, fields=fields, expand=expand, context=self.context).data
+        with metrics.serializer_timing():
+            return super().data
+
+    @classmethod
+    def readable_field_names(cls):
+        return _readable_field_names(cls)
+
+    @classmethod
+    def query_plan(cls, fields=None, expand=(), prefix=''):
+        """``(select_related paths, prefetch_related lookups)`` for the requested output."""
+        select, prefetch = [], []
+        for name in cls.readable_field_names() if fields is None else {*fields, *expand}:
+            if name in expand:
+                serializer_class, options = cls.expandable_fields[name]
+                path = prefix + options.get('source', name).replace('.', '__')
+                nested_select, nested_prefetch = _serializer(serializer_class).query_plan(
+                    options.get('fields'), prefix=path + '__')
+                select += [path, *nested_select]
+                prefetch += nested_prefetch
+            else:
+                select += [prefix + path for path in cls.related_paths.get(name, ())]
+                prefetch += [_prefixed(lookup, prefix) for lookup in cls.prefetch_paths.get(name, ())]
+        return select, prefetch
+
+
+class TimedListSerializer(serializers.ListSerializer):
+    """ListSerializer whose ``data`` counts as serializer time in the request metrics."""
 
+    @property
+    def data(self):
+        with metrics.serializer_timing():
+            return super().data
 
-class CategorySerializer(serializers.ModelSerializer):
+
+@lru_cache(maxsize=None)
+def _readable_field_names(serializer_class):
+    return tuple(name for name, field in serializer_class().fields.items() if not field.write_only)
+
+
+def _serializer(ref):
+    """Serializer classes may be named by string to refer to ones defined further down."""
+    return globals()[ref] if isinstance(ref, str) else ref
+
+
+def _prefixed(lookup, prefix):
+    if isinstance(lookup, Prefetch):
+        return Prefetch(prefix + lookup.prefetch_through, queryset=lookup.queryset)
+    return prefix + lookup
+
+
+class CategorySerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     parent = serializers.PrimaryKeyRelatedField(
         queryset=Category.objects.all(), allow_null=True)
     subcategories = serializers.PrimaryKeyRelatedField(
@@ -10,41 +100,78 @@ class CategorySerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Category
+        list_serializer_class = TimedListSerializer
         fields = ['id', 'name', 'description', 'parent',
-                  'subcategories', 'created_at', 'updated_at']
+                  'subcategories', 'path', 'depth', 'created_at', 'updated_at']
+        read_only_fields = ['path', 'depth']
+
+    related_paths = {'parent': ['parent']}
+    prefetch_paths = {'subcategories': ['subcategories']}
 
     def validate(self, data):
         # Erstelle eine Instanz des Modells mit den validierten Daten
         instance = Category(**data)
+        if self.instance is not None:
+            # Zyklusprüfung braucht pk und Pfad der bearbeiteten Kategorie
+            instance.pk = self.instance.pk
+            instance.path = self.instance.path
         # Rufe die clean-Methode auf
         instance.clean()
         return data
 
     def to_representation(self, instance):
         representation = super().to_representation(instance)
-        if instance.parent:
+        if 'parent' in representation and instance.parent:
             representation['parent'] = {
                 'id': instance.parent.id, 'name': instance.parent.name}
         return representation
 
 
-class ItemSerializer(serializers.ModelSerializer):
-    location_id = serializers.PrimaryKeyRelatedField(
-        source='location.id', read_only=True)  # Add location_id for filtering
+class CachedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Resolves ids from ``context['related_objects']`` ({model: {pk: obj}})
+    when a bulk request preloaded them, instead of one query per row.
+    """
+
+    def to_internal_value(self, data):
+        cache = self.context.get('related_objects', {}).get(self.get_queryset().model)
+        if cache is not None and not isinstance(data, bool):
+            try:
+                return cache[int(data)]
+            except (KeyError, TypeError, ValueError):
+                pass
+        return super().to_internal_value(data)
+
+
+class ItemSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    serializer_related_field = CachedPrimaryKeyRelatedField
+
+    location_id = serializers.IntegerField(
+        read_only=True)  # Add location_id for filtering (read from the FK column, no join)
 
     location_name = serializers.CharField(
         source="location.name", read_only=True)  # ✅ Location Name
     room_name = serializers.CharField(
-        source="location.room.name", read_only=True)  # ✅ Room Name
+        source="location.effective_room.name", read_only=True)  # ✅ Room Name (inherited for sublocations)
 
     class Meta:
         model = Item
-        fields = '__all__'  # Ensures all item details are serialized
+        list_serializer_class = TimedListSerializer
+        exclude = ['sync_seq']  # Ensures all item details are serialized (sync_seq is internal, see sync.py)
         # ✅ Ensures additional fields are included
         extra_fields = ["location_name", "room_name"]
 
+    related_paths = {
+        'location_name': ['location'],
+        'room_name': ['location__effective_room'],
+    }
+    expandable_fields = {
+        'location': ('LocationSerializer', {}),
+        'category': ('CategorySerializer', {}),
+    }
+
 
-class RoomSerializer(serializers.ModelSerializer):
+class RoomSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     locations = serializers.SerializerMethodField()
 
     def get_locations(self, obj):
@@ -53,10 +180,16 @@ class RoomSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Room
+        list_serializer_class = TimedListSerializer
         fields = ['id', 'name', 'description', 'locations']
 
+    prefetch_paths = {
+        'locations': [Prefetch('locations', queryset=Location.objects.select_related('effective_room')),
+                      'locations__sublocations'],
+    }
 
-class LocationSerializer(serializers.ModelSerializer):
+
+class LocationSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     room = serializers.PrimaryKeyRelatedField(read_only=True)
     room_id = serializers.PrimaryKeyRelatedField(
         queryset=Room.objects.all(),
@@ -64,9 +197,11 @@ class LocationSerializer(serializers.ModelSerializer):
         write_only=True,
         allow_null=True  # Allow null for sublocations
     )
+    room_name = serializers.CharField(
+        source='effective_room.name', read_only=True)  # Inherited for sublocations
     parent_location = serializers.PrimaryKeyRelatedField(
-        # Only main locations as parents
-        queryset=Location.objects.filter(parent_location__isnull=True),
+        # Any depth, as with the move endpoint; the closure table keeps the subtree queries flat
+        queryset=Location.objects.all(),
         allow_null=True
     )
     sublocations = serializers.PrimaryKeyRelatedField(
@@ -74,8 +209,7 @@ class LocationSerializer(serializers.ModelSerializer):
     
     def get_room(self, obj):
         """Return the ID of the room, inherited from parent for sublocations."""
-        room = obj.get_room()
-        return room.id if room else None
+        return obj.effective_room_id
 
     def validate(self, data):
         # Ensure sublocations don't have a room
@@ -90,14 +224,60 @@ class LocationSerializer(serializers.ModelSerializer):
             )
         return data
 
+    def save(self, **kwargs):
+        # Cycles are only found by Location.save(), against the closure table
+        try:
+            return super().save(**kwargs)
+        except DjangoValidationError as exc:
+            raise serializers.ValidationError({"parent_location": exc.messages})
+
     class Meta:
         model = Location
+        list_serializer_class = TimedListSerializer
         fields = [
             'id',
             'name',
             'room',
             'room_id',
+            'room_name',
             'parent_location',
             'sublocations',
             'description'
         ]
+
+    related_paths = {'room_name': ['effective_room']}
+    prefetch_paths = {'sublocations': ['sublocations']}
+    expandable_fields = {
+        # The room the location is in, inherited for sublocations
+        'room': ('RoomSerializer', {'source': 'effective_room', 'fields': ['id', 'name', 'description']}),
+        'parent_location': ('LocationSerializer', {'fields': ['id', 'name', 'room_name']}),
+    }
+
+
+class LocationMoveSerializer(serializers.Serializer):
+    """Target of a subtree move: a parent location (at any depth), or a room for a top-level location."""
+    parent_location = serializers.PrimaryKeyRelatedField(
+        queryset=Location.objects.all(), allow_null=True, required=False)
+    room_id = serializers.PrimaryKeyRelatedField(
+        queryset=Room.objects.all(), source='room', allow_null=True, required=False)
+
+    def validate(self, data):
+        if bool(data.get('parent_location')) == bool(data.get('room')):
+            raise serializers.ValidationError("Give either a parent_location or a room_id.")
+        return data
+
+
+class VoiceJobSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    items = serializers.SerializerMethodField()
+
+    def get_items(self, obj):
+        """The items the job created (none until it has succeeded)."""
+        items = Item.objects.filter(id__in=obj.item_ids).select_related(
+            'location__effective_room', 'category').order_by('id')
+        return ItemSerializer(items, many=True, context=self.context).data
+
+    class Meta:
+        model = VoiceJob
+        list_serializer_class = TimedListSerializer
+        fields = ['id', 'status', 'transcript', 'extracted', 'items', 'error',
+                  'created_at', 'updated_at']
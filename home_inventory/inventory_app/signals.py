@@ -0,0 +1,44 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.dispatch import Signal
+
+# Sent by Location.save() after a location was re-parented or its effective
+# room changed, once the closure table and sublocations are up to date.
+# Arguments: instance, old_ancestor_ids (strict ancestors before the move),
+# old_room_id.
+location_moved = Signal()
+
+# Sent by Category.save() after a category was re-parented and its subtree
+# paths rewritten. Arguments: instance, old_path.
+category_moved = Signal()
+
+# Sent after bulk item writes (bulk API, imports) that bypass Item.save() and
+# the per-instance signals. Arguments: created, updated, deleted (item id
+# lists) and before (rollups.ITEM_FIELDS states of the updated and deleted
+# items, read before the write).
+items_bulk_changed = Signal()
+
+# Sent after rooms or locations were inserted with bulk_create, which sends no
+# post_save. Arguments: ids.
+rows_bulk_created = Signal()
+
+_bulk_write = ContextVar('inventory_bulk_write', default=False)
+
+
+@contextmanager
+def bulk_write():
+    """
+    Mark a block of bulk item writes: per-instance Item receivers stand down
+    (for example while Django's delete collector sends post_delete for every
+    row) and the writer sends ``items_bulk_changed`` once instead.
+    """
+    token = _bulk_write.set(True)
+    try:
+        yield
+    finally:
+        _bulk_write.reset(token)
+
+
+def in_bulk_write():
+    return _bulk_write.get()
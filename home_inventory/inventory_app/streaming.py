@@ -0,0 +1,37 @@
+import json
+from itertools import islice
+
+from django.http import StreamingHttpResponse
+from rest_framework.utils.encoders import JSONEncoder
+
+
+class JSONLinesStreamMixin:
+    """
+    Opt-in ``?stream=jsonl`` mode for a viewset's list action.
+
+    The whole filtered list is sent as newline-delimited JSON. Rows are read
+    through ``QuerySet.iterator()`` and serialized ``stream_chunk_size`` at a
+    time, so worker memory stays flat however many rows there are.
+    """
+    stream_query_param = 'stream'
+    stream_chunk_size = 500
+
+    def list(self, request, *args, **kwargs):
+        if request.query_params.get(self.stream_query_param) == 'jsonl':
+            return self.stream_list(request)
+        return super().list(request, *args, **kwargs)
+
+    def stream_list(self, request):
+        queryset = self.filter_queryset(self.get_queryset()).order_by('pk')
+        return StreamingHttpResponse(
+            self.iter_jsonl(queryset), content_type='application/x-ndjson')
+
+    def iter_jsonl(self, queryset):
+        rows = queryset.iterator(chunk_size=self.stream_chunk_size)
+        while True:
+            chunk = list(islice(rows, self.stream_chunk_size))
+            if not chunk:
+                break
+            data = self.get_serializer(chunk, many=True).data
+            yield ''.join(
+                json.dumps(row, cls=JSONEncoder, ensure_ascii=False) + '\n' for row in data)
@@ -0,0 +1,180 @@
+"""
+Delta sync for offline clients.
+
+Every insert or update of a room, location, category or item stamps the row
+with the next value of one global change sequence (``sync_seq``), and every
+delete leaves a Tombstone with its own sequence value. Database triggers do
+this (migration 0016), so bulk writes and ``QuerySet.update()``, such as the
+effective-room propagation of a location move, are covered as well.
+
+``changes_since(seq)`` returns, in sequence order, the rows and tombstones
+written after ``seq``, one page at a time; the cost is proportional to the
+number of changes, not to the size of the inventory. ``prune_tombstones()``
+drops old tombstones; tokens from before the prune (or from another
+database) then get a full resync flagged as ``reset``. Without the triggers
+(a backend other than SQLite) nothing would ever look changed, so
+``changes_since`` raises SyncUnavailable instead.
+"""
+import base64
+import binascii
+import datetime
+import json
+from contextlib import contextmanager
+
+from django.db import connections, router, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from . import fastpath
+from .models import Category, Item, Location, Room, SyncCounter, Tombstone
+from .serializers import CategorySerializer, ItemSerializer, LocationSerializer, RoomSerializer
+
+# model name: (model, serializer, fields); flat rows, without the nested and reverse lists
+SYNC_MODELS = {
+    'room': (Room, RoomSerializer, ('id', 'name', 'description')),
+    'location': (Location, LocationSerializer,
+                 ('id', 'name', 'room', 'room_name', 'parent_location', 'description')),
+    'category': (Category, CategorySerializer,
+                 ('id', 'name', 'description', 'parent', 'path', 'depth', 'created_at', 'updated_at')),
+    'item': (Item, ItemSerializer, None),
+}
+UPSERT, DELETE = 'upsert', 'delete'
+DEFAULT_TOMBSTONE_AGE = datetime.timedelta(days=90)
+
+
+class InvalidToken(ValueError):
+    pass
+
+
+class SyncUnavailable(Exception):
+    pass
+
+
+def encode_token(seq):
+    return base64.urlsafe_b64encode(json.dumps({'s': seq}).encode()).decode()
+
+
+def decode_token(token):
+    """The sequence number in ``token``; None for an empty token (a full sync)."""
+    if not token:
+        return None
+    try:
+        seq = json.loads(base64.urlsafe_b64decode(token.encode()).decode())['s']
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise InvalidToken(token)
+    if not isinstance(seq, int) or isinstance(seq, bool) or seq < 0:
+        raise InvalidToken(token)
+    return seq
+
+
+@contextmanager
+def _read_snapshot(using):
+    """
+    A read transaction on ``using``. transaction.atomic() would BEGIN with the
+    connection's transaction_mode, IMMEDIATE in production (settings.py), and
+    take the write lock for a read; a deferred BEGIN takes no lock until the
+    first read and, in WAL mode, then never blocks writers.
+    """
+    conn = connections[using]
+    if conn.vendor != 'sqlite' or not conn.get_autocommit():
+        # Other backends begin without locking; inside a transaction this is a savepoint
+        with transaction.atomic(using=using):
+            yield
+        return
+    with conn.cursor() as cursor:
+        cursor.execute("BEGIN DEFERRED")
+    try:
+        yield
+    finally:
+        if conn.connection is not None and conn.connection.in_transaction:
+            with conn.cursor() as cursor:
+                cursor.execute("ROLLBACK")  # nothing was written
+
+
+def has_sync_triggers(conn):
+    if conn.vendor != 'sqlite':
+        return False
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT count(*) FROM sqlite_master WHERE type = 'trigger' AND name = %s",
+                       [f'{Item._meta.db_table}_sync_au'])
+        return cursor.fetchone()[0] > 0
+
+
+def _counter(using):
+    return SyncCounter.objects.using(using).filter(pk=1).values_list('value', 'pruned_through').first() or (0, 0)
+
+
+def _serialize(name, pks, using):
+    """``{pk: row}`` of one model, through the fast path where the serializer allows it."""
+    model, serializer_class, fields = SYNC_MODELS[name]
+    queryset = model.objects.using(using).filter(pk__in=pks)
+    encoder = fastpath.row_encoder(serializer_class, fields)
+    if encoder is not None:
+        rows = encoder.encode(list(queryset.values(*encoder.columns)))
+    else:
+        select, prefetch = serializer_class.query_plan(fields)
+        queryset = queryset.select_related(*select).prefetch_related(*prefetch)
+        rows = serializer_class(queryset, many=True, fields=fields).data
+    return {row['id']: row for row in rows}
+
+
+def changes_since(since=None, limit=500):
+    """
+    The next page of changes after sequence ``since`` (None: everything):
+    ``{'changes': [...], 'token', 'has_more', 'reset'}``. Each change is
+    ``{'seq', 'model', 'action': 'upsert'|'delete', 'id', 'data'}``; pass
+    ``token`` back for the following page or the next sync.
+    """
+    # One consistent snapshot for the whole page, on the database serving reads
+    using = router.db_for_read(Item)
+    if not has_sync_triggers(connections[using]):
+        raise SyncUnavailable("Delta sync needs the change triggers of migration 0016 (SQLite only).")
+    with _read_snapshot(using):
+        current, pruned_through = _counter(using)
+        reset = since is not None and not pruned_through <= since <= current
+        if since is None or reset:
+            since = 0
+        # The first ``limit + 1`` candidates of each table, merged by sequence
+        candidates = []
+        for name, (model, _, _) in SYNC_MODELS.items():
+            candidates += [(seq, name, UPSERT, pk) for pk, seq in model.objects.using(using).filter(
+                sync_seq__gt=since).order_by('sync_seq').values_list('pk', 'sync_seq')[:limit + 1]]
+        candidates += [(seq, name, DELETE, pk) for name, pk, seq in Tombstone.objects.using(using).filter(
+            sync_seq__gt=since).order_by('sync_seq').values_list('model', 'object_id', 'sync_seq')[:limit + 1]]
+        candidates.sort()
+        page, has_more = candidates[:limit], len(candidates) > limit
+
+        rows = {}
+        for name in SYNC_MODELS:
+            pks = [pk for _, model_name, action, pk in page if model_name == name and action == UPSERT]
+            if pks:
+                rows[name] = _serialize(name, pks, using)
+    changes = [{'seq': seq, 'model': name, 'action': action, 'id': pk,
+                'data': rows[name][pk] if action == UPSERT else None}
+               for seq, name, action, pk in page]
+    return {
+        'changes': changes,
+        # Nothing after ``current`` existed in this snapshot, so an empty page can skip ahead
+        'token': encode_token(page[-1][0] if has_more else current),
+        'has_more': has_more,
+        'reset': reset,
+    }
+
+
+def prune_tombstones(older_than=None):
+    """
+    Delete tombstones older than ``older_than`` (a timedelta; all if None).
+    Clients that last synced before the newest pruned one get a full resync.
+    Returns the number deleted.
+    """
+    tombstones = Tombstone.objects.all()
+    if older_than is not None:
+        tombstones = tombstones.filter(deleted_at__lt=timezone.now() - older_than)
+    with transaction.atomic():
+        newest = tombstones.aggregate(seq=Max('sync_seq'))['seq']
+        if newest is None:
+            return 0
+        deleted, _ = Tombstone.objects.filter(sync_seq__lte=newest).delete()
+        SyncCounter.objects.filter(pk=1, pruned_through__lt=newest).update(pruned_through=newest)
+    return deleted
+
@@ -1,7 +1,36 @@
+import asyncio
+import csv
+import datetime
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+import httpx
+import orjson
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import OperationalError, connection, connections, router
+from django.db.models import F
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.http import http_date
+
 from rest_framework.test import APIClient
-from inventory_app.models import Room, Location
-from inventory_app.serializers import RoomSerializer, LocationSerializer
-from django.test import TestCase, Client
+from django.core.exceptions import ValidationError as DjangoValidationError
+from inventory_app import benchmark, events, fastpath, importer, loadtest, metrics, response_cache, rollups, seed, sync, voice, voice_cache
+from inventory_app.providers import StubProvider
+from inventory_app.routers import replica_reads
+from inventory_app.models import Room, Location, LocationClosure, Item, Category, InventoryRollup, ModelVersion, VoiceJob
+from inventory_app.serializers import CategorySerializer, ItemSerializer, RoomSerializer, LocationSerializer
+from rest_framework.renderers import JSONRenderer
+from django.test import TestCase, TransactionTestCase, Client, override_settings
 from django.contrib.admin.sites import AdminSite
 from django.contrib.auth.models import User
 from inventory_app.admin import LocationAdmin
@@ -67,4 +96,1680 @@ class LocationAdminTestCase(TestCase):
     def test_room_readonly_for_sublocation(self):
         location = Location(parent_location=self.shelf)
         readonly_fields = self.admin.get_readonly_fields(request=None, obj=location)
-        self.assertIn('room', readonly_fields)
\ No newline at end of file
+        self.assertIn('room', readonly_fields)
+
+class KeysetPaginationTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.room = Room.objects.create(name="Garage")
+        self.shelf = Location.objects.create(name="Shelf", room=self.room)
+        for i in range(5):
+            Item.objects.create(name="Cable", quantity=i + 1, location=self.shelf)
+        for i in range(3):
+            Location.objects.create(name="Box", parent_location=self.shelf)
+
+    def collect(self, url):
+        seen = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen.extend(row['id'] for row in response.data['results'])
+            url = response.data['next']
+        return seen
+
+    def test_items_follow_cursor_through_all_pages(self):
+        ids = self.collect('/api/items/?page_size=2')
+        self.assertEqual(ids, sorted(Item.objects.values_list('id', flat=True)))
+
+    def test_locations_page_on_name_and_id(self):
+        ids = self.collect('/api/locations/?page_size=2')
+        expected = list(Location.objects.order_by('name', 'id').values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+
+    def test_previous_link_returns_preceding_page(self):
+        first = self.client.get('/api/items/?page_size=2').data
+        second = self.client.get(first['next']).data
+        back = self.client.get(second['previous']).data
+        self.assertEqual(
+            [row['id'] for row in back['results']],
+            [row['id'] for row in first['results']])
+        self.assertIsNone(back['previous'])
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/items/?cursor=garbage')
+        self.assertEqual(response.status_code, 404)
+
+    def test_stream_jsonl(self):
+        response = self.client.get('/api/items/?stream=jsonl')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 5)
+        self.assertEqual(json.loads(lines[0])['name'], "Cable")
+
+
+class EffectiveRoomTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.kitchen = Room.objects.create(name="Kitchen")
+        self.cellar = Room.objects.create(name="Cellar")
+        self.shelf = Location.objects.create(name="Pantry Shelf", room=self.kitchen)
+        self.rack = Location.objects.create(name="Rack", room=self.cellar)
+        self.box = Location.objects.create(name="Box A", parent_location=self.shelf)
+        self.tin = Location.objects.create(name="Tin", parent_location=self.box)
+
+    def test_sublocations_inherit_room(self):
+        self.assertEqual(self.box.effective_room_id, self.kitchen.id)
+        self.assertEqual(self.tin.effective_room_id, self.kitchen.id)
+
+    def test_room_change_propagates_to_descendants(self):
+        self.shelf.room = self.cellar
+        self.shelf.save()
+        self.tin.refresh_from_db()
+        self.assertEqual(self.tin.effective_room_id, self.cellar.id)
+
+    def test_reparent_propagates_to_descendants(self):
+        box = Location.objects.get(pk=self.box.pk)
+        box.parent_location = self.rack
+        box.save()
+        self.tin.refresh_from_db()
+        self.assertEqual(self.tin.effective_room_id, self.cellar.id)
+
+    def test_item_list_room_name_without_per_row_queries(self):
+        for location in (self.shelf, self.box, self.tin):
+            Item.objects.create(name="Spoon", location=location)
+        with self.assertNumQueries(2):  # version stamps + the list itself
+            response = self.client.get('/api/items/')
+        self.assertEqual(
+            [row['room_name'] for row in response.data['results']], ["Kitchen"] * 3)
+
+
+class LocationTreeTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.room = Room.objects.create(name="Kitchen")
+        self.shelf = Location.objects.create(name="Pantry Shelf", room=self.room)
+        self.box = Location.objects.create(name="Box A", parent_location=self.shelf)
+        self.tin = Location.objects.create(name="Tin", parent_location=self.box)
+        self.drawer = Location.objects.create(name="Drawer", room=self.room)
+
+    def test_tree_is_one_query(self):
+        with self.assertNumQueries(2):  # version stamps + the tree itself
+            response = self.client.get('/api/locations/tree/')
+        self.assertEqual([node['name'] for node in response.data], ["Pantry Shelf", "Drawer"])
+        box = response.data[0]['sublocations'][0]
+        self.assertEqual(box['room'], {'id': self.room.id, 'name': "Kitchen"})
+        self.assertEqual(box['sublocations'][0]['name'], "Tin")
+
+    def test_tree_root_and_depth(self):
+        response = self.client.get(f'/api/locations/tree/?root={self.box.id}&depth=1')
+        self.assertEqual(len(response.data), 1)
+        self.assertEqual(response.data[0]['name'], "Box A")
+        self.assertEqual(response.data[0]['sublocations'], [])
+
+    def test_tree_rejects_bad_params(self):
+        self.assertEqual(self.client.get('/api/locations/tree/?depth=0').status_code, 400)
+        self.assertEqual(self.client.get('/api/locations/tree/?root=999').status_code, 404)
+
+
+class LocationClosureTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.room = Room.objects.create(name="Garage")
+        self.shelf = Location.objects.create(name="Shelf", room=self.room)
+        self.box = Location.objects.create(name="Box", parent_location=self.shelf)
+        self.pouch = Location.objects.create(name="Pouch", parent_location=self.box)
+        self.other = Location.objects.create(name="Cabinet", room=self.room)
+        Item.objects.create(name="Drill", location=self.shelf)
+        Item.objects.create(name="Bits", location=self.pouch)
+        Item.objects.create(name="Saw", location=self.other)
+
+    def test_descendants_and_ancestors(self):
+        self.assertEqual(
+            set(self.shelf.get_descendants()), {self.box, self.pouch})
+        self.assertEqual(list(self.pouch.get_ancestors()), [self.shelf, self.box])
+
+    def test_move_rewrites_closure(self):
+        box = Location.objects.get(pk=self.box.pk)
+        box.parent_location = self.other
+        box.save()
+        self.assertEqual(list(self.pouch.get_ancestors()), [self.other, box])
+        self.assertEqual(set(self.shelf.get_descendants()), set())
+
+    def test_delete_removes_links(self):
+        self.box.delete()
+        self.assertFalse(LocationClosure.objects.filter(ancestor_id=self.box.pk).exists())
+        self.assertEqual(set(self.shelf.get_descendants()), set())
+
+    def test_recursive_items_endpoint(self):
+        response = self.client.get(f'/api/locations/{self.shelf.id}/items/?recursive=1')
+        self.assertEqual(sorted(row['name'] for row in response.data['results']), ["Bits", "Drill"])
+        response = self.client.get(f'/api/locations/{self.shelf.id}/items/')
+        self.assertEqual([row['name'] for row in response.data['results']], ["Drill"])
+
+    def test_ancestors_endpoint(self):
+        response = self.client.get(f'/api/locations/{self.pouch.id}/ancestors/')
+        self.assertEqual([row['name'] for row in response.data], ["Shelf", "Box"])
+
+    def test_cycle_check_is_one_query(self):
+        shelf = Location.objects.get(pk=self.shelf.pk)
+        shelf.parent_location_id, shelf.room_id = self.pouch.pk, None
+        with self.assertNumQueries(1):
+            with self.assertRaises(DjangoValidationError):
+                shelf.validate_hierarchy()
+        box = Location.objects.get(pk=self.box.pk)
+        with self.assertNumQueries(0):
+            box.validate_hierarchy()  # parent unchanged
+
+    def test_move_endpoint(self):
+        attic = Room.objects.create(name="Attic")
+        response = self.client.post(f'/api/locations/{self.box.pk}/move/', {'room_id': attic.pk}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['room'], response.data['parent_location']), (attic.pk, None))
+        self.pouch.refresh_from_db()
+        self.assertEqual(self.pouch.effective_room_id, attic.pk)
+        self.assertEqual(list(self.pouch.get_ancestors()), [self.box])
+        self.assertEqual(rollups.reconcile(fix=False), [])
+
+        response = self.client.post(f'/api/locations/{self.box.pk}/move/',
+                                    {'parent_location': self.other.pk}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(self.pouch.get_ancestors()), [self.other, self.box])
+        self.assertEqual(Location.objects.get(pk=self.pouch.pk).effective_room_id, self.room.pk)
+        self.assertEqual(rollups.reconcile(fix=False), [])
+
+    def test_move_rejects_cycles_and_bad_targets(self):
+        url = f'/api/locations/{self.shelf.pk}/move/'
+        response = self.client.post(url, {'parent_location': self.pouch.pk}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("Cycle", response.data['error'])
+        for body in ({}, {'parent_location': self.other.pk, 'room_id': self.room.pk}, {'parent_location': 999}):
+            self.assertEqual(self.client.post(url, body, format='json').status_code, 400)
+        self.assertEqual(list(self.pouch.get_ancestors()), [self.shelf, self.box])
+
+    def test_api_nests_at_any_depth_like_move(self):
+        response = self.client.post('/api/locations/', {'name': "Tin", 'parent_location': self.pouch.pk,
+                                                        'room_id': None}, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        tin = Location.objects.get(pk=response.data['id'])
+        self.assertEqual(list(tin.get_ancestors()), [self.shelf, self.box, self.pouch])
+        self.assertEqual(response.data['room_name'], self.room.name)
+        response = self.client.patch(f'/api/locations/{self.shelf.pk}/', {'parent_location': tin.pk,
+                                                                          'room_id': None}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("Cycle", response.data['parent_location'][0])
+
+    def test_move_statements_do_not_depend_on_subtree(self):
+        def statements(location, target):
+            with CaptureQueriesContext(connection) as queries:
+                self.client.post(f'/api/locations/{location.pk}/move/', {'parent_location': target.pk},
+                                 format='json')
+            return len(queries)
+
+        small = statements(self.pouch, self.other)
+        parent = self.box
+        for depth in range(6):
+            parent = Location.objects.create(name=f"Level {depth}", parent_location=parent)
+            Item.objects.create(name=f"Thing {depth}", location=parent, quantity=depth + 1)
+        self.assertEqual(statements(self.box, self.other), small)
+        self.assertEqual(rollups.reconcile(fix=False), [])
+
+
+class CategoryPathTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.tools = Category.objects.create(name="Tools")
+        self.power = Category.objects.create(name="Power Tools", parent=self.tools)
+        self.drills = Category.objects.create(name="Drills", parent=self.power)
+        self.garden = Category.objects.create(name="Garden")
+
+    def test_paths_and_depth(self):
+        self.assertEqual(self.drills.path, f"{self.tools.pk}/{self.power.pk}/{self.drills.pk}/")
+        self.assertEqual(self.drills.depth, 2)
+        self.assertEqual(self.drills.get_ancestor_ids(), [self.tools.pk, self.power.pk])
+
+    def test_move_rewrites_subtree(self):
+        self.power.parent = self.garden
+        self.power.save()
+        self.drills.refresh_from_db()
+        self.assertEqual(self.drills.path, f"{self.garden.pk}/{self.power.pk}/{self.drills.pk}/")
+        self.assertEqual(set(self.tools.get_descendants()), set())
+
+    def test_cycle_rejected_without_walking_parents(self):
+        tools = Category.objects.get(pk=self.tools.pk)
+        tools.parent = self.drills
+        with self.assertNumQueries(0):
+            with self.assertRaises(DjangoValidationError):
+                tools.clean()
+        response = self.client.patch(
+            f'/api/categories/{self.tools.pk}/', {'parent': self.drills.pk}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_delete_reroots_children(self):
+        self.power.delete()
+        self.drills.refresh_from_db()
+        self.assertEqual(self.drills.path, f"{self.drills.pk}/")
+        self.assertEqual(self.drills.depth, 0)
+
+    def test_queryset_delete_of_parent_and_child_reroots_below_both(self):
+        # The parent has the higher pk, so its post_delete runs first and
+        # re-roots the child before the child's own handler runs
+        workshop = Category.objects.create(name="Workshop")
+        self.tools.parent = workshop
+        self.tools.save()
+        Category.objects.filter(pk__in=[workshop.pk, self.tools.pk]).delete()
+        self.power.refresh_from_db()
+        self.drills.refresh_from_db()
+        self.assertEqual((self.power.parent, self.power.path, self.power.depth), (None, f"{self.power.pk}/", 0))
+        self.assertEqual((self.drills.path, self.drills.depth), (f"{self.power.pk}/{self.drills.pk}/", 1))
+        self.assertEqual(set(self.power.get_descendants()), {self.drills})
+
+    def test_items_in_category_subtree(self):
+        Item.objects.create(name="Hammer", category=self.tools)
+        Item.objects.create(name="Cordless Drill", category=self.drills)
+        Item.objects.create(name="Rake", category=self.garden)
+        response = self.client.get(f'/api/items/?category={self.tools.pk}&include_descendants=1')
+        self.assertEqual(
+            sorted(row['name'] for row in response.data['results']), ["Cordless Drill", "Hammer"])
+        response = self.client.get(f'/api/items/?category={self.tools.pk}')
+        self.assertEqual([row['name'] for row in response.data['results']], ["Hammer"])
+
+
+class ItemSearchTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        Item.objects.create(name="HDMI Cable", description="2m, gold plated")
+        Item.objects.create(name="USB Hub", notes="spare HDMI adapter in the box")
+        Item.objects.create(name="Router", serial_number="RT-99812")
+
+    def test_ranked_results_with_snippets(self):
+        response = self.client.get('/api/items/search/?q=hdmi')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual(response.data['results'][0]['name'], "HDMI Cable")
+        self.assertIn('<mark>', response.data['results'][1]['snippet'])
+
+    def test_snippets_escape_item_text(self):
+        Item.objects.create(name="Lamp", notes="<script>alert(1)</script> desk lamp")
+        expected = "&lt;script&gt;alert(1)&lt;/script&gt; <mark>desk</mark> lamp"
+        for backend in ('inventory_app.search.SQLiteFTS5Backend', 'inventory_app.search.BasicSearchBackend'):
+            with self.subTest(backend=backend), override_settings(INVENTORY_SEARCH_BACKEND=backend):
+                snippets = [row['snippet'] for row in self.client.get('/api/items/search/?q=desk').data['results']]
+                self.assertEqual(snippets, [expected])
+
+    def test_index_follows_updates_and_deletes(self):
+        item = Item.objects.get(name="Router")
+        item.name = "Mesh Router"
+        item.save()
+        self.assertEqual(self.client.get('/api/items/search/?q=mesh').data['count'], 1)
+        item.delete()
+        self.assertEqual(self.client.get('/api/items/search/?q=mesh').data['count'], 0)
+
+    def test_prefix_and_serial_match(self):
+        self.assertEqual(self.client.get('/api/items/search/?q=RT-998').data['count'], 1)
+
+    def test_paginates_and_requires_query(self):
+        response = self.client.get('/api/items/search/?q=hdmi&page_size=1')
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertIsNotNone(response.data['next'])
+        self.assertEqual(self.client.get('/api/items/search/').status_code, 400)
+
+    def test_rebuild_command(self):
+        out = StringIO()
+        call_command('rebuild_search_index', stdout=out)
+        self.assertIn("Rebuilt", out.getvalue())
+
+
+class ItemFilterTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.garage = Room.objects.create(name="Garage")
+        self.office = Room.objects.create(name="Office")
+        self.shelf = Location.objects.create(name="Shelf", room=self.garage)
+        self.bin = Location.objects.create(name="Bin", parent_location=self.shelf)
+        self.desk = Location.objects.create(name="Desk", room=self.office)
+        Item.objects.create(name="Drill", location=self.shelf, purchase_price="120.00",
+                            purchase_date=datetime.date(2021, 5, 1), serial_number="D-1")
+        Item.objects.create(name="Screws", location=self.bin, purchase_price="4.50",
+                            purchase_date=datetime.date(2023, 1, 10))
+        Item.objects.create(name="Lamp", location=self.desk, current_value="30.00")
+        Item.objects.create(name="Anvil")
+
+    def names(self, query):
+        response = self.client.get('/api/items/' + query)
+        self.assertEqual(response.status_code, 200, response.data)
+        return [row['name'] for row in response.data['results']]
+
+    def test_room_filter_includes_sublocations(self):
+        self.assertEqual(sorted(self.names(f'?room={self.garage.id}')), ["Drill", "Screws"])
+        self.assertEqual(self.names(f'?location={self.bin.id}'), ["Screws"])
+
+    def test_range_and_serial_filters(self):
+        self.assertEqual(self.names('?price_min=10'), ["Drill"])
+        self.assertEqual(self.names('?purchase_date_after=2022-01-01'), ["Screws"])
+        self.assertEqual(self.names('?value_max=50'), ["Lamp"])
+        self.assertEqual(self.names('?serial_number=D-1'), ["Drill"])
+
+    def test_invalid_filter_value(self):
+        response = self.client.get('/api/items/?price_min=cheap')
+        self.assertEqual(response.status_code, 400)
+
+    def test_ordering_pages_through_nulls(self):
+        names = []
+        url = '/api/items/?ordering=-purchase_price&page_size=1'
+        while url:
+            response = self.client.get(url)
+            names.extend(row['name'] for row in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(names[:2], ["Drill", "Screws"])
+        self.assertEqual(sorted(names[2:]), ["Anvil", "Lamp"])
+
+    def test_ordering_by_room_name(self):
+        self.assertEqual(self.names('?ordering=-room,name'), ["Lamp", "Drill", "Screws", "Anvil"])
+        self.assertEqual(self.client.get('/api/items/?ordering=notes').status_code, 400)
+
+
+class RollupTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.garage = Room.objects.create(name="Garage")
+        self.office = Room.objects.create(name="Office")
+        self.shelf = Location.objects.create(name="Shelf", room=self.garage)
+        self.box = Location.objects.create(name="Box", parent_location=self.shelf)
+        self.desk = Location.objects.create(name="Desk", room=self.office)
+        self.tools = Category.objects.create(name="Tools")
+        self.drills = Category.objects.create(name="Drills", parent=self.tools)
+        self.drill = Item.objects.create(
+            name="Drill", location=self.box, category=self.drills, quantity=2,
+            purchase_price="100.00", current_value="60.00")
+        Item.objects.create(name="Lamp", location=self.desk, purchase_price="20.00")
+
+    def assertConsistent(self):
+        self.assertEqual(rollups.reconcile(fix=False), [])
+
+    def test_item_changes_update_rollups(self):
+        self.assertConsistent()
+        self.drill.location = self.desk
+        self.drill.purchase_price = "80.00"
+        self.drill.save()
+        self.assertConsistent()
+        self.drill.delete()
+        self.assertConsistent()
+
+    def test_location_and_category_moves(self):
+        box = Location.objects.get(pk=self.box.pk)
+        box.parent_location = self.desk
+        box.save()
+        self.assertConsistent()
+        drills = Category.objects.get(pk=self.drills.pk)
+        drills.parent = None
+        drills.save()
+        self.assertConsistent()
+
+    def test_deletes(self):
+        self.tools.delete()
+        self.assertConsistent()
+        self.garage.delete()
+        self.assertConsistent()
+
+    def test_stats_endpoints(self):
+        response = self.client.get('/api/stats/')
+        self.assertEqual(response.data, {
+            'item_count': 2, 'quantity': 3, 'purchase_price': '120.00', 'current_value': '60.00'})
+        rooms = {row['name']: row for row in self.client.get('/api/stats/rooms/').data}
+        self.assertEqual(rooms['Garage']['purchase_price'], '100.00')
+        locations = {row['name']: row for row in self.client.get('/api/stats/locations/').data}
+        self.assertEqual(locations['Shelf']['quantity'], 2)
+        categories = {row['name']: row for row in self.client.get('/api/stats/categories/').data}
+        self.assertEqual(categories['Tools']['item_count'], 1)
+
+    def test_reconcile_command_reports_and_fixes_drift(self):
+        InventoryRollup.objects.filter(scope='room').update(item_count=99)
+        out = StringIO()
+        call_command('reconcile_rollups', '--dry-run', stdout=out)
+        self.assertIn("drifted", out.getvalue())
+        call_command('reconcile_rollups', stdout=StringIO())
+        self.assertConsistent()
+
+
+class BulkItemTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.room = Room.objects.create(name="Attic")
+        self.shelf = Location.objects.create(name="Shelf", room=self.room)
+        self.crate = Location.objects.create(name="Crate", room=self.room)
+        self.category = Category.objects.create(name="Decoration")
+
+    def test_bulk_create(self):
+        rows = [{"name": f"Bauble {i}", "location": self.shelf.id, "category": self.category.id}
+                for i in range(20)]
+        # Preload, one INSERT, the rollup deltas, the version bump and one re-fetch,
+        # independent of the row count
+        with self.assertNumQueries(16):
+            response = self.client.post('/api/items/bulk/', rows, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data), 20)
+        self.assertEqual(response.data[0]['room_name'], "Attic")
+        self.assertEqual(rollups.reconcile(fix=False), [])
+
+    def test_invalid_rows_are_reported_and_nothing_is_written(self):
+        rows = [{"name": "Ok", "location": self.shelf.id}, {"location": 999}]
+        response = self.client.post('/api/items/bulk/', rows, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['errors'][0], {})
+        self.assertIn('name', response.data['errors'][1])
+        self.assertIn('location', response.data['errors'][1])
+        self.assertFalse(Item.objects.exists())
+
+    def test_bulk_move_and_delete(self):
+        items = [Item.objects.create(name=f"Box {i}", location=self.shelf) for i in range(10)]
+        rows = [{"id": item.id, "location": self.crate.id} for item in items]
+        rows[0]["quantity"] = 5
+        response = self.client.patch('/api/items/bulk/', rows, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Item.objects.filter(location=self.crate).count(), 10)
+        self.assertEqual(Item.objects.get(pk=items[0].id).quantity, 5)
+        self.assertEqual(rollups.reconcile(fix=False), [])
+
+        ids = [item.id for item in items[:4]]
+        response = self.client.delete('/api/items/bulk/', {"ids": ids}, format='json')
+        self.assertEqual(response.data, {"deleted": ids})
+        self.assertEqual(Item.objects.count(), 6)
+        self.assertEqual(rollups.reconcile(fix=False), [])
+
+        response = self.client.delete('/api/items/bulk/', {"ids": [999]}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_ids_must_be_integers(self):
+        first = Item.objects.create(name="Wreath", location=self.shelf).id
+        for ids in ([True], [[first]], [str(first)], [None]):
+            with self.subTest(ids=ids):
+                response = self.client.delete('/api/items/bulk/', {"ids": ids}, format='json')
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.data['errors'], [{"id": ["A valid integer is required."]}])
+                response = self.client.patch('/api/items/bulk/', [{"id": ids[0], "quantity": 2}], format='json')
+                self.assertEqual(response.status_code, 400)
+        self.assertTrue(Item.objects.filter(id=first, quantity=1).exists())
+
+
+class ExportTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        garage = Room.objects.create(name="Garage")
+        shelf = Location.objects.create(name="Shelf", room=garage)
+        box = Location.objects.create(name="Box", parent_location=shelf)
+        tools = Category.objects.create(name="Tools")
+        drills = Category.objects.create(name="Drills", parent=tools)
+        Item.objects.create(name="Drill", location=box, category=drills, purchase_price="99.90")
+        Item.objects.create(name="Loose screw")
+
+    def content(self, response):
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_export_resolves_paths(self):
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/export/?format=csv')
+            rows = list(csv.DictReader(StringIO(self.content(response))))
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertEqual(rows[0]['room'], "Garage")
+        self.assertEqual(rows[0]['location_path'], "Shelf > Box")
+        self.assertEqual(rows[0]['category_path'], "Tools > Drills")
+        self.assertEqual(rows[0]['purchase_price'], "99.90")
+        self.assertEqual(rows[1]['location_path'], "")
+
+    def test_jsonl_export_and_bad_format(self):
+        response = self.client.get('/api/export/?format=jsonl')
+        rows = [json.loads(line) for line in self.content(response).splitlines()]
+        self.assertEqual([row['name'] for row in rows], ["Drill", "Loose screw"])
+        self.assertIsNone(rows[1]['category_path'])
+        response = self.client.get('/api/export/?format=<script>alert(1)</script>')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertNotIn(b'<script>', response.content)
+
+    def test_export_command_writes_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'inventory.jsonl')
+            call_command('export_inventory', path, '--format', 'jsonl', stdout=StringIO())
+            with open(path, encoding='utf-8') as export_file:
+                self.assertEqual(len(export_file.readlines()), 2)
+
+
+class ImportTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.garage = Room.objects.create(name="Garage")
+        self.shelf = Location.objects.create(name="Shelf", room=self.garage)
+        Category.objects.create(name="Tools")
+        self.drill = Item.objects.create(name="Drill", serial_number="SN-1", location=self.shelf)
+
+    def csv_file(self, rows):
+        out = StringIO()
+        writer = csv.writer(out)
+        writer.writerow(['name', 'serial_number', 'quantity', 'purchase_price',
+                         'room', 'location_path', 'category_path'])
+        writer.writerows(rows)
+        out.seek(0)
+        return out
+
+    def test_import_resolves_and_creates_names(self):
+        stream = self.csv_file([
+            ["Saw", "", "2", "19.90", "Garage", "Shelf > Box", "Tools > Saws"],
+            ["Hammer", "SN-2", "", "", "Garage", "Shelf", "Tools"],
+        ])
+        report = importer.import_items(stream, 'csv')
+        self.assertEqual((report.created, report.conflicts, report.errors), (2, [], []))
+        saw = Item.objects.get(name="Saw")
+        self.assertEqual(saw.location.parent_location, self.shelf)
+        self.assertEqual(saw.location.get_room(), self.garage)
+        self.assertEqual(saw.category.parent.name, "Tools")
+        self.assertEqual(Item.objects.get(name="Hammer").quantity, 1)
+        self.assertEqual(rollups.reconcile(fix=False), [])
+
+    def test_serial_conflicts_dry_run_and_upsert(self):
+        rows = [["New drill", "SN-1", "1", "", "Garage", "Shelf", ""],
+                ["Twin", "SN-3", "1", "", "Garage", "Shelf", ""],
+                ["Twin again", "SN-3", "1", "", "Garage", "Shelf", ""],
+                ["", "", "x", "", "", "Nowhere", ""]]
+        report = importer.import_items(self.csv_file(rows), 'csv', dry_run=True)
+        self.assertEqual(report.created, 1)
+        self.assertEqual([c['line'] for c in report.conflicts], [2, 4])
+        self.assertEqual(set(report.errors[0]['errors']), {'name', 'quantity'})
+        self.assertEqual(Item.objects.count(), 1)
+
+        report = importer.import_items(self.csv_file(rows[:1]), 'csv', upsert=True)
+        self.assertEqual(report.updated, 1)
+        self.drill.refresh_from_db()
+        self.assertEqual(self.drill.name, "New drill")
+        self.assertEqual(rollups.reconcile(fix=False), [])
+
+    def test_export_round_trip_through_api(self):
+        Item.objects.create(name="Saw", category=Category.objects.get(name="Tools"),
+                            purchase_price=Decimal("24.90"), current_value=Decimal("12.35"))
+        for fmt in ('jsonl', 'csv'):
+            with self.subTest(fmt=fmt):
+                exported = b''.join(self.client.get(f'/api/export/?format={fmt}').streaming_content)
+                Item.objects.all().delete()
+                upload = SimpleUploadedFile(f'inventory.{fmt}', exported)
+                response = self.client.post('/api/import/', {'file': upload}, format='multipart')
+                self.assertEqual(response.data['created'], 2, response.data)
+                self.assertEqual(Item.objects.get(name="Drill").location, self.shelf)
+                saw = Item.objects.get(name="Saw")
+                self.assertEqual(saw.category.name, "Tools")
+                self.assertEqual((saw.purchase_price, saw.current_value), (Decimal("24.90"), Decimal("12.35")))
+
+    def test_json_number_prices(self):
+        line = json.dumps({"name": "Lamp", "purchase_price": 9.99, "quantity": 2})
+        report = importer.import_items(StringIO(line + "\n"), 'jsonl')
+        self.assertEqual(report.created, 1, report.errors)
+        self.assertEqual(Item.objects.get(name="Lamp").purchase_price, Decimal("9.99"))
+
+    def test_bad_import_format(self):
+        for name, data in (('inventory.csv', {'format': '<script>alert(1)</script>'}),
+                           ('inventory.<script>', {})):
+            with self.subTest(name=name):
+                upload = SimpleUploadedFile(name, b"name\nLamp\n")
+                response = self.client.post('/api/import/', {'file': upload, **data}, format='multipart')
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json(), {"error": "Unknown import format; use one of: csv, jsonl."})
+
+
+@override_settings(INVENTORY_JOBS_EAGER=True,
+                   INVENTORY_VOICE_PROVIDER='inventory_app.providers.StubProvider')
+class VoiceJobTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        voice_cache.clear()
+
+    def upload(self, text):
+        audio = SimpleUploadedFile('note.wav', text.encode())
+        return self.client.post('/api/voice-add-item/', {'audio': audio}, format='multipart')
+
+    def test_upload_returns_job_and_creates_items(self):
+        response = self.upload(json.dumps({"items": [
+            {"name": "Ladder", "quantity": 1, "room": "Garage", "location": "Wall"}]}))
+        self.assertEqual(response.status_code, 202)
+        job = self.client.get(f"/api/jobs/{response.data['id']}/").data
+        self.assertEqual(job['status'], 'succeeded')
+        self.assertEqual([item['name'] for item in job['items']], ["Ladder"])
+        self.assertEqual(job['items'][0]['room_name'], "Garage")
+        self.assertIsNone(VoiceJob.objects.get(pk=job['id']).audio)
+
+    def test_failed_extraction_is_reported(self):
+        response = self.upload(json.dumps({"items": [{"quantity": 2}]}))
+        job = self.client.get(f"/api/jobs/{response.data['id']}/").data
+        self.assertEqual(job['status'], 'failed')
+        self.assertIn('name', job['error'])
+
+    def test_jobs_lost_in_a_restart_fail_and_free_their_audio(self):
+        audio_hash = voice_cache.audio_key(b"Ladder")
+        lost = VoiceJob.objects.create(audio=b"Ladder", audio_hash=audio_hash, status=VoiceJob.STATUS_RUNNING)
+        fresh = VoiceJob.objects.create(audio=b"Rake", audio_hash=voice_cache.audio_key(b"Rake"))
+        VoiceJob.objects.filter(pk=lost.pk).update(updated_at=timezone.now() - datetime.timedelta(hours=1))
+        self.assertIsNone(voice.find_duplicate_job(audio_hash))
+
+        self.assertEqual(self.client.get(f"/api/jobs/{lost.pk}/").data['status'], 'failed')
+        self.assertEqual(VoiceJob.objects.get(pk=fresh.pk).status, VoiceJob.STATUS_QUEUED)
+        response = self.upload("Ladder")
+        self.assertEqual(response.status_code, 202)
+        self.assertNotEqual(response.data['id'], str(lost.pk))
+        # A worker that only now gets to the failed job leaves it alone
+        voice.run_voice_job(lost.pk)
+        self.assertEqual(VoiceJob.objects.get(pk=lost.pk).status, VoiceJob.STATUS_FAILED)
+
+    def test_job_failed_as_stale_while_running_stays_failed(self):
+        job = VoiceJob.objects.create(audio=b"Wheelbarrow", audio_hash=voice_cache.audio_key(b"Wheelbarrow"))
+        provider = StubProvider()
+        extract = provider.extract
+
+        def slow_extract(transcript):
+            # The job outlives the timeout and a poll gives up on it meanwhile
+            VoiceJob.objects.filter(pk=job.pk).update(updated_at=timezone.now() - datetime.timedelta(hours=1))
+            self.assertEqual(voice.fail_stale_jobs(), 1)
+            return extract(transcript)
+
+        with mock.patch.object(provider, 'extract', side_effect=slow_extract):
+            voice.run_voice_job(job.pk, provider)
+        job.refresh_from_db()
+        self.assertEqual(job.status, VoiceJob.STATUS_FAILED)
+        self.assertIn("Abandoned", job.error)
+        # The client was told to upload again, so the late result adds no items
+        self.assertEqual(job.item_ids, [])
+        self.assertFalse(Item.objects.filter(name="Wheelbarrow").exists())
+
+    @override_settings(INVENTORY_JOBS_EAGER=False)
+    def test_full_queue_sheds_load(self):
+        with mock.patch('inventory_app.jobs._pool',
+                        return_value=(None, threading.BoundedSemaphore(1))) as pool:
+            pool.return_value[1].acquire()
+            response = self.upload("Hammer")
+        self.assertEqual(response.status_code, 503)
+        self.assertFalse(VoiceJob.objects.exists())
+        self.assertEqual(self.client.post('/api/voice-add-item/').status_code, 400)
+
+
+@override_settings(INVENTORY_JOBS_EAGER=True,
+                   INVENTORY_VOICE_PROVIDER='inventory_app.providers.StubProvider')
+class VoiceCacheTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        voice_cache.clear()
+
+    def upload(self, text):
+        audio = SimpleUploadedFile('note.wav', text.encode())
+        return self.client.post('/api/voice-add-item/', {'audio': audio}, format='multipart')
+
+    def test_retried_upload_is_idempotent(self):
+        first = self.upload("Garden hose")
+        retry = self.upload("Garden hose")
+        self.assertEqual(retry.status_code, 200)
+        self.assertEqual(retry.data['id'], first.data['id'])
+        self.assertEqual(Item.objects.filter(name="Garden hose").count(), 1)
+
+    def test_concurrent_retries_share_one_job(self):
+        first = self.upload("Garden hose")
+        # The retry's lookup ran before the first job existed
+        with mock.patch('inventory_app.voice.find_duplicate_job', side_effect=[None, VoiceJob.objects.get()]):
+            retry = self.upload("Garden hose")
+        self.assertEqual(retry.status_code, 200)
+        self.assertEqual(retry.data['id'], first.data['id'])
+        self.assertEqual(VoiceJob.objects.count(), 1)
+        self.assertEqual(Item.objects.filter(name="Garden hose").count(), 1)
+
+    def test_audio_is_new_again_after_the_dedupe_window(self):
+        first = self.upload("Broom")
+        VoiceJob.objects.update(created_at=timezone.now() - datetime.timedelta(seconds=voice_cache.cache_ttl() + 1))
+        again = self.upload("Broom")
+        self.assertEqual(again.status_code, 202)
+        self.assertEqual(VoiceJob.objects.get(pk=first.data['id']).audio_hash, '')
+
+    def test_failed_job_can_be_retried_from_cache(self):
+        VoiceJob.objects.create(audio_hash=voice_cache.audio_key(b"Rake"), status=VoiceJob.STATUS_FAILED)
+        voice_cache.transcripts.set(voice_cache.audio_key(b"Rake"), "Rake")
+        with mock.patch('inventory_app.providers.StubProvider.transcribe') as transcribe:
+            self.assertEqual(self.upload("Rake").status_code, 202)
+        transcribe.assert_not_called()
+        self.assertEqual(voice_cache.stats()['transcripts']['hits'], 1)
+
+    def test_extraction_is_keyed_by_normalized_transcript(self):
+        self.upload("Snow shovel")
+        with mock.patch('inventory_app.providers.StubProvider.extract') as extract:
+            self.upload("  snow   SHOVEL. ")
+        extract.assert_not_called()
+        stats = self.client.get('/api/jobs/cache/').data
+        self.assertEqual((stats['extractions']['hits'], stats['extractions']['misses']), (1, 1))
+
+    def test_size_and_ttl_eviction(self):
+        now = [0]
+        cache = voice_cache.ResultCache(max_entries=2, ttl=10, clock=lambda: now[0])
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)  # evicts the least recently used 'b'
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 1)
+        now[0] = 11
+        self.assertIsNone(cache.get('c'))
+        self.assertEqual(cache.stats()['evictions'], 2)
+
+    def test_settings_are_read_at_use(self):
+        with override_settings(INVENTORY_VOICE_CACHE_SIZE=1, INVENTORY_VOICE_CACHE_TTL=5):
+            self.assertEqual(voice_cache.cache_ttl(), 5)
+            voice_cache.transcripts.set('a', "one")
+            voice_cache.transcripts.set('b', "two")
+            self.assertIsNone(voice_cache.transcripts.get('a'))
+            self.assertEqual(voice_cache.stats()['transcripts']['max_entries'], 1)
+        self.assertEqual(voice_cache.stats()['transcripts']['max_entries'], 256)
+
+
+class VoiceItemResolutionTestCase(TestCase):
+    def setUp(self):
+        self.garage = Room.objects.create(name="Garage")
+        self.wall = Location.objects.create(name="Tool Wall", room=self.garage)
+
+    def test_names_match_case_and_whitespace_insensitively(self):
+        items = voice.create_items([
+            {"name": "Saw", "quantity": 1, "room": "  garage ", "location": "tool   WALL"},
+            {"name": "Box", "quantity": 2, "room": "Attic", "location": "Corner"},
+            {"name": "Lamp", "quantity": 1, "room": "attic", "location": "corner"},
+            {"name": "Tape", "quantity": 1, "room": None, "location": "Tool wall"},
+        ])
+        self.assertEqual(items[0].location_id, self.wall.pk)
+        self.assertEqual(items[3].location_id, self.wall.pk)
+        self.assertEqual(Room.objects.filter(normalized_name="attic").count(), 1)
+        corner = Location.objects.get(name="Corner")
+        self.assertEqual((items[1].location_id, items[2].location_id), (corner.pk, corner.pk))
+        self.assertEqual(corner.get_room().name, "Attic")
+        self.assertEqual(list(corner.get_descendants(include_self=True)), [corner])
+        self.assertEqual(rollups.reconcile(fix=False), [])
+
+    def test_query_count_does_not_grow_with_items(self):
+        def utterance(size, room):
+            return [{"name": f"Thing {i}", "quantity": 1, "room": room, "location": f"Spot {i % 2}"}
+                    for i in range(size)]
+
+        with CaptureQueriesContext(connection) as small:
+            voice.create_items(utterance(2, "Cellar"))
+        with CaptureQueriesContext(connection) as large:
+            voice.create_items(utterance(12, "Loft"))
+        self.assertEqual(len(small), len(large))
+
+    def test_invalid_item_writes_nothing(self):
+        with self.assertRaises(ValueError):
+            voice.create_items([{"name": "Ok", "room": "Shed"}, {"quantity": 3}])
+        self.assertFalse(Room.objects.filter(name="Shed").exists())
+        self.assertFalse(Item.objects.exists())
+
+
+class ConditionalGetTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.room = Room.objects.create(name="Hall")
+        self.location = Location.objects.create(name="Closet", room=self.room)
+        self.item = Item.objects.create(name="Umbrella", location=self.location)
+
+    def test_matching_etag_returns_304_without_serializing(self):
+        response = self.client.get('/api/items/')
+        etag = response['ETag']
+        with mock.patch.object(ItemSerializer, 'to_representation') as to_representation:
+            with self.assertNumQueries(1):  # the version lookup only
+                response = self.client.get('/api/items/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['ETag'], etag)
+        to_representation.assert_not_called()
+
+    def test_writes_to_dependencies_change_the_etag(self):
+        items = self.client.get('/api/items/')['ETag']
+        categories = self.client.get('/api/categories/')['ETag']
+        self.room.name = "Entrance hall"
+        self.room.save()  # shown as room_name on every item
+        self.assertEqual(self.client.get('/api/items/', HTTP_IF_NONE_MATCH=items).status_code, 200)
+        self.assertEqual(
+            self.client.get('/api/categories/', HTTP_IF_NONE_MATCH=categories).status_code, 304)
+
+    def test_bulk_writes_and_query_strings(self):
+        etag = self.client.get(f'/api/items/{self.item.pk}/')['ETag']
+        self.assertNotEqual(self.client.get('/api/items/?ordering=name')['ETag'], etag)
+        self.client.patch('/api/items/bulk/', [{"id": self.item.pk, "quantity": 4}], format='json')
+        response = self.client.get(f'/api/items/{self.item.pk}/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['quantity'], 4)
+
+    def age_versions(self, seconds=2):
+        ModelVersion.objects.update(changed_at=F('changed_at') - datetime.timedelta(seconds=seconds))
+
+    def test_if_modified_since(self):
+        self.age_versions()
+        last_modified = self.client.get('/api/rooms/')['Last-Modified']
+        response = self.client.get('/api/rooms/', HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+    def test_write_in_the_same_second_is_not_hidden(self):
+        second = int(time.time()) - 10
+        stamp = lambda fraction: datetime.datetime.fromtimestamp(second + fraction, datetime.timezone.utc)  # noqa: E731
+        ModelVersion.objects.update(changed_at=stamp(0.1))
+        with mock.patch('inventory_app.conditional.time.time', return_value=second + 0.5):
+            self.assertNotIn('Last-Modified', self.client.get('/api/rooms/'))
+            # Another write later in the same second
+            ModelVersion.objects.update(changed_at=stamp(0.7))
+            response = self.client.get('/api/rooms/', HTTP_IF_MODIFIED_SINCE=http_date(second))
+            self.assertEqual(response.status_code, 200)
+        with mock.patch('inventory_app.conditional.time.time', return_value=second + 1.5):
+            self.assertEqual(self.client.get('/api/rooms/')['Last-Modified'], http_date(second))
+
+class ResponseCacheTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        response_cache.get_cache().clear()
+        response_cache.reset_stats()
+        self.room = Room.objects.create(name="Study")
+        self.desk = Location.objects.create(name="Desk", room=self.room)
+        self.books = Category.objects.create(name="Books")
+
+    def test_repeat_list_is_served_from_cache(self):
+        first = self.client.get('/api/rooms/')
+        with self.assertNumQueries(1):  # version stamps only
+            second = self.client.get('/api/rooms/')
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(self.client.get('/api/cache/stats/').data['rooms'],
+                         {'hits': 1, 'misses': 1, 'hit_ratio': 0.5})
+
+    def test_invalidation_is_precise(self):
+        self.client.get('/api/locations/tree/')
+        self.client.get('/api/categories/')
+        Location.objects.create(name="Shelf", room=self.room)
+        tree = self.client.get('/api/locations/tree/').data
+        self.assertEqual({node['name'] for node in tree}, {"Desk", "Shelf"})
+        self.client.get('/api/categories/')
+        stats = response_cache.stats()
+        self.assertEqual(stats['locations']['hits'], 0)
+        self.assertEqual(stats['categories']['hits'], 1)
+
+    def test_room_rename_reaches_location_list(self):
+        self.client.get('/api/locations/')
+        self.room.name = "Office"
+        self.room.save()
+        response = self.client.get('/api/locations/')
+        self.assertEqual(response.data['results'][0]['room_name'], "Office")
+
+    def test_file_backend(self):
+        with tempfile.TemporaryDirectory() as directory:
+            backend = {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                       'LOCATION': directory}
+            with override_settings(CACHES={'default': backend, 'responses': backend}):
+                self.client.get('/api/categories/')
+                self.assertEqual(self.client.get('/api/categories/').status_code, 200)
+                self.books.delete()
+                self.assertEqual(self.client.get('/api/categories/').data['results'], [])
+                self.assertEqual(response_cache.stats()['categories']['hits'], 1)
+
+
+class FieldSelectionTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        response_cache.get_cache().clear()
+        self.room = Room.objects.create(name="Workshop")
+        self.bench = Location.objects.create(name="Bench", room=self.room)
+        self.drawer = Location.objects.create(name="Drawer", parent_location=self.bench)
+        self.tools = Category.objects.create(name="Tools")
+        for name in ("Chisel", "Plane", "Rasp"):
+            Item.objects.create(name=name, location=self.drawer, category=self.tools)
+
+    def test_sparse_fields_skip_joins(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/items/?fields=id,name')
+        self.assertEqual(list(response.data['results'][0]), ['id', 'name'])
+        self.assertEqual(len(queries), 2)  # version stamps + the list
+        self.assertNotIn('JOIN', queries[-1]['sql'])
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/rooms/?fields=id,name')
+        self.assertEqual(response.data[0], {'id': self.room.id, 'name': "Workshop"})
+        self.assertEqual(len(queries), 2)  # no location prefetches
+
+    def test_expand_nests_objects_with_a_fixed_query_count(self):
+        with self.assertNumQueries(4):  # versions, items + joins, sublocations, subcategories
+            response = self.client.get('/api/items/?fields=name,location,category&expand=location,category')
+        row = response.data['results'][0]
+        self.assertEqual(row['location']['name'], "Drawer")
+        self.assertEqual(row['location']['room_name'], "Workshop")
+        self.assertEqual(row['category']['name'], "Tools")
+
+        response = self.client.get(f'/api/locations/{self.drawer.id}/?expand=room,parent_location')
+        self.assertEqual(response.data['room'], {'id': self.room.id, 'name': "Workshop", 'description': None})
+        self.assertEqual(response.data['parent_location'],
+                         {'id': self.bench.id, 'name': "Bench", 'room_name': "Workshop"})
+
+    def test_writes_keep_fields_left_out_of_the_response(self):
+        response = self.client.post('/api/items/?fields=id', {"name": "Lamp", "location": self.bench.id,
+                                                               "quantity": 3}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(list(response.data), ['id'])
+        lamp = Item.objects.get(pk=response.data['id'])
+        self.assertEqual((lamp.name, lamp.location, lamp.quantity), ("Lamp", self.bench, 3))
+
+        response = self.client.patch(f'/api/items/{lamp.id}/?fields=name&expand=location',
+                                     {"name": "Desk lamp", "location": self.drawer.id}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.data), {'name', 'location'})
+        self.assertEqual(response.data['location']['name'], "Drawer")
+        lamp.refresh_from_db()
+        self.assertEqual((lamp.name, lamp.location), ("Desk lamp", self.drawer))
+
+    def test_default_output_is_unchanged_and_unknown_names_are_rejected(self):
+        row = self.client.get('/api/items/').data['results'][0]
+        self.assertEqual(row['location_id'], self.drawer.id)
+        self.assertEqual(row['room_name'], "Workshop")
+        self.assertEqual(row['category'], self.tools.id)
+        self.assertEqual(self.client.get('/api/items/?fields=id,secret').status_code, 400)
+        self.assertEqual(self.client.get('/api/rooms/?expand=locations').status_code, 400)
+
+
+class FastListTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.room = Room.objects.create(name="Küche", description="Erdgeschoss")
+        self.bare = Room.objects.create(name="Attic")
+        self.cupboard = Location.objects.create(name="Cupboard", room=self.room)
+        self.shelf = Location.objects.create(name="Shelf top", parent_location=self.cupboard)
+        self.orphan = Location.objects.create(name="Lost", room=self.room)
+        Location.objects.filter(pk=self.orphan.pk).update(room=None, effective_room=None)
+        tools = Category.objects.create(name="Tools")
+        Item.objects.create(name="Mixer", location=self.shelf, category=tools, quantity=2,
+                            purchase_date=datetime.date(2021, 3, 4), purchase_price="149.90",
+                            current_value="80", serial_number="M-1", notes='"quoted"\n\ttabbed')
+        Item.objects.create(name="Loose screw", description="ü, 😀")
+        Item.objects.create(name="Lamp", location=self.orphan, purchase_price="0.05")
+
+    def assertSameBytes(self, url):
+        bodies = []
+        for fast in (False, True):
+            response_cache.get_cache().clear()
+            with override_settings(INVENTORY_FAST_LIST=fast):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            bodies.append(response.content)
+        self.assertEqual(bodies[0], bodies[1], url)
+        return json.loads(bodies[1])
+
+    def test_lists_match_the_serializers_byte_for_byte(self):
+        items = self.assertSameBytes('/api/items/')['results']
+        self.assertEqual(len(items), 3)
+        loose = next(row for row in items if row['name'] == "Loose screw")
+        self.assertNotIn('location_name', loose)  # DRF skips fields behind a NULL relation
+        self.assertSameBytes('/api/items/?ordering=-purchase_price&page_size=2')
+        self.assertSameBytes('/api/items/?ordering=room,name')
+        self.assertSameBytes('/api/items/?fields=name,room_name,purchase_date')
+        self.assertSameBytes('/api/items/?format=json')
+        self.assertSameBytes('/api/locations/')
+        self.assertSameBytes('/api/locations/?page_size=1')
+        self.assertSameBytes('/api/locations/?fields=id,sublocations')
+        rooms = self.assertSameBytes('/api/rooms/')
+        self.assertEqual([len(room['locations']) for room in rooms], [1, 0])
+
+    def test_next_page_links_match(self):
+        first = self.assertSameBytes('/api/items/?page_size=1&ordering=location')
+        self.assertSameBytes(first['next'])
+
+    def test_fast_path_keeps_query_count(self):
+        with override_settings(INVENTORY_FAST_LIST=True):
+            with self.assertNumQueries(2):  # version stamps + the list
+                self.client.get('/api/items/')
+            response_cache.get_cache().clear()
+            with self.assertNumQueries(4):  # versions, rooms, locations, sublocations
+                self.client.get('/api/rooms/')
+
+    def test_encoders_compile_and_renderer_matches_drf(self):
+        self.assertIsNotNone(fastpath.row_encoder(ItemSerializer))
+        self.assertIsNotNone(fastpath.row_encoder(LocationSerializer))
+        self.assertIsNone(fastpath.row_encoder(CategorySerializer))  # custom to_representation
+        data = {'text': "line\u2028sep \u2029 ü \x01 \"q\" \\ </script> 😀", 'n': [1, -2, None, True, False],
+                'nested': [{'': []}, {}], 'big': 2 ** 63 - 1}
+        context = {'response': mock.Mock(plain_data=True)}
+        with mock.patch('inventory_app.fastpath.orjson.dumps', wraps=orjson.dumps) as dumps:
+            self.assertEqual(fastpath.FastJSONRenderer().render(data, renderer_context=context),
+                             JSONRenderer().render(data))
+        dumps.assert_called_once()
+        # Out of orjson's range: DRF's encoder takes over
+        data = {'big': 2 ** 64}
+        self.assertEqual(fastpath.FastJSONRenderer().render(data, renderer_context=context),
+                         JSONRenderer().render(data))
+
+    def test_field_selections_share_one_encoder(self):
+        self.assertSameBytes('/api/items/?fields=id,name')
+        compiled = fastpath.row_encoder.cache_info().currsize
+        for fields in ('name,id', 'id,name,id', 'name,id,name'):
+            self.assertEqual(list(self.assertSameBytes(f'/api/items/?fields={fields}')['results'][0]), ['id', 'name'])
+        self.assertEqual(fastpath.row_encoder.cache_info().currsize, compiled)
+        self.assertIsNotNone(fastpath.row_encoder.cache_info().maxsize)
+
+    def test_list_responses_are_rendered_with_orjson(self):
+        with mock.patch('inventory_app.fastpath.orjson.dumps', wraps=orjson.dumps) as dumps:
+            self.assertSameBytes('/api/items/')
+        dumps.assert_called()
+
+
+@override_settings(DATABASE_ROUTERS=['inventory_app.routers.ReplicaRouter'])
+class ReplicaRouterTestCase(TransactionTestCase):
+    """The replica is a second SQLite file: a snapshot of the primary taken in setUp."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.replica_path = os.path.join(cls.tmp.name, 'replica.sqlite3')
+        # Registered after the test runner set up its databases, so it is left alone
+        connections.settings['replica'] = {**connections['default'].settings_dict, 'NAME': cls.replica_path}
+        cls.databases = cls.databases | {'replica'}
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections['replica'].close()
+        del connections['replica']
+        del connections.settings['replica']
+        cls.tmp.cleanup()
+
+    def setUp(self):
+        self.client = APIClient()
+        Item.objects.create(name="Synced")
+        connections['replica'].close()
+        connection.ensure_connection()
+        target = sqlite3.connect(self.replica_path)
+        connection.connection.backup(target)
+        target.close()
+        Item.objects.create(name="Not replicated yet")
+
+    def test_reads_go_to_the_replica_and_writes_to_the_primary(self):
+        self.assertEqual(Item.objects.all().db, 'default')
+        with replica_reads():
+            self.assertEqual(Item.objects.all().db, 'replica')
+            self.assertEqual(router.db_for_write(Item), 'default')
+
+        response = self.client.get('/api/items/')
+        self.assertEqual([row['name'] for row in response.data['results']], ["Synced"])
+
+        response = self.client.post('/api/items/', {"name": "Posted"}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(Item.objects.using('default').filter(name="Posted").exists())
+        self.assertFalse(Item.objects.using('replica').filter(name="Posted").exists())
+        # The writer reads its own writes from the primary; other clients see the replica
+        self.assertEqual(self.client.get(f'/api/items/{response.data["id"]}/').status_code, 200)
+        self.assertEqual(APIClient().get(f'/api/items/{response.data["id"]}/').status_code, 404)
+
+    @override_settings(INVENTORY_JOBS_EAGER=True, INVENTORY_VOICE_PROVIDER='inventory_app.providers.StubProvider')
+    def test_voice_jobs_are_polled_from_the_primary(self):
+        audio = SimpleUploadedFile('note.wav', b"Lantern")
+        response = self.client.post('/api/voice-add-item/', {'audio': audio}, format='multipart')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(APIClient().get(response['Location']).data['status'], 'succeeded')
+
+    def test_replica_responses_are_not_cached(self):
+        response_cache.get_cache().clear()
+        Room.objects.create(name="Cellar")
+        self.assertEqual(APIClient().get('/api/rooms/').data, [])  # the replica predates the room
+        connections['replica'].close()
+        target = sqlite3.connect(self.replica_path)
+        connection.connection.backup(target)  # the replica catches up
+        target.close()
+        self.assertEqual([room['name'] for room in APIClient().get('/api/rooms/').data], ["Cellar"])
+
+    def test_production_profile_applies_pragmas_and_reuses_connections(self):
+        from django.db.backends.sqlite3.base import DatabaseWrapper
+        from home_inventory.settings import sqlite_database
+
+        profile = sqlite_database(os.path.join(self.tmp.name, 'primary.sqlite3'), 'production')
+        self.assertEqual(profile['CONN_MAX_AGE'], 600)
+        wrapper = DatabaseWrapper(connections.configure_settings({'default': profile})['default'], 'primary')
+        try:
+            with wrapper.cursor() as cursor:
+                pragmas = {}
+                for name in ('journal_mode', 'synchronous', 'busy_timeout', 'cache_size', 'query_only'):
+                    cursor.execute(f'PRAGMA {name}')
+                    pragmas[name] = cursor.fetchone()[0]
+        finally:
+            wrapper.close()
+        self.assertEqual(pragmas, {'journal_mode': 'wal', 'synchronous': 1, 'busy_timeout': 5000,
+                                   'cache_size': -65536, 'query_only': 0})
+        self.assertEqual(wrapper.transaction_mode, 'IMMEDIATE')
+        self.assertIn('PRAGMA query_only=ON', sqlite_database('replica.sqlite3', 'production', read_only=True)
+                      ['OPTIONS']['init_command'])
+        self.assertNotIn('OPTIONS', sqlite_database('dev.sqlite3', 'development'))
+
+
+class RequestMetricsTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        room = Room.objects.create(name="Hall")
+        Item.objects.create(name="Umbrella", location=Location.objects.create(name="Stand", room=room))
+
+    def test_server_timing_header_and_log_line(self):
+        with self.assertLogs('inventory_app.requests', 'INFO') as logs:
+            response = self.client.get('/api/items/')
+        self.assertRegex(response['Server-Timing'],
+                         r'^sql;dur=[\d.]+;desc="2 queries", serializer;dur=[\d.]+, total;dur=[\d.]+$')
+        entry = json.loads(logs.records[-1].getMessage())
+        self.assertEqual((entry['view'], entry['status'], entry['sql_count']), ('item-list', 200, 2))
+        self.assertEqual(logs.records[-1].metrics, entry)
+
+        with override_settings(INVENTORY_SERVER_TIMING=False), self.assertLogs('inventory_app.requests'):
+            self.assertNotIn('Server-Timing', self.client.get('/api/items/'))
+
+    def test_collect_counts_queries_and_serializer_time(self):
+        with metrics.collect() as recorded:
+            data = ItemSerializer(Item.objects.select_related('location__effective_room'), many=True).data
+        self.assertEqual(data[0]['room_name'], "Hall")
+        self.assertEqual(recorded.sql_count, 1)
+        self.assertGreater(recorded.serializer_time, 0)
+        self.assertGreaterEqual(recorded.total_time, recorded.serializer_time)
+        self.assertIsNone(metrics.current())
+
+
+# Query budget per route name in inventory_app/urls.py: (method, path, budget).
+# Paths are formatted with the fixture ids of QueryBudgetTestCase. Every route
+# must have one; the count may not grow with the number of rows.
+QUERY_BUDGETS = {
+    'api-root': ('get', '/', 0),
+    'room-list': ('get', '/api/rooms/', 4),
+    'room-detail': ('get', '/api/rooms/{room}/', 4),
+    'location-list': ('get', '/api/locations/', 3),
+    'location-detail': ('get', '/api/locations/{location}/', 3),
+    'location-tree': ('get', '/api/locations/tree/', 2),
+    'location-items': ('get', '/api/locations/{location}/items/?recursive=1', 4),
+    'location-ancestors': ('get', '/api/locations/{sublocation}/ancestors/', 5),
+    'location-move': ('post', '/api/locations/{sublocation}/move/', 22),
+    'item-list': ('get', '/api/items/', 2),
+    'item-detail': ('get', '/api/items/{item}/', 2),
+    'item-bulk': ('post', '/api/items/bulk/', 13),
+    'item-search': ('get', '/api/items/search/?q=widget', 5),
+    'category-list': ('get', '/api/categories/', 3),
+    'category-detail': ('get', '/api/categories/{category}/', 3),
+    'stats-list': ('get', '/api/stats/', 2),
+    'stats-rooms': ('get', '/api/stats/rooms/', 3),
+    'stats-locations': ('get', '/api/stats/locations/', 3),
+    'stats-categories': ('get', '/api/stats/categories/', 3),
+    'voicejob-detail': ('get', '/api/jobs/{job}/', 3),
+    'voicejob-cache': ('get', '/api/jobs/cache/', 0),
+    'voice_add_item': ('post', '/api/voice-add-item/', 26),  # runs the job inline
+    'export_inventory': ('get', '/api/export/?format=jsonl', 3),
+    'import_inventory': ('post', '/api/import/', 16),
+    'cache_stats': ('get', '/api/cache/stats/', 0),
+    'sync_changes': ('get', '/api/sync/', 13),
+    'rooms_overview': ('get', '/rooms/', 3),
+    'room_detail': ('get', '/rooms/{room}/', 3),
+}
+
+
+def _route_names(patterns):
+    names = set()
+    for pattern in patterns:
+        if hasattr(pattern, 'url_patterns'):
+            names |= _route_names(pattern.url_patterns)
+        elif pattern.name:
+            names.add(pattern.name)
+    return names
+
+
+class QueryBudgetMixin:
+    """``assertQueryBudget``: a request runs at most ``budget`` queries, however many rows there are."""
+
+    def assertQueryBudget(self, budget, method, path, grow, request=dict):
+        """Run the request, ``grow()`` the tables and run it again; ``request()`` gives the client kwargs."""
+        counts = []
+        for _ in range(2):
+            response_cache.get_cache().clear()
+            with CaptureQueriesContext(connection) as queries:
+                response = getattr(self.client, method)(path, **request())
+                if response.streaming:
+                    b''.join(response.streaming_content)
+            self.assertLess(response.status_code, 400, f"{method.upper()} {path}")
+            counts.append(len(queries))
+            grow()
+        self.assertLessEqual(counts[0], budget, f"{method.upper()} {path}")
+        self.assertEqual(counts[0], counts[1], f"{method.upper()} {path} grows with the rows")
+
+
+@override_settings(INVENTORY_JOBS_EAGER=True,
+                   INVENTORY_VOICE_PROVIDER='inventory_app.providers.StubProvider')
+class QueryBudgetTestCase(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        voice_cache.clear()
+        self.rounds = 0
+        self.grow()
+        self.ids = {
+            'room': Room.objects.earliest('id').id,
+            'location': Location.objects.filter(parent_location=None).earliest('id').id,
+            'sublocation': Location.objects.exclude(parent_location=None).earliest('id').id,
+            'item': Item.objects.earliest('id').id,
+            'category': Category.objects.earliest('id').id,
+            'job': VoiceJob.objects.create(status=VoiceJob.STATUS_SUCCEEDED,
+                                           item_ids=list(Item.objects.values_list('id', flat=True))).id,
+        }
+        # The sublocation moves back and forth between two rooms' shelves
+        self.move_targets = [Location.objects.create(name="Spare shelf", room=Room.objects.create(name="Spare")).id,
+                             self.ids['location']]
+
+    def grow(self):
+        """Add another batch of rows to every table the routes read."""
+        self.rounds += 1
+        n = self.rounds
+        parent = Category.objects.filter(parent=None).first()
+        category = Category.objects.create(name=f"Gadgets {n}", parent=parent)
+        room = Room.objects.create(name=f"Room {n}")
+        location = Location.objects.create(name=f"Shelf {n}", room=room)
+        box = Location.objects.create(name=f"Box {n}", parent_location=location)
+        Location.objects.create(name=f"Tray {n}", parent_location=box)
+        for i in range(3):
+            Item.objects.create(name=f"Widget {n}.{i}", location=box if i else location,
+                                category=category, purchase_price="9.99", quantity=i + 1)
+
+    def request_body(self, name):
+        """Client kwargs for the routes that take a body; uploads differ per round."""
+        if name == 'item-bulk':
+            return {'data': [{"name": f"Bulk {i}", "location": self.ids['location']} for i in range(3)],
+                    'format': 'json'}
+        if name == 'voice_add_item':
+            audio = json.dumps({"items": [{"name": f"Lamp {self.rounds}", "quantity": 1,
+                                           "room": "Room 1", "location": "Shelf 1"}]})
+            return {'data': {'audio': SimpleUploadedFile('note.wav', audio.encode())}, 'format': 'multipart'}
+        if name == 'location-move':
+            self.move_targets.reverse()
+            return {'data': {'parent_location': self.move_targets[-1]}, 'format': 'json'}
+        if name == 'import_inventory':
+            rows = f"name,room,location_path\nImported {self.rounds},Room 1,Shelf 1\n"
+            return {'data': {'file': SimpleUploadedFile('items.csv', rows.encode())}, 'format': 'multipart'}
+        return {}
+
+    def test_every_route_has_a_budget(self):
+        from inventory_app import urls
+        self.assertEqual(_route_names(urls.urlpatterns), {*QUERY_BUDGETS, *benchmark.OPEN_ENDED})
+
+    def test_routes_stay_within_their_budgets(self):
+        for name, (method, path, budget) in QUERY_BUDGETS.items():
+            with self.subTest(route=name):
+                self.assertQueryBudget(budget, method, path.format(**self.ids), self.grow,
+                                       lambda: self.request_body(name))
+
+
+class SeedInventoryTestCase(TestCase):
+    def test_seed_writes_consistent_hierarchies(self):
+        report = seed.seed_inventory('tiny', seed=7)
+        scale = seed.SCALES['tiny']
+        self.assertEqual(report.as_dict(), {'rooms': 3, 'locations': 18, 'categories': 9, 'items': 50})
+        self.assertEqual(Item.objects.count(), scale.items)
+        # Closure rows: one per location and ancestor, as Location.save() writes them
+        for location in Location.objects.exclude(parent_location=None)[:5]:
+            parent = location.parent_location
+            self.assertEqual(location.effective_room_id, parent.effective_room_id)
+            self.assertEqual(
+                set(location.get_ancestors().values_list('id', flat=True)),
+                {parent.pk, *parent.get_ancestors().values_list('id', flat=True)})
+        for category in Category.objects.exclude(parent=None):
+            self.assertEqual(category.path, f"{category.parent.path}{category.pk}/")
+        self.assertEqual(rollups.reconcile(fix=False), [])
+
+    def test_same_seed_same_data_and_clear(self):
+        seed.seed_inventory('tiny', seed=3)
+        first = list(Item.objects.order_by('id').values_list('name', 'purchase_price', 'quantity'))
+        seed.clear_inventory()
+        self.assertFalse(Location.objects.exists())
+        seed.seed_inventory('tiny', seed=3)
+        self.assertEqual(list(Item.objects.order_by('id').values_list('name', 'purchase_price', 'quantity')),
+                         first)
+
+        out = StringIO()
+        call_command('seed_inventory', '--scale', 'tiny', '--items', '5', '--clear', stdout=out)
+        self.assertIn("5 items", out.getvalue())
+        self.assertEqual(Item.objects.count(), 5)
+
+
+class BenchmarkTestCase(TestCase):
+    def test_run_covers_every_route(self):
+        from inventory_app import urls
+        self.assertEqual({*(name for name, _, _ in benchmark.ROUTES), *benchmark.OPEN_ENDED},
+                         _route_names(urls.urlpatterns))
+        report = benchmark.run(['tiny'], repeat=1)
+        routes = report['scales']['tiny']['routes']
+        self.assertEqual(set(routes), {name for name, _, _ in benchmark.ROUTES})
+        self.assertTrue(all(result['status'] < 400 for result in routes.values()), routes)
+        self.assertEqual(routes['item-list']['queries'], QUERY_BUDGETS['item-list'][2])
+        self.assertEqual(benchmark.compare(report, report), [])
+
+    def test_compare_flags_regressions(self):
+        def report(ms, queries, kib):
+            return {'scales': {'small': {'routes': {'item-list': {
+                'median_ms': ms, 'min_ms': ms, 'queries': queries, 'peak_kib': kib, 'status': 200}}}}}
+
+        baseline = report(10.0, 2, 500.0)
+        self.assertEqual(benchmark.compare(report(11.0, 2, 520.0), baseline), [])
+        self.assertEqual(benchmark.compare(report(10.5, 3, 500.0), baseline),
+                         ["small item-list: 3 queries, baseline 2"])
+        self.assertEqual(len(benchmark.compare(report(20.0, 2, 2000.0), baseline)), 2)
+        self.assertEqual(benchmark.compare(report(1.5, 2, 500.0), report(1.0, 2, 500.0)), [])  # under the floor
+
+
+class LoadTestTestCase(TransactionTestCase):
+    def test_in_process_run(self):
+        from django.core.asgi import get_asgi_application
+        seed.seed_inventory('tiny', seed=1)
+        items = Item.objects.count()
+        # One client: the shared-cache in-memory test database locks whole tables
+        # between concurrent writers (the command itself runs on a file)
+        report = loadtest.run(get_asgi_application(), clients=1, duration=None, requests=60,
+                              mix={'item-detail': 2, 'item-create': 1, 'item-update': 1, 'location-tree': 1})
+        self.assertEqual(report['total']['requests'], 60)
+        self.assertEqual(report['total']['errors'], {})
+        self.assertEqual(sum(route['requests'] for route in report['routes'].values()), 60)
+        self.assertEqual(Item.objects.count() - items, report['routes']['item-create']['requests'])
+        route = report['routes']['item-detail']
+        self.assertLessEqual(route['p50_ms'], route['p95_ms'])
+        self.assertLessEqual(route['p95_ms'], route['p99_ms'])
+        self.assertEqual(json.loads(loadtest.dumps(report)), report)
+
+    def test_helpers(self):
+        self.assertEqual(loadtest.parse_mix("item-list=5, item-create"), {'item-list': 5, 'item-create': 1})
+        for text in ("items=1", "item-list=x", "item-list=0"):
+            with self.assertRaises(ValueError):
+                loadtest.parse_mix(text)
+        values = list(range(1, 101))
+        self.assertEqual([loadtest.percentile(values, p) for p in (50, 95, 99)], [50, 95, 99])
+        self.assertIsNone(loadtest.percentile([], 50))
+        locked = mock.Mock(status_code=500, content=b"OperationalError: database is locked", headers={})
+        self.assertEqual(loadtest.classify(locked), 'locked')
+        self.assertEqual(loadtest.classify(mock.Mock(status_code=500, content=b"", headers={})), 'server_error')
+        self.assertEqual(loadtest.classify(mock.Mock(status_code=400, content=b"")), 'client_error')
+        self.assertIsNone(loadtest.classify(mock.Mock(status_code=201, content=b"")))
+
+    @override_settings(DEBUG=False)
+    def test_lock_errors_are_flagged_without_debug(self):
+        client = Client(raise_request_exception=False)
+        for error, kind in ((OperationalError("database is locked"), 'locked'),
+                            (OperationalError("no such table: x"), 'server_error')):
+            with self.subTest(error=error), mock.patch('inventory_app.views.ItemViewSet.list', side_effect=error):
+                with self.assertLogs('inventory_app.requests', 'INFO') as logs, self.assertLogs('django.request'):
+                    response = client.get('/api/items/')
+                self.assertEqual(response.status_code, 500)
+                self.assertNotIn(b'locked', response.content)
+                self.assertEqual(loadtest.classify(httpx.Response(500, headers=dict(response.headers))), kind)
+                self.assertEqual(json.loads(logs.records[-1].getMessage()).get('error'),
+                                 'database-locked' if kind == 'locked' else None)
+
+
+class RecordingBroker(events.EventBroker):
+    """Local stand-in broker: keeps what is published."""
+
+    def __init__(self):
+        self.published = []
+
+    def publish(self, event):
+        self.published.append(event)
+
+
+@override_settings(INVENTORY_EVENT_BROKER='inventory_app.tests.RecordingBroker')
+class ChangeEventsTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.broker = events.get_broker()
+        self.broker.published.clear()
+        self.room = Room.objects.create(name="Garage")
+        self.shelf = Location.objects.create(name="Shelf", room=self.room)
+        self.assertEqual(self.broker.published, [])  # only on commit
+
+    def changes(self):
+        return [(event['action'], event['model'], event['pk']) for event in self.broker.published]
+
+    def test_signals_publish_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            item = Item.objects.create(name="Drill", location=self.shelf)
+        event = self.broker.published[-1]
+        self.assertEqual((event['action'], event['model'], event['pk']), ('created', 'item', item.pk))
+        self.assertEqual((event['data']['name'], event['data']['room_name']), ("Drill", "Garage"))
+
+        self.broker.published.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f'/api/items/{item.pk}/', {'quantity': 3}, format='json')
+            self.client.delete(f'/api/items/{item.pk}/')
+            self.client.patch(f'/api/rooms/{self.room.pk}/', {'name': "Workshop"}, format='json')
+        self.assertEqual(self.changes(), [('updated', 'item', item.pk), ('deleted', 'item', item.pk),
+                                          ('updated', 'room', self.room.pk)])
+        self.assertEqual(self.broker.published[0]['data']['quantity'], 3)
+        self.assertIsNone(self.broker.published[1]['data'])
+
+    def test_bulk_writes_publish_once_per_row(self):
+        self.broker.published.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/items/bulk/', [
+                {"name": "Nails", "location": self.shelf.pk}, {"name": "Screws", "location": self.shelf.pk}],
+                format='json')
+        ids = [row['id'] for row in response.data]
+        self.assertEqual(self.changes(), [('created', 'item', pk) for pk in ids])
+        self.assertEqual([event['data']['name'] for event in self.broker.published], ["Nails", "Screws"])
+
+    def test_rollback_publishes_nothing(self):
+        from django.db import transaction
+        self.broker.published.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                Item.objects.create(name="Ghost", location=self.shelf)
+                raise RuntimeError
+        self.assertEqual(self.broker.published, [])
+
+    @override_settings(INVENTORY_EVENT_BROKER='inventory_app.events.InProcessBroker')
+    def test_no_subscribers_no_work(self):
+        broker = events.get_broker()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            Item.objects.create(name="Drill", location=self.shelf)
+        self.assertEqual((callbacks, len(broker.buffer)), ([], 0))
+
+
+class InProcessBrokerTestCase(TestCase):
+    async def test_replay_and_overflow(self):
+        broker = events.InProcessBroker()
+        live = broker.subscribe()
+        for pk in (1, 2, 3):
+            broker.publish({'action': 'updated', 'model': 'item', 'pk': pk, 'data': None})
+        self.assertEqual([(await live.get())['pk'] for _ in range(3)], [1, 2, 3])
+        live.close()
+        self.assertFalse(broker.active())
+
+        resumed = broker.subscribe(last_event_id=1)
+        self.assertEqual([(await resumed.get())['id'] for _ in range(2)], [2, 3])
+        self.assertIsNone(await broker.subscribe(last_event_id=99).get())  # ids from before a restart
+
+        broker.queue_size = 2
+        slow = broker.subscribe()
+        for pk in range(4):
+            broker.publish({'action': 'created', 'model': 'room', 'pk': pk, 'data': None})
+        await asyncio.sleep(0)  # deliveries are scheduled on the loop
+        self.assertIsNone(await slow.get())
+        broker.publish({'action': 'deleted', 'model': 'room', 'pk': 9, 'data': None})
+        await asyncio.sleep(0)
+        self.assertEqual((await slow.get())['pk'], 9)
+
+    async def test_stream_endpoint(self):
+        with override_settings(INVENTORY_EVENT_BROKER='inventory_app.events.InProcessBroker'):
+            broker = events.get_broker()
+            response = await self.async_client.get('/api/events/?models=item')
+            self.assertEqual(response['Content-Type'], 'text/event-stream')
+            stream = aiter(response.streaming_content)
+            self.assertEqual(await anext(stream), b'retry: 3000\n\n')
+            broker.publish({'action': 'created', 'model': 'room', 'pk': 1, 'data': {'id': 1}})
+            event = broker.publish({'action': 'updated', 'model': 'item', 'pk': 7, 'data': {'id': 7}})
+            message = (await asyncio.wait_for(anext(stream), 5)).decode()
+            self.assertTrue(message.startswith(f"id: {event['id']}\nevent: change\ndata: "))
+            self.assertEqual(json.loads(message.split('data: ', 1)[1]), event)
+            await stream.aclose()
+
+        broker = events.InProcessBroker()
+        stream = events.event_stream(broker)
+        await anext(stream)
+        self.assertTrue(broker.active())
+        await stream.aclose()  # client gone
+        self.assertFalse(broker.active())
+
+        response = await self.async_client.get('/api/events/?models=<script>alert(1)</script>')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertNotIn(b'<script>', response.content)
+
+    def test_stream_needs_asgi(self):
+        self.assertEqual(self.client.get('/api/events/').status_code, 501)
+
+
+class SyncTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.room = Room.objects.create(name="Garage")
+        self.shelf = Location.objects.create(name="Shelf", room=self.room)
+        self.box = Location.objects.create(name="Box", parent_location=self.shelf)
+        self.drill = Item.objects.create(name="Drill", location=self.box)
+
+    def sync(self, token=None, **params):
+        if token:
+            params['since'] = token
+        response = self.client.get('/api/sync/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def changed(self, page):
+        return [(change['model'], change['action'], change['id']) for change in page['changes']]
+
+    def test_full_then_incremental(self):
+        page = self.sync()
+        self.assertFalse(page['has_more'])
+        self.assertFalse(page['reset'])
+        self.assertEqual(self.changed(page), [('room', 'upsert', self.room.id), ('location', 'upsert', self.shelf.id),
+                                              ('location', 'upsert', self.box.id), ('item', 'upsert', self.drill.id)])
+        self.assertEqual(page['changes'][-1]['data']['location_name'], "Box")
+        seqs = [change['seq'] for change in page['changes']]
+        self.assertEqual(seqs, sorted(seqs))
+        self.assertEqual(self.changed(self.sync(page['token'])), [])
+
+        token = page['token']
+        self.drill.name = "Cordless drill"
+        self.drill.save()
+        saw = Item.objects.create(name="Saw", location=self.shelf)
+        saw_id = saw.id
+        saw.delete()
+        page = self.sync(token)
+        self.assertEqual(self.changed(page), [('item', 'upsert', self.drill.id), ('item', 'delete', saw_id)])
+        self.assertEqual(page['changes'][0]['data']['name'], "Cordless drill")
+        self.assertIsNone(page['changes'][1]['data'])
+        self.assertEqual(self.changed(self.sync(page['token'])), [])
+
+    def test_writes_around_save_are_stamped(self):
+        token = self.sync()['token']
+        Item.objects.filter(pk=self.drill.pk).update(quantity=3)
+        self.assertEqual(self.changed(self.sync(token)), [('item', 'upsert', self.drill.id)])
+
+        token = self.sync()['token']
+        self.shelf.move_to(room=Room.objects.create(name="Attic"))
+        models = {(model, pk) for model, _, pk in self.changed(self.sync(token))}
+        # The box follows the shelf into the attic
+        self.assertTrue({('location', self.shelf.id), ('location', self.box.id)} <= models)
+
+    def test_pages(self):
+        for i in range(4):
+            Item.objects.create(name=f"Nail {i}", location=self.box)
+        seen, token, pages = [], None, 0
+        while True:
+            page = self.sync(token, page_size=3)
+            pages += 1
+            seen += self.changed(page)
+            token = page['token']
+            if not page['has_more']:
+                break
+        self.assertEqual(pages, 3)
+        self.assertEqual(len(seen), 8)
+        self.assertEqual(len(set(seen)), 8)
+
+    def test_pruned_tombstones_force_a_reset(self):
+        token = self.sync()['token']
+        drill_id = self.drill.id
+        self.drill.delete()
+        self.assertEqual(self.changed(self.sync(token)), [('item', 'delete', drill_id)])
+        out = StringIO()
+        call_command('prune_tombstones', '--days', '0', stdout=out)
+        self.assertIn("Pruned 1 tombstones.", out.getvalue())
+        page = self.sync(token)
+        self.assertTrue(page['reset'])
+        self.assertEqual({model for model, _, _ in self.changed(page)}, {'room', 'location'})
+        self.assertFalse(self.sync(page['token'])['reset'])
+        # Recent tombstones survive the default age
+        Location.objects.filter(pk=self.box.pk).delete()
+        self.assertEqual(sync.prune_tombstones(sync.DEFAULT_TOMBSTONE_AGE), 0)
+
+    def test_bad_parameters(self):
+        for params in ({'since': 'not-a-token'}, {'since': sync.encode_token(-1)}, {'page_size': 0}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get('/api/sync/', params).status_code, 400)
+
+    def test_missing_triggers_fail_clearly(self):
+        # Without the triggers nothing is ever stamped; an empty page would look like "no changes"
+        with connection.cursor() as cursor:
+            cursor.execute("DROP TRIGGER inventory_app_item_sync_au")
+        response = self.client.get('/api/sync/')
+        self.assertEqual(response.status_code, 501)
+        self.assertIn("migration 0016", response.json()['error'])
+
+
+class SyncSnapshotTestCase(TransactionTestCase):
+    """Sync reads from a production-profile SQLite file: WAL and IMMEDIATE write transactions."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        from home_inventory.settings import sqlite_database
+
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.path = os.path.join(cls.tmp.name, 'primary.sqlite3')
+        connections.settings['primary'] = {**connections['default'].settings_dict,
+                                           **sqlite_database(cls.path, 'production')}
+        cls.databases = cls.databases | {'primary'}
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections['primary'].close()
+        del connections['primary']
+        del connections.settings['primary']
+        cls.tmp.cleanup()
+
+    def setUp(self):
+        self.drill = Item.objects.create(name="Drill")
+        connections['primary'].close()
+        connection.ensure_connection()
+        target = sqlite3.connect(self.path)
+        connection.connection.backup(target)
+        target.close()
+
+    def names(self, page):
+        return [change['data']['name'] for change in page['changes']
+                if change['model'] == 'item' and change['action'] == sync.UPSERT]
+
+    def test_open_sync_read_does_not_block_writers(self):
+        written = []
+
+        def write_during_read(using):
+            counter = sync_counter(using)
+            writer = sqlite3.connect(self.path, timeout=0)  # fail at once instead of waiting for the lock
+            try:
+                writer.execute("UPDATE inventory_app_item SET name = 'Cordless drill' WHERE id = ?", [self.drill.id])
+                writer.commit()
+                written.append(True)
+            finally:
+                writer.close()
+            return counter
+
+        sync_counter = sync._counter
+        with mock.patch.object(router, 'db_for_read', return_value='primary'), \
+                mock.patch.object(sync, '_counter', side_effect=write_during_read):
+            page = sync.changes_since()
+        self.assertEqual(written, [True])
+        # The page is the snapshot from before the write; the write comes with the next one
+        self.assertEqual(self.names(page), ["Drill"])
+        self.assertFalse(connections['primary'].connection.in_transaction)
+        with mock.patch.object(router, 'db_for_read', return_value='primary'):
+            page = sync.changes_since(sync.decode_token(page['token']))
+        self.assertEqual(self.names(page), ["Cordless drill"])
@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import rooms_overview, room_detail, RoomViewSet, LocationViewSet, ItemViewSet, CategoryViewSet, voice_add_item  # ✅ Explicit
+from .views import rooms_overview, room_detail, RoomViewSet, LocationViewSet, ItemViewSet, CategoryViewSet, StatsViewSet, VoiceJobViewSet, voice_add_item, export_inventory, import_inventory, cache_stats, change_events, sync_changes  # ✅ Explicit
 
 # ✅ Use DefaultRouter for API
 router = DefaultRouter()
@@ -9,12 +9,19 @@ router.register(r'api/locations', LocationViewSet,
                 basename='location')  # ✅ Added Location API
 router.register(r'api/items', ItemViewSet, basename='item')
 router.register(r'api/categories', CategoryViewSet)
+router.register(r'api/stats', StatsViewSet, basename='stats')  # ✅ Valuation rollups
+router.register(r'api/jobs', VoiceJobViewSet, basename='voicejob')  # ✅ Voice job status
 
 urlpatterns = [
     # ✅ Template-based views
     path('rooms/', rooms_overview, name='rooms_overview'),
     path('rooms/<int:pk>/', room_detail, name='room_detail'),
     path('api/voice-add-item/', voice_add_item, name="voice_add_item"),
+    path('api/export/', export_inventory, name="export_inventory"),  # ✅ Streaming CSV/JSONL export
+    path('api/import/', import_inventory, name="import_inventory"),  # ✅ Chunked import with upsert
+    path('api/cache/stats/', cache_stats, name="cache_stats"),  # ✅ Response cache hit ratios
+    path('api/events/', change_events, name="change_events"),  # ✅ Server-Sent Events change feed
+    path('api/sync/', sync_changes, name="sync_changes"),  # ✅ Delta sync for offline devices
 
     # ✅ API ViewSet (Handles Listing, Retrieving, Updating, Deleting)
     path('', include(router.urls)),
@@ -0,0 +1,35 @@
+"""
+Per-model version stamps: one ModelVersion row per model, bumped with a
+single ``UPDATE ... SET version = version + 1`` on every write so readers can
+tell whether anything they depend on changed with one indexed lookup.
+"""
+from django.db.models import F
+from django.utils import timezone
+
+from .models import ModelVersion
+
+
+def label(model):
+    return model._meta.label_lower
+
+
+def bump(*models):
+    """Record a change to each of ``models``."""
+    labels = {label(model) for model in models}
+    now = timezone.now()
+    updated = ModelVersion.objects.filter(label__in=labels).update(
+        version=F('version') + 1, changed_at=now)
+    if updated < len(labels):
+        existing = set(ModelVersion.objects.filter(label__in=labels).values_list('label', flat=True))
+        ModelVersion.objects.bulk_create(
+            [ModelVersion(label=name, version=1, changed_at=now) for name in labels - existing],
+            ignore_conflicts=True)
+
+
+def current(models):
+    """``(version vector, last change)`` of ``models``; unchanged models count as version 0."""
+    labels = sorted(label(model) for model in models)
+    stamps = {row.label: row for row in ModelVersion.objects.filter(label__in=labels)}
+    vector = tuple(stamps[name].version if name in stamps else 0 for name in labels)
+    changed = [row.changed_at for row in stamps.values()]
+    return vector, max(changed) if changed else None
@@ -1,114 +1,448 @@
+import io
+import os
+from collections import defaultdict
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, get_object_or_404
-from rest_framework import viewsets
+from django.views.decorators.http import require_GET
+from rest_framework import mixins, viewsets
 from rest_framework.decorators import api_view, action
 from rest_framework.response import Response
+from rest_framework.reverse import reverse
 from rest_framework import status
-import openai
-from .models import Room, Location, Item, Category
-from .serializers import ItemSerializer, RoomSerializer, LocationSerializer, CategorySerializer
-
-# ✅ OpenAI API Key (Replace with your actual key)
-OPENAI_API_KEY = "your_openai_api_key"
+from . import bulk, events, export, importer, jobs, metrics, response_cache, sync, voice_cache
+from .models import Room, Location, Item, Category, InventoryRollup, VoiceJob
+from .filters import ItemFilterBackend, KeysetOrderingFilter
+from .serializers import (ItemSerializer, RoomSerializer, LocationSerializer, LocationMoveSerializer,
+                          CategorySerializer, VoiceJobSerializer)
+from .pagination import KeysetPagination, NameKeysetPagination, SearchPagination
+from .search import SearchResults, get_search_backend
+from .conditional import ConditionalGetMixin
+from .fastpath import FastListMixin
+from .fieldsets import FieldSelectionMixin
+from .response_cache import ResponseCacheMixin
+from .streaming import JSONLinesStreamMixin
+from .voice import create_job, fail_stale_jobs, run_voice_job
 
 
-class RoomViewSet(viewsets.ModelViewSet):
-    queryset = Room.objects.all().prefetch_related('locations__sublocations')
+class RoomViewSet(ResponseCacheMixin, ConditionalGetMixin, FieldSelectionMixin, FastListMixin,
+                  viewsets.ModelViewSet):
+    # Joins and prefetches come from the serializer's query plan (FieldSelectionMixin)
+    queryset = Room.objects.all()
     serializer_class = RoomSerializer
+    fast_nested = {'locations': LocationSerializer}  # RoomSerializer.get_locations
+    version_models = (Room, Location)
+    cache_group = 'rooms'
 
 
-class LocationViewSet(viewsets.ModelViewSet):
-    queryset = Location.objects.all().select_related(
-        'room', 'parent_location').prefetch_related('sublocations')
+class LocationViewSet(ResponseCacheMixin, ConditionalGetMixin, FieldSelectionMixin, JSONLinesStreamMixin,
+                      FastListMixin, viewsets.ModelViewSet):
+    queryset = Location.objects.all()
     serializer_class = LocationSerializer
+    pagination_class = NameKeysetPagination
+    version_models = (Location, Room, Item)  # items/ lists the location's items
+    cache_group = 'locations'
+    cached_actions = ('list', 'tree')
 
     @action(detail=False, methods=['get'])
     def tree(self, request):
-        def build_tree(location):
-            room = location.get_room()
-            return {
-                'id': location.id,
-                'name': location.name,
-                'room': {'id': room.id, 'name': room.name} if room else None,
-                'description': location.description,
-                'sublocations': [build_tree(sub) for sub in location.sublocations.all()]
-            }
-
-        top_level = Location.objects.filter(parent_location__isnull=True).select_related('room')
-        tree = [build_tree(loc) for loc in top_level]
+        """
+        Nested location hierarchy, loaded in a single query and assembled in
+        memory. ``?root=<id>`` returns just that subtree and ``?depth=N``
+        limits the number of levels returned.
+        """
+        try:
+            root_id = _positive_int_param(request, 'root')
+            depth = _positive_int_param(request, 'depth')
+        except ValueError as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        rows = Location.objects.order_by('id')
+        if root_id is not None:
+            # Only fetch the subtree, via the closure table
+            links = {'ancestor_links__ancestor_id': root_id}
+            if depth is not None:
+                links['ancestor_links__depth__lt'] = depth
+            rows = rows.filter(**links)
+        rows = rows.values(
+            'id', 'name', 'description', 'parent_location_id',
+            'effective_room_id', 'effective_room__name')
+        rows = list(rows)
+        with metrics.serializer_timing():
+            tree = build_location_tree(rows, root_id=root_id, depth=depth)
+        if tree is None:
+            return Response({"error": "Location not found"}, status=status.HTTP_404_NOT_FOUND)
         return Response(tree)
 
+    @action(detail=True, methods=['get'])
+    def items(self, request, pk=None):
+        """Items stored in this location; ``?recursive=1`` includes nested sublocations."""
+        location = self.get_object()
+        if _flag_param(request, 'recursive'):
+            queryset = Item.objects.filter(location__ancestor_links__ancestor_id=location.pk)
+        else:
+            queryset = Item.objects.filter(location_id=location.pk)
+        queryset = queryset.select_related('location__effective_room', 'category')
+        page = self.paginate_queryset(queryset)
+        serializer = ItemSerializer(page, many=True, context=self.get_serializer_context())
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=True, methods=['get'])
+    def ancestors(self, request, pk=None):
+        """Ancestors of this location, from the top-level location down to its parent."""
+        location = self.get_object()
+        ancestors = location.get_ancestors().select_related(
+            'room', 'parent_location', 'effective_room').prefetch_related('sublocations')
+        return Response(self.get_serializer(ancestors, many=True).data)
+
+    @action(detail=True, methods=['post'])
+    def move(self, request, pk=None):
+        """
+        Re-parent this location with its whole subtree in one transaction:
+        ``{"parent_location": id}`` nests it, ``{"room_id": id}`` makes it a
+        top-level location in that room.
+        """
+        location = self.get_object()
+        target = LocationMoveSerializer(data=request.data)
+        target.is_valid(raise_exception=True)
+        try:
+            with transaction.atomic():
+                location.move_to(**target.validated_data)
+        except DjangoValidationError as exc:
+            return Response({"error": " ".join(exc.messages)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(self.get_serializer(location).data)
+
+
+def _flag_param(request, name):
+    return request.query_params.get(name, '').lower() in ('1', 'true', 'yes')
+
+
+def _positive_int_param(request, name):
+    value = request.query_params.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number < 1:
+        raise ValueError(f"'{name}' must be a positive integer.")
+    return number
+
+
+def build_location_tree(rows, root_id=None, depth=None):
+    """
+    Assemble flat location rows into the nested tree structure in O(n).
+
+    Returns ``None`` when ``root_id`` is given but not among the rows.
+    """
+    nodes = {}
+    children = defaultdict(list)
+    for row in rows:
+        room_id = row['effective_room_id']
+        nodes[row['id']] = {
+            'id': row['id'],
+            'name': row['name'],
+            'room': {'id': room_id, 'name': row['effective_room__name']} if room_id else None,
+            'description': row['description'],
+            'sublocations': [],
+        }
+        children[row['parent_location_id']].append(row['id'])
+
+    if root_id is None:
+        level = children[None]
+    elif root_id in nodes:
+        level = [root_id]
+    else:
+        return None
+
+    tree = [nodes[pk] for pk in level]
+    visited = set(level)
+    current_depth = 1
+    while level and (depth is None or current_depth < depth):
+        next_level = []
+        for pk in level:
+            child_ids = [child for child in children.get(pk, ()) if child not in visited]
+            visited.update(child_ids)
+            nodes[pk]['sublocations'] = [nodes[child] for child in child_ids]
+            next_level.extend(child_ids)
+        level = next_level
+        current_depth += 1
+    return tree
+
 
-class ItemViewSet(viewsets.ModelViewSet):
-    queryset = Item.objects.all().select_related('location', 'category')
+class ItemViewSet(ConditionalGetMixin, FieldSelectionMixin, JSONLinesStreamMixin, FastListMixin,
+                  viewsets.ModelViewSet):
+    queryset = Item.objects.all()
     serializer_class = ItemSerializer
+    pagination_class = KeysetPagination
+    # Category: ?category=&include_descendants=1 depends on the category tree
+    version_models = (Item, Location, Room, Category)
+    filter_backends = [ItemFilterBackend, KeysetOrderingFilter]
+    # Public ?ordering= names -> lookups. The columns of Item have a matching
+    # (field, id) index; location, room and category order by a joined name,
+    # which no index covers, so those scan and sort the filtered items
+    ordering_fields = {
+        'id': 'id',
+        'name': 'name',
+        'purchase_date': 'purchase_date',
+        'purchase_price': 'purchase_price',
+        'current_value': 'current_value',
+        'quantity': 'quantity',
+        'serial_number': 'serial_number',
+        'location': 'location__name',
+        'room': 'location__effective_room__name',
+        'category': 'category__name',
+    }
+
+    @action(detail=False, methods=['post', 'patch', 'delete'])
+    def bulk(self, request):
+        """
+        Bulk writes in one transaction: POST a list of new items, PATCH a list
+        of partial updates (each with its ``id``), or DELETE ``{"ids": [...]}``.
+        Invalid input returns 400 with errors listed per row.
+        """
+        context = self.get_serializer_context()
+        try:
+            if request.method == 'POST':
+                items = bulk.create_items(request.data, context)
+                return Response(self._bulk_data([item.pk for item in items]),
+                                status=status.HTTP_201_CREATED)
+            if request.method == 'PATCH':
+                return Response(self._bulk_data(bulk.update_items(request.data, context)))
+            ids = request.data.get('ids') if isinstance(request.data, dict) else request.data
+            return Response({"deleted": bulk.delete_items(ids)})
+        except bulk.BulkError as exc:
+            return Response({"errors": exc.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+    def _bulk_data(self, ids):
+        items = self.get_queryset().filter(id__in=ids).order_by('id')
+        return self.get_serializer(items, many=True).data
 
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """Ranked full-text search over name, description, notes and serial number."""
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({"error": "Query parameter 'q' is required."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        paginator = SearchPagination()
+        hits = paginator.paginate_queryset(
+            SearchResults(get_search_backend(), query), request, view=self)
+        items = self.get_queryset().in_bulk([hit.item_id for hit in hits])
+        hits = [hit for hit in hits if hit.item_id in items]
+        rows = self.get_serializer([items[hit.item_id] for hit in hits], many=True).data
+        for row, hit in zip(rows, hits):
+            row['score'] = hit.score
+            row['snippet'] = hit.snippet
+        return paginator.get_paginated_response(rows)
 
-class CategoryViewSet(viewsets.ModelViewSet):
-    queryset = Category.objects.all().select_related(
-        'parent').prefetch_related('subcategories')
+
+class CategoryViewSet(ResponseCacheMixin, ConditionalGetMixin, FieldSelectionMixin, JSONLinesStreamMixin,
+                      viewsets.ModelViewSet):
+    queryset = Category.objects.all()
     serializer_class = CategorySerializer
+    pagination_class = NameKeysetPagination
+    version_models = (Category,)
+    cache_group = 'categories'
+
+
+class StatsViewSet(ConditionalGetMixin, viewsets.ViewSet):
+    """
+    Valuation totals read from the incrementally maintained InventoryRollup
+    table: ``/api/stats/`` for the whole inventory, plus ``rooms/``,
+    ``locations/`` and ``categories/`` (location and category totals include
+    their whole subtree).
+    """
+    version_models = (Item, Location, Room, Category)
+
+    def list(self, request):
+        total = InventoryRollup.objects.filter(scope=InventoryRollup.SCOPE_TOTAL).first()
+        return Response(_rollup_data(total))
+
+    @action(detail=False, methods=['get'])
+    def rooms(self, request):
+        return Response(_scope_totals(InventoryRollup.SCOPE_ROOM, Room))
+
+    @action(detail=False, methods=['get'])
+    def locations(self, request):
+        return Response(_scope_totals(InventoryRollup.SCOPE_LOCATION, Location, 'parent_location_id'))
+
+    @action(detail=False, methods=['get'])
+    def categories(self, request):
+        return Response(_scope_totals(InventoryRollup.SCOPE_CATEGORY, Category, 'parent_id'))
+
+
+def _rollup_data(rollup):
+    if rollup is None:
+        return {'item_count': 0, 'quantity': 0, 'purchase_price': '0.00', 'current_value': '0.00'}
+    return {
+        'item_count': rollup.item_count,
+        'quantity': rollup.quantity,
+        'purchase_price': f"{rollup.purchase_price:.2f}",
+        'current_value': f"{rollup.current_value:.2f}",
+    }
+
+
+def _scope_totals(scope, model, parent_field=None):
+    rollups = {row.object_id: row for row in InventoryRollup.objects.filter(scope=scope)}
+    fields = ['id', 'name'] + ([parent_field] if parent_field else [])
+    rows = []
+    for obj in model.objects.order_by('name', 'id').values(*fields):
+        row = {'id': obj['id'], 'name': obj['name']}
+        if parent_field:
+            row['parent'] = obj[parent_field]
+        row.update(_rollup_data(rollups.get(obj['id'])))
+        rows.append(row)
+    return rows
 
 
 @api_view(['POST'])
 def voice_add_item(request):
     """
     API endpoint to process voice input and add new items based on transcribed text.
+
+    Transcription and extraction run in the background job pool; the response
+    is 202 with the job, to be polled at ``/api/jobs/{id}/``. Re-uploading the
+    same audio returns the existing job with 200.
     """
+    audio_file = request.FILES.get("audio")  # ✅ Capture uploaded audio
+    if not audio_file:
+        return Response({"error": "No audio file provided"}, status=status.HTTP_400_BAD_REQUEST)
+
+    # ✅ A retried upload gets the original job back instead of new items
+    job, created = create_job(audio_file.read(), audio_file.name or '')
+    if not created:
+        return Response(VoiceJobSerializer(job, context={'request': request}).data,
+                        status=status.HTTP_200_OK)
+
     try:
-        audio_file = request.FILES.get("audio")  # ✅ Capture uploaded audio
-        if not audio_file:
-            return Response({"error": "No audio file provided"}, status=status.HTTP_400_BAD_REQUEST)
-
-        # ✅ Transcribe audio to text using OpenAI Whisper
-        openai.api_key = OPENAI_API_KEY
-        transcription = openai.Audio.transcribe("whisper-1", audio_file)
-        user_input = transcription["text"]
-
-        prompt = f"""
-        Extract structured information from the following text:
-        - Identify item names and quantities.
-        - Identify room and location (if mentioned).
-        - Output in JSON format: {{
-          "items": [
-            {{"name": "Item1", "quantity": 1, "room": "Room1", "location": "Location1"}},
-            {{"name": "Item2", "quantity": 2, "room": null, "location": null}}
-          ]
-        }}
-        Text: {user_input}
-        """
+        jobs.submit(run_voice_job, job.pk)
+    except jobs.JobQueueFull:
+        job.delete()
+        return Response({"error": "Too many voice jobs in progress, try again shortly."},
+                        status=status.HTTP_503_SERVICE_UNAVAILABLE, headers={'Retry-After': '5'})
+    job.refresh_from_db()
+    return Response(VoiceJobSerializer(job, context={'request': request}).data,
+                    status=status.HTTP_202_ACCEPTED,
+                    headers={'Location': reverse('voicejob-detail', args=[job.pk], request=request)})
+
+
+class VoiceJobViewSet(FieldSelectionMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """Status and result of a voice job."""
+    queryset = VoiceJob.objects.defer('audio')
+    serializer_class = VoiceJobSerializer
+
+    def retrieve(self, request, *args, **kwargs):
+        fail_stale_jobs()  # so clients polling a job lost in a restart see it fail
+        return super().retrieve(request, *args, **kwargs)
+
+    @action(detail=False, methods=['get'])
+    def cache(self, request):
+        """Hit/miss counters of the transcript and extraction caches in this process."""
+        return Response(voice_cache.stats())
+
+
+SYNC_PAGE_SIZE = 500
+SYNC_MAX_PAGE_SIZE = 5000
+
+
+@api_view(['GET'])
+def sync_changes(request):
+    """
+    Rooms, locations, categories and items changed or deleted since
+    ``?since=<token>`` (everything without one), in sequence order and pages
+    of ``?page_size=`` (default 500). Pass the returned ``token`` back while
+    ``has_more`` is true, and again on the next sync. ``reset`` means the
+    token was too old: drop the local copy, this is a full sync.
+    """
+    try:
+        since = sync.decode_token(request.query_params.get('since'))
+    except sync.InvalidToken:
+        return Response({"error": "Invalid sync token."}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        page_size = _positive_int_param(request, 'page_size') or SYNC_PAGE_SIZE
+    except ValueError as exc:
+        return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        return Response(sync.changes_since(since, limit=min(page_size, SYNC_MAX_PAGE_SIZE)))
+    except sync.SyncUnavailable as exc:
+        return Response({"error": str(exc)}, status=status.HTTP_501_NOT_IMPLEMENTED)
+
 
-        response = openai.ChatCompletion.create(
-            model="gpt-4-turbo",
-            messages=[
-                {"role": "system", "content": "You are an assistant that extracts structured data from text."},
-                {"role": "user", "content": prompt}
-            ]
-        )
-        extracted_data = response["choices"][0]["message"]["content"]
-        items_data = extracted_data.get("items", [])
-
-        created_items = []
-        for item_data in items_data:
-            room = None
-            location = None
-
-            if item_data["room"]:
-                room, _ = Room.objects.get_or_create(name=item_data["room"])
-
-            if item_data["location"]:
-                location, _ = Location.objects.get_or_create(
-                    name=item_data["location"], room=room)
-
-            new_item = Item.objects.create(
-                name=item_data["name"],
-                quantity=item_data["quantity"],
-                location=location
-            )
-            created_items.append(new_item)
-
-        return Response(ItemSerializer(created_items, many=True).data, status=status.HTTP_201_CREATED)
-    except Exception as e:
-        return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+@api_view(['GET'])
+def cache_stats(request):
+    """Hit/miss counters of the response cache, per group, in this process."""
+    return Response(response_cache.stats())
+
+
+@require_GET
+async def change_events(request):
+    """
+    Server-Sent Events stream of item, location, room and category changes
+    (events.py). ``?models=item,location`` narrows it; a reconnecting client
+    resumes after its ``Last-Event-ID`` header (or ``?last_event_id=``) and
+    gets a ``reset`` event if that is no longer possible. Needs the ASGI app.
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({"error": "The event stream needs the ASGI server (asgi.py)."}, status=501)
+    models = {name for name in request.GET.get('models', '').split(',') if name}
+    if models - set(events.MODELS):
+        return JsonResponse({"error": f"Unknown models; choose from: {', '.join(events.MODELS)}."},
+                            status=status.HTTP_400_BAD_REQUEST)
+    last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        return JsonResponse({"error": "Invalid Last-Event-ID."}, status=status.HTTP_400_BAD_REQUEST)
+    response = StreamingHttpResponse(
+        events.event_stream(events.get_broker(), last_event_id, models),
+        content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # no proxy buffering
+    return response
+
+
+@require_GET
+def export_inventory(request):
+    """
+    Stream every item with its room, location path and category path as
+    ``?format=csv`` (default) or ``?format=jsonl``. A plain Django view, so
+    ``format`` is not taken as DRF's renderer override.
+    """
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in export.FORMATS:
+        return JsonResponse({"error": f"Unknown export format; use one of: {', '.join(export.FORMATS)}."},
+                            status=status.HTTP_400_BAD_REQUEST)
+    response = StreamingHttpResponse(export.iter_export(fmt), content_type=export.FORMATS[fmt])
+    response['Content-Disposition'] = f'attachment; filename="inventory.{fmt}"'
+    return response
+
+
+@api_view(['POST'])
+def import_inventory(request):
+    """
+    Import a CSV or JSON-lines ``file`` upload in the export format. Form
+    fields: ``format`` (else taken from the file name), ``upsert`` and
+    ``dry_run``. Returns the import report.
+    """
+    upload = request.FILES.get('file')
+    if upload is None:
+        return Response({"error": "No file provided"}, status=status.HTTP_400_BAD_REQUEST)
+    fmt = request.data.get('format') or os.path.splitext(upload.name)[1].lstrip('.').lower()
+    if fmt not in importer.FORMATS:
+        return Response({"error": f"Unknown import format; use one of: {', '.join(importer.FORMATS)}."},
+                        status=status.HTTP_400_BAD_REQUEST)
+    # Read the (possibly disk-spooled) upload as a text stream, row by row
+    stream = io.TextIOWrapper(upload.file, encoding='utf-8', newline='')
+    report = importer.import_items(
+        stream, fmt,
+        upsert=str(request.data.get('upsert', '')).lower() in ('1', 'true', 'yes'),
+        dry_run=str(request.data.get('dry_run', '')).lower() in ('1', 'true', 'yes'))
+    return Response(report.as_dict())
 
 
 def rooms_overview(request):
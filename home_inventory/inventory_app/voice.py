@@ -0,0 +1,202 @@
+"""
+Voice pipeline: transcribe an uploaded recording, extract the items it
+mentions and create them. Runs as a background job (see jobs.py) behind
+``POST /api/voice-add-item/``; clients poll ``/api/jobs/{id}/``.
+
+Provider results are cached by content (see voice_cache.py), and an upload
+whose audio matches a job from within the cache TTL that has not failed is
+answered with that job, so client retries never create the items twice.
+
+Jobs live in the worker pool of one process, so a restart loses the queued
+and running ones. A job that has not moved for ``INVENTORY_JOB_TIMEOUT``
+seconds is taken as abandoned and marked failed (``fail_stale_jobs``), which
+lets the same audio be uploaded again.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from . import voice_cache
+from .models import Item, Location, Room, VoiceJob, normalize_name
+from .providers import get_voice_provider
+from .signals import bulk_write, items_bulk_changed, rows_bulk_created
+
+logger = logging.getLogger(__name__)
+
+
+def run_voice_job(job_id, provider=None):
+    # Claim the job; one given up as stale meanwhile is left alone
+    if not VoiceJob.objects.filter(pk=job_id, status=VoiceJob.STATUS_QUEUED).update(
+            status=VoiceJob.STATUS_RUNNING, updated_at=timezone.now()):
+        return
+    job = VoiceJob.objects.get(pk=job_id)
+    try:
+        audio = bytes(job.audio)
+        key = job.audio_hash or voice_cache.audio_key(audio)
+        job.transcript = voice_cache.transcripts.get(key)
+        if job.transcript is None:
+            provider = provider or get_voice_provider()
+            job.transcript = provider.transcribe(audio, job.audio_name)
+            voice_cache.transcripts.set(key, job.transcript)
+        key = voice_cache.transcript_key(job.transcript)
+        job.extracted = voice_cache.extractions.get(key)
+        if job.extracted is None:
+            provider = provider or get_voice_provider()
+            job.extracted = provider.extract(job.transcript)
+            voice_cache.extractions.set(key, job.extracted)
+        with transaction.atomic():
+            item_ids = [item.pk for item in create_items(job.extracted.get("items", []))]
+            # Failed as stale while it ran: the client was told to upload again, so keep no items
+            if not _finish(job, status=VoiceJob.STATUS_SUCCEEDED, item_ids=item_ids):
+                transaction.set_rollback(True)
+    except Exception as exc:
+        logger.exception("Voice job %s failed", job_id)
+        _finish(job, status=VoiceJob.STATUS_FAILED, error=str(exc))
+
+
+def _finish(job, **fields):
+    """Store the outcome of ``job`` unless it stopped running meanwhile; whether it did."""
+    return VoiceJob.objects.filter(pk=job.pk, status=VoiceJob.STATUS_RUNNING).update(
+        transcript=job.transcript or '', extracted=job.extracted, audio=None,
+        updated_at=timezone.now(), **fields)
+
+
+def create_items(items_data):
+    """
+    Create the extracted items in one transaction.
+
+    Room and location names are matched case- and whitespace-insensitively
+    through their ``normalized_name``, with one query per table for the whole
+    utterance. Missing rooms and (top-level) locations are created in bulk and
+    the items with one ``bulk_create``. A location named without a room
+    matches an existing location of that name in any room, or is left out.
+    """
+    rows = [_clean_item(item_data) for item_data in items_data]
+    if not rows:
+        return []
+    with transaction.atomic(), bulk_write():
+        rooms = _resolve_rooms([row['room'] for row in rows if row['room']])
+        locations = _resolve_locations([
+            (rooms[normalize_name(row['room'])] if row['room'] else None, row['location'])
+            for row in rows if row['location']])
+        items = Item.objects.bulk_create([
+            Item(name=row['name'], quantity=row['quantity'], location_id=locations.get((
+                rooms[normalize_name(row['room'])] if row['room'] else None,
+                normalize_name(row['location']))))
+            for row in rows])
+        items_bulk_changed.send(sender=Item, created=[item.pk for item in items],
+                                updated=[], deleted=[], before=[])
+    return items
+
+
+def _clean_item(item_data):
+    name = ' '.join(str(item_data.get("name") or '').split())
+    if not name:
+        raise ValueError("Extracted item has no name.")
+    try:
+        quantity = max(int(item_data.get("quantity") or 1), 1)
+    except (TypeError, ValueError):
+        quantity = 1
+    room, location = (' '.join(str(item_data.get(key) or '').split()) or None
+                      for key in ("room", "location"))
+    return {'name': name, 'quantity': quantity, 'room': room, 'location': location}
+
+
+def _resolve_rooms(names):
+    """{normalized name: room id}, creating the rooms that don't exist yet."""
+    wanted = {}
+    for name in names:  # the first spelling names a new room
+        wanted.setdefault(normalize_name(name), name)
+    if not wanted:
+        return {}
+    rooms = {}
+    for pk, key in Room.objects.filter(normalized_name__in=wanted).order_by('id').values_list(
+            'id', 'normalized_name'):
+        rooms.setdefault(key, pk)
+    missing = [Room(name=name, normalized_name=key) for key, name in wanted.items() if key not in rooms]
+    if missing:
+        created = Room.objects.bulk_create(missing)
+        rooms.update((room.normalized_name, room.pk) for room in created)
+        rows_bulk_created.send(sender=Room, ids=[room.pk for room in created])
+    return rooms
+
+
+def _resolve_locations(pairs):
+    """{(room id, normalized name): location id} for (room id, name) pairs, creating missing ones."""
+    wanted = {}
+    for room_id, name in pairs:
+        wanted.setdefault((room_id, normalize_name(name)), name)
+    if not wanted:
+        return {}
+    in_room, anywhere = {}, {}
+    for pk, room_id, key in Location.objects.filter(
+            normalized_name__in={key for _, key in wanted}).order_by('id').values_list(
+            'id', 'effective_room_id', 'normalized_name'):
+        in_room.setdefault((room_id, key), pk)
+        anywhere.setdefault(key, pk)
+    locations, missing = {}, []
+    for (room_id, key), name in wanted.items():
+        if room_id is None:
+            if key in anywhere:
+                locations[(None, key)] = anywhere[key]
+        elif (room_id, key) in in_room:
+            locations[(room_id, key)] = in_room[(room_id, key)]
+        else:
+            missing.append(Location(name=name, room_id=room_id))
+    if missing:
+        created = Location.bulk_create_top_level(missing)
+        for location in created:
+            locations[(location.room_id, location.normalized_name)] = location.pk
+        rows_bulk_created.send(sender=Location, ids=[location.pk for location in created])
+    return locations
+
+
+PENDING = (VoiceJob.STATUS_QUEUED, VoiceJob.STATUS_RUNNING)
+
+
+def _stale_before():
+    return timezone.now() - timedelta(seconds=getattr(settings, 'INVENTORY_JOB_TIMEOUT', 600))
+
+
+def fail_stale_jobs():
+    """Mark queued or running jobs that have not moved within the job timeout as failed."""
+    return VoiceJob.objects.filter(status__in=PENDING, updated_at__lt=_stale_before()).update(
+        status=VoiceJob.STATUS_FAILED, audio=None, updated_at=timezone.now(),
+        error="Abandoned: the server stopped before the job finished; upload the audio again.")
+
+
+def create_job(audio, audio_name):
+    """
+    ``(job, created)``: a new queued job for ``audio``, or the live job that
+    already has the same audio. A unique constraint on the hash of live jobs
+    settles concurrent uploads; jobs past the dedupe window give up their hash.
+    """
+    audio_hash = voice_cache.audio_key(audio)
+    fail_stale_jobs()
+    duplicate = find_duplicate_job(audio_hash)
+    if duplicate is not None:
+        return duplicate, False
+    since = timezone.now() - timedelta(seconds=voice_cache.cache_ttl())
+    try:
+        with transaction.atomic():
+            VoiceJob.objects.filter(audio_hash=audio_hash, created_at__lt=since).update(audio_hash='')
+            return VoiceJob.objects.create(audio=audio, audio_name=audio_name, audio_hash=audio_hash), True
+    except IntegrityError:
+        # A concurrent upload of the same audio created its job first
+        duplicate = find_duplicate_job(audio_hash)
+        if duplicate is None:
+            raise
+        return duplicate, False
+
+
+def find_duplicate_job(audio_hash):
+    """The most recent job for the same audio within the cache TTL that has not failed or gone stale."""
+    since = timezone.now() - timedelta(seconds=voice_cache.cache_ttl())
+    return (VoiceJob.objects.defer('audio')
+            .filter(audio_hash=audio_hash, created_at__gte=since)
+            .exclude(status=VoiceJob.STATUS_FAILED)
+            .exclude(status__in=PENDING, updated_at__lt=_stale_before())
+            .order_by('-created_at').first())
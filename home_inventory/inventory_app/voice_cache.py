@@ -0,0 +1,107 @@
+"""
+In-process caches for the voice pipeline, so a retried upload does not pay
+for the provider round trips again: transcripts keyed by the sha256 of the
+audio bytes, and extractions keyed by the normalized transcript. Entries
+expire after ``INVENTORY_VOICE_CACHE_TTL`` seconds and the least recently
+used ones are evicted beyond ``INVENTORY_VOICE_CACHE_SIZE`` entries.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+
+class ResultCache:
+    """
+    Thread-safe LRU cache with a TTL and hit/miss/eviction counters. Without
+    ``max_entries`` or ``ttl`` it follows the settings, read on each use.
+    """
+
+    def __init__(self, max_entries=None, ttl=None, clock=time.monotonic):
+        self._max_entries = max_entries
+        self._ttl = ttl
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    @property
+    def max_entries(self):
+        return self._max_entries if self._max_entries is not None else cache_size()
+
+    @property
+    def ttl(self):
+        return self._ttl if self._ttl is not None else cache_ttl()
+
+    def get(self, key):
+        """The cached value, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= self.clock():
+                del self._entries[key]
+                self.evictions += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (self.clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': round(self.hits / lookups, 3) if lookups else None,
+            }
+
+
+def audio_key(audio):
+    return hashlib.sha256(audio).hexdigest()
+
+
+def transcript_key(transcript):
+    """Hash of the transcript with case, surrounding punctuation and whitespace runs ignored."""
+    normalized = ' '.join(transcript.casefold().split()).strip(' .,;:!?')
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+
+def cache_ttl():
+    return getattr(settings, 'INVENTORY_VOICE_CACHE_TTL', 3600)
+
+
+def cache_size():
+    return getattr(settings, 'INVENTORY_VOICE_CACHE_SIZE', 256)
+
+
+transcripts = ResultCache()
+extractions = ResultCache()
+
+
+def stats():
+    return {'transcripts': transcripts.stats(), 'extractions': extractions.stats()}
+
+
+def clear():
+    transcripts.clear()
+    extractions.clear()